@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+PING->PONG turnaround and message-to-screen time under the old 100ms Tk
+tick and under RudeEngine.
+
+A local IRC-ish server on its own thread sends PINGs and PRIVMSGs and
+timestamps them. The client coroutine runs on the engine's loop, answers
+PINGs and "displays" PRIVMSGs after a few awaits, like the real client's
+read -> dispatch -> handler path.
+
+Without --tk the Tk main loop is stood in for by FakeRoot, which runs
+after() callbacks on time and spends --redraw-ms per frame as Tk would
+redrawing. Use --tk where a display is available to run under real Tk.
+
+    PYTHONPATH=src python benchmarks/engine_latency.py
+"""
+import argparse
+import asyncio
+import heapq
+import statistics
+import threading
+import time
+
+from rudechat3.rude_engine import RudeEngine
+
+
+class TickEngine:
+    """The engine RudeChat had before: one loop iteration every 100ms."""
+    def __init__(self, root, tick_ms=100):
+        self.root = root
+        self.tick_ms = tick_ms
+        self.loop = asyncio.new_event_loop()
+
+    def start(self, coro):
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(coro)
+        self.root.after(self.tick_ms, self.tk_update)
+
+    def tk_update(self):
+        try:
+            self.loop.stop()
+            self.loop.run_forever()
+        finally:
+            self.loop.stop()
+            self.root.after(self.tick_ms, self.tk_update)
+
+
+class FakeRoot:
+    """Just enough of Tk's main loop: after() timers and some redraw time per frame."""
+    def __init__(self, redraw_ms):
+        self.redraw = redraw_ms / 1000
+        self.timers = []
+        self.counter = 0
+        self.running = False
+
+    def after(self, ms, callback):
+        self.counter += 1
+        heapq.heappush(self.timers, (time.perf_counter() + ms / 1000, self.counter, callback))
+
+    def quit(self):
+        self.running = False
+
+    def mainloop(self):
+        self.running = True
+        while self.running and self.timers:
+            due, _, callback = heapq.heappop(self.timers)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            callback()
+            # Redraw whatever the callback changed
+            end = time.perf_counter() + self.redraw
+            while time.perf_counter() < end:
+                pass
+
+
+class Server:
+    """Sends a PRIVMSG and a PING per round and waits for the PONG before the next."""
+    def __init__(self, rounds):
+        self.rounds = rounds
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.sent = {}
+        self.pong_times = []
+        self.port = None
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.serve())
+
+    async def serve(self):
+        done = asyncio.Event()
+
+        async def session(reader, writer):
+            for number in range(self.rounds):
+                # Vary the phase so lines land at every point of the tick
+                await asyncio.sleep(0.013 + (number * 0.0071) % 0.1)
+                self.sent[f"msg{number}"] = time.perf_counter()
+                writer.write(f":bench!b@h PRIVMSG #bench :msg{number}\r\n".encode())
+                self.sent[f"ping{number}"] = time.perf_counter()
+                writer.write(f"PING :ping{number}\r\n".encode())
+                await writer.drain()
+                await reader.readline()
+                self.pong_times.append(time.perf_counter() - self.sent[f"ping{number}"])
+            writer.write(b"ERROR :done\r\n")
+            await writer.drain()
+            writer.close()
+            done.set()
+
+        server = await asyncio.start_server(session, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        await done.wait()
+        server.close()
+
+
+async def client(port, shown, root, hops):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    while True:
+        line = (await reader.readline()).decode().rstrip("\r\n")
+        if not line or line.startswith("ERROR"):
+            break
+        # read -> dispatch -> handler -> display
+        for _ in range(hops):
+            await asyncio.sleep(0)
+        if line.startswith("PING"):
+            writer.write(f"PONG {line[5:]}\r\n".encode())
+            await writer.drain()
+        else:
+            shown.append((line.rsplit(":", 1)[1], time.perf_counter()))
+    writer.close()
+    root.quit()
+
+
+def measure(engine_class, args):
+    server = Server(args.rounds)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    server.ready.wait()
+
+    if args.tk:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+    else:
+        root = FakeRoot(args.redraw_ms)
+    shown = []
+    engine = engine_class(root)
+    engine.start(client(server.port, shown, root, args.hops))
+    root.mainloop()
+    thread.join()
+
+    screen_times = [at - server.sent[token] for token, at in shown]
+    return server.pong_times, screen_times
+
+
+def summary(values):
+    values = sorted(values)
+    return (f"median {statistics.median(values) * 1000:6.1f} ms  "
+            f"p95 {values[int(len(values) * 0.95)] * 1000:6.1f} ms  "
+            f"max {values[-1] * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--hops", type=int, default=3, help="awaits between reading a line and handling it")
+    parser.add_argument("--redraw-ms", type=float, default=2.0, help="Tk time per frame without --tk")
+    parser.add_argument("--tk", action="store_true", help="run under a real Tk main loop")
+    args = parser.parse_args()
+
+    for name, engine_class in (("100ms tick", TickEngine), ("RudeEngine", RudeEngine)):
+        pongs, screen = measure(engine_class, args)
+        print(f"{name:<11} PING->PONG        {summary(pongs)}")
+        print(f"{name:<11} message-to-screen {summary(screen)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+format_decoder before and after the rewrite, on typical chat lines.
+
+old          the per-character decoder RudeChat had before, copied below
+new (cold)   the current decoder with its LRU cache cleared before each pass
+new (cached) the current decoder rendering the same lines again, as on a
+             channel switch or pop-out
+
+--check also compares old and new output (equal neighbouring segments
+merged) on random lines, the same comparison tests/format_decoder_golden.jsonl
+pins down.
+
+    PYTHONPATH=src python benchmarks/format_decoder.py
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from rudechat3.format_decoder import Attribute, decode_runs, decoder
+
+
+def old_decoder(input_text: str) -> List[Tuple[str, List[Attribute]]]:
+    output = []
+    current_text = ""
+    current_attributes = []
+    c_index = 0
+
+    while c_index < len(input_text):
+        c = input_text[c_index]
+        match c:
+            case '\x02':
+                if not any(attr.bold for attr in current_attributes):
+                    current_attributes.append(Attribute(bold=True))
+            case '\x1D':
+                if not any(attr.italic for attr in current_attributes):
+                    current_attributes.append(Attribute(italic=True))
+            case '\x1F':
+                if not any(attr.underline for attr in current_attributes):
+                    current_attributes.append(Attribute(underline=True))
+            case '\x1E':
+                if not any(attr.strikethrough for attr in current_attributes):
+                    current_attributes.append(Attribute(strikethrough=True))
+            case '\x16':
+                existing_colours = [attr for attr in current_attributes if attr.colour or attr.background]
+                if existing_colours:
+                    # Assuming there is at most one colour and background attribute at any time
+                    current_colour = existing_colours[0].colour
+                    current_background = existing_colours[0].background
+                    # Clear existing color and background
+                    current_attributes = [attr for attr in current_attributes if not (attr.colour or attr.background)]
+                    # Swap the colors
+                    current_attributes.append(Attribute(colour=current_background, background=current_colour))
+                else:
+                    # If no colors were set, default to swapping black (01) and white (00)
+                    current_attributes.append(Attribute(colour=1, background=0))
+            case '\x03':
+                current_attributes = []
+                colour_code = ''
+                background_code = ''
+                
+                # Extracting color code
+                digit_count = 0
+                while c_index + 1 < len(input_text) and input_text[c_index + 1].isdigit() and digit_count < 2:
+                    c_index += 1
+                    colour_code += input_text[c_index]
+                    digit_count += 1
+                
+                # Extracting background code
+                if c_index + 1 < len(input_text) and input_text[c_index + 1] == ',':
+                    c_index += 1
+                    digit_count = 0
+                    while c_index + 1 < len(input_text) and input_text[c_index + 1].isdigit() and digit_count < 2:
+                        c_index += 1
+                        background_code += input_text[c_index]
+                        digit_count += 1
+                
+                # Converting codes to integers
+                try:
+                    colour = int(colour_code)
+                    background = int(background_code) if background_code else 1
+                except ValueError:
+                    pass
+                else:
+                    new_attribute = Attribute(colour=colour, background=background)
+                    if new_attribute not in current_attributes:
+                        current_attributes.append(new_attribute)
+            case '\x0F':
+                current_attributes = []
+            case _:
+                current_text += c
+
+        # Check for the end of the string
+        if c_index == len(input_text) - 1:
+            current_attributes = []
+
+        if current_text:
+            output.append((current_text, list(current_attributes)))
+            current_text = ''
+
+        c_index += 1
+
+    return output
+
+
+def merged(output):
+    runs = []
+    for text, attributes in output:
+        if runs and runs[-1][1] == attributes:
+            runs[-1][0] += text
+        else:
+            runs.append([text, list(attributes)])
+    return runs
+
+
+def make_lines(count, seed=1):
+    random.seed(seed)
+    nicks = ["Rude", "@op", "+voice", "alice", "bob"]
+    words = "the quick brown fox jumps over a lazy dog https://example.org ünïcödé 😀".split()
+    lines = []
+    for number in range(count):
+        text = " ".join(random.choice(words) for _ in range(random.randint(4, 20)))
+        if number % 4 == 0:
+            text = f"\x0304,01{text}\x0F"
+        if number % 9 == 0:
+            text = f"\x02{text}\x02 \x1Ditalic\x1D"
+        lines.append(f"[12:00:{number % 60:02d}] <{random.choice(nicks)}> {text}\n")
+    return lines
+
+
+def time_pass(decode, lines, repeat, before=None):
+    best = float("inf")
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        for line in lines:
+            decode(line)
+        best = min(best, time.perf_counter() - start)
+    return best / len(lines) * 1e6
+
+
+def check(count):
+    atoms = ["a", "word ", "ü", "😀", " ", "\x02", "\x03", "\x0304", "\x034,5", "\x0312,", "\x03,7",
+             "\x0f", "\x16", "\x1d", "\x1e", "\x1f", "1", "23", ","]
+    random.seed(2)
+    for _ in range(count):
+        line = "".join(random.choice(atoms) for _ in range(random.randint(1, 40)))
+        if merged(old_decoder(line)) != merged(decoder(line)):
+            print(f"Mismatch: {line!r}")
+            return False
+    print(f"{count} random lines decode identically")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", type=int, default=0, metavar="N", help="also compare output on N random lines")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    old = time_pass(old_decoder, lines, args.repeat)
+    cold = time_pass(decoder, lines, args.repeat, before=decode_runs.cache_clear)
+    cached = time_pass(decoder, lines, args.repeat)
+    print(f"old           {old:7.2f} us/line")
+    print(f"new (cold)    {cold:7.2f} us/line  {old / cold:5.1f}x")
+    print(f"new (cached)  {cached:7.2f} us/line  {old / cached:5.1f}x")
+    old_segments = sum(len(old_decoder(line)) for line in lines) / len(lines)
+    new_segments = sum(len(decoder(line)) for line in lines) / len(lines)
+    print(f"segments per line (Tk inserts before the render queue): old {old_segments:.1f}, new {new_segments:.1f}")
+    if args.check and not check(args.check):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+replace_pronouns before and after the single-pattern rewrite, per line of
+a long paste.
+
+old   what RudeChat did before: read filtered_channels.txt, then one re.sub
+      per phrase and per pronoun, phrases first
+new   the current replace_pronouns
+
+Both run against the same filtered_channels.txt in a temporary directory,
+once for a filtered channel and once for a channel that is not filtered.
+
+--check also compares old and new output on random lines built from the
+table words, the comparison tests/test_pronouns.py runs on a smaller set.
+
+    PYTHONPATH=src python benchmarks/pronouns.py
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from rudechat3 import rude_pronouns
+from rudechat3.rude_pronouns import PHRASES, PRONOUNS, replace_pronouns
+
+# The old table had this entry as an f-string, its \b were backspaces
+OLD_PHRASES = {(f'\bher grandparent\b' if key == r'\bher grandparent\b' else key): value for key, value in PHRASES.items()}
+
+
+def old_replace_pronouns(text, channel=None):
+    active_channels = []
+    if os.path.exists(rude_pronouns.FILTERED_CHANNELS_PATH):
+        with open(rude_pronouns.FILTERED_CHANNELS_PATH, 'r') as file:
+            active_channels = [line.strip() for line in file.readlines()]
+
+    if channel and channel.lower() in active_channels:
+        for pattern, replacement in OLD_PHRASES.items():
+            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        for pattern, replacement in PRONOUNS.items():
+            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+
+def table_words():
+    words = set()
+    for pattern in list(PHRASES) + list(PRONOUNS):
+        words.update(pattern.replace(r'\b', '').replace("\\'", "'").split(" "))
+    return sorted(words)
+
+
+def make_lines(count, length, seed=1):
+    random.seed(seed)
+    words = table_words() + "the a and then said that really went home with".split()
+    lines = []
+    for _ in range(count):
+        line = []
+        while sum(len(word) + 1 for word in line) < length:
+            word = random.choice(words)
+            if random.random() < 0.2:
+                word = word.capitalize()
+            if random.random() < 0.1:
+                word += random.choice(",.!?")
+            line.append(word)
+        lines.append(" ".join(line))
+    return lines
+
+
+def per_line(function, lines, channel, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            function(line, channel)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lines", type=int, default=200, help="lines in the paste")
+    parser.add_argument("--length", type=int, default=275, help="characters per line")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", type=int, default=0, metavar="N", help="compare old and new on N random lines")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        rude_pronouns.FILTERED_CHANNELS_PATH = os.path.join(directory, "filtered_channels.txt")
+        with open(rude_pronouns.FILTERED_CHANNELS_PATH, "w") as file:
+            file.write("#filtered\n#other-filtered\n")
+
+        lines = make_lines(args.lines, args.length)
+        for channel in ("#filtered", "#elsewhere"):
+            old = per_line(old_replace_pronouns, lines, channel, args.repeat)
+            new = per_line(replace_pronouns, lines, channel, args.repeat)
+            print(f"{channel:<11} old {old * 1e6:8.1f} us/line  new {new * 1e6:7.1f} us/line  "
+                  f"paste of {args.lines}: {old * args.lines * 1000:7.1f} -> {new * args.lines * 1000:6.1f} ms")
+
+        if args.check:
+            differ = [line for line in make_lines(args.check, 80, seed=2)
+                      if old_replace_pronouns(line, "#filtered") != replace_pronouns(line, "#filtered")]
+            # Only the fixed "her grandparent" entry may differ
+            unexplained = [line for line in differ if "her grandparent" not in line.lower()]
+            print(f"check: {args.check} lines, {len(differ)} differ, {len(unexplained)} not explained by the her grandparent fix")
+            for line in unexplained[:5]:
+                print(f"  {line!r}\n    old {old_replace_pronouns(line, '#filtered')!r}\n    new {replace_pronouns(line, '#filtered')!r}")
+
+
+if __name__ == "__main__":
+    main()
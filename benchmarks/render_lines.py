@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+"""
+Render 10k chat lines into a Tk Text widget through the old per-line
+insert_text_widget and through the frame-batched render queue.
+
+The old path is the code RudeGui had before, copied here: trim, decode,
+one insert per formatting run, URL tagging chained through after(1) and a
+whole-widget highlight_nickname per line, as display_message called it.
+The new path is RudeGui's own insert_text_widget / flush_render_queue,
+run on a stand-in that has just the attributes those methods use. Both
+paths share the same decoder, so only the rendering differs.
+
+Needs a display and RudeChat's dependencies:
+
+    PYTHONPATH=src python benchmarks/render_lines.py
+"""
+import argparse
+import random
+import time
+import tkinter as tk
+
+from rudechat3.format_decoder import decoder
+from rudechat3.rude_gui import RudeGui
+from rudechat3.rude_tagger import RudeTagger, URL_PATTERN
+from rudechat3.rude_text_pages import TextPage
+
+
+class FakeClient:
+    nickname = "Rude"
+    mode_values = ["@", "+"]
+
+
+class Renderer:
+    """What the render methods need of a RudeGui."""
+    def __init__(self, root, text_widget):
+        self.master = root
+        self.text_widget = text_widget
+        self.irc_client = FakeClient()
+        self.irc_colors = {"00": "white", "01": "black", "03": "green", "04": "red", "12": "blue"}
+        self.font_family = "Hack"
+        self.font_size = 10
+        self.tag_cache = {}
+        self.url_cache = {}
+        self.nickname_colors = {}
+        self.generate_nickname_colors = True
+        self.main_fg_color = "#C0FFEE"
+        self.user_nickname_color = "#39ff14"
+        self.url_pattern = URL_PATTERN
+
+    # Shared by both paths
+    configure_tag_based_on_attributes = RudeGui.configure_tag_based_on_attributes
+    get_nickname_color = RudeGui.get_nickname_color
+    generate_random_color = RudeGui.generate_random_color
+    open_url = RudeGui.open_url
+    insert_and_scroll = RudeGui.insert_and_scroll
+
+
+class NewRenderer(Renderer):
+    def __init__(self, root, text_widget):
+        super().__init__(root, text_widget)
+        self.pending_render = []
+        self.render_job = None
+        self.render_interval = 16
+        self.tagger = RudeTagger(text_widget, self)
+        self.text_page = TextPage(text_widget, self.tagger)
+
+    insert_text_widget = RudeGui.insert_text_widget
+    flush_render_queue = RudeGui.flush_render_queue
+    drop_trimmed_messages = RudeGui.drop_trimmed_messages
+    get_attribute_tag = RudeGui.get_attribute_tag
+    trim_text_widget = RudeGui.trim_text_widget
+
+    def display(self, line):
+        self.insert_text_widget(line)
+
+    def busy(self):
+        return bool(self.pending_render) or self.render_job is not None
+
+
+class OldRenderer(Renderer):
+    """
+    RudeGui's rendering before the render queue. Unchanged apart from
+    counting URL chains, and nick colours coming from get_nickname_color.
+    """
+    def __init__(self, root, text_widget):
+        super().__init__(root, text_widget)
+        self.url_chains = 0
+
+    def display(self, line):
+        self.insert_text_widget(line)
+        self.highlight_nickname()
+
+    def busy(self):
+        return self.url_chains > 0
+
+    def insert_text_widget(self, message):
+        self.trim_text_widget()
+        urls = self.find_urls(message)
+        self.text_widget.config(state=tk.NORMAL)
+        formatted_text = decoder(message)
+        self.tag_text(formatted_text)
+        self.url_chains += 1
+        self.tag_urls(urls)
+
+    def tag_text(self, formatted_text):
+        for text, attributes in formatted_text:
+            tag_name = "_".join(str(attr) for attr in attributes)
+            if tag_name not in self.tag_cache:
+                tag_config = self.configure_tag_based_on_attributes(attributes)
+                self.text_widget.tag_configure(tag_name, **tag_config)
+                self.tag_cache[tag_name] = tag_config
+            self.text_widget.insert(tk.END, text, (tag_name,))
+
+    def tag_urls(self, urls, index=0):
+        if index < len(urls):
+            url = urls[index]
+            if url in self.url_cache:
+                tag_name = self.url_cache[url]
+            else:
+                tag_name = f"url_{url}"
+                self.url_cache[url] = tag_name
+                self.text_widget.tag_configure(tag_name, foreground="blue", underline=1)
+
+            start_idx = "1.0"
+            while True:
+                start_idx = self.text_widget.search(url, start_idx, tk.END)
+                if not start_idx:
+                    break
+                end_idx = f"{start_idx}+{len(url)}c"
+                self.text_widget.tag_add(tag_name, start_idx, end_idx)
+                self.text_widget.tag_bind(tag_name, "<Button-1>", lambda event, url=url: self.open_url(event, url))
+                start_idx = end_idx
+
+            self.text_widget.after(1, self.tag_urls, urls, index + 1)
+        else:
+            self.text_widget.config(state=tk.DISABLED)
+            self.insert_and_scroll()
+            self.url_chains -= 1
+
+    def find_urls(self, text):
+        return self.url_pattern.findall(text)
+
+    def trim_text_widget(self):
+        lines = self.text_widget.get("1.0", tk.END).split("\n")
+        if len(lines) > 125:
+            self.text_widget.config(state=tk.NORMAL)
+            self.text_widget.delete("1.0", f"{len(lines) - 125}.0")
+            self.text_widget.config(state=tk.DISABLED)
+
+    def highlight_nickname(self):
+        user_nickname = self.irc_client.nickname
+        self.text_widget.tag_configure("nickname", foreground=self.user_nickname_color)
+        start_idx = "1.0"
+        while True:
+            start_idx = self.text_widget.search(user_nickname, start_idx, stopindex=tk.END, regexp=True, nocase=True)
+            if not start_idx:
+                break
+            end_idx = self.text_widget.index(f"{start_idx}+{len(user_nickname)}c")
+            self.text_widget.tag_add("nickname", start_idx, end_idx)
+            start_idx = end_idx
+
+        start_idx = "1.0"
+        while True:
+            start_idx = self.text_widget.search('<', start_idx, stopindex=tk.END)
+            if not start_idx:
+                break
+            end_idx = self.text_widget.search('>', start_idx, f"{start_idx} lineend")
+            if end_idx:
+                end_idx = f"{end_idx}+1c"
+                nickname_with_brackets = self.text_widget.get(start_idx, end_idx)
+                nickname_color = self.get_nickname_color(nickname_with_brackets)
+                self.text_widget.tag_configure(f"nickname_{nickname_with_brackets}", foreground=nickname_color)
+                self.text_widget.tag_add(f"nickname_{nickname_with_brackets}", start_idx, end_idx)
+                start_idx = end_idx
+            else:
+                start_idx = f"{start_idx}+1c"
+
+
+def make_lines(count, seed=1):
+    random.seed(seed)
+    nicks = ["Rude", "@op", "+voice", "alice", "bob", "carol", "dave"]
+    words = "the quick brown fox jumps over a lazy dog while Rude watches".split()
+    lines = []
+    for number in range(count):
+        text = " ".join(random.choice(words) for _ in range(random.randint(4, 16)))
+        if number % 7 == 0:
+            text += " https://example.org/page/%d" % number
+        if number % 5 == 0:
+            text = f"\x0304{text}\x0F"
+        if number % 11 == 0:
+            text = f"\x02{text}\x02"
+        lines.append(f"[12:00:{number % 60:02d}] <{random.choice(nicks)}> {text}\n")
+    return lines
+
+
+def run(renderer_class, root, lines, per_frame):
+    text_widget = tk.Text(root, width=120, height=40)
+    text_widget.pack()
+    root.update()
+    renderer = renderer_class(root, text_widget)
+
+    start = time.perf_counter()
+    longest = 0.0
+    for first in range(0, len(lines), per_frame):
+        # One frame's worth of lines arrives, then Tk gets to run
+        frame_start = time.perf_counter()
+        for line in lines[first:first + per_frame]:
+            renderer.display(line)
+        root.update()
+        longest = max(longest, time.perf_counter() - frame_start)
+    while renderer.busy():
+        root.update()
+    elapsed = time.perf_counter() - start
+    text_widget.destroy()
+    return elapsed, longest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--per-frame", type=int, default=50, help="lines arriving between Tk updates")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    lines = make_lines(args.lines)
+    for name, renderer_class in (("old per-line", OldRenderer), ("render queue", NewRenderer)):
+        elapsed, longest = run(renderer_class, root, lines, args.per_frame)
+        print(f"{name:<13} {args.lines} lines  total {elapsed * 1000:8.1f} ms  "
+              f"{elapsed / args.lines * 1e6:7.1f} us/line  longest frame {longest * 1000:7.1f} ms")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import dataclasses
+import re
+from functools import lru_cache
 from typing import List, Tuple
 
 @dataclasses.dataclass(frozen=True)
@@ -7,65 +9,90 @@ class Attribute:
     italic: bool = False
     underline: bool = False
     strikethrough: bool = False
-    inverse: bool = False 
+    inverse: bool = False
     colour: int = 0
     background: int = 1
 
-def decoder(input_text: str) -> List[Tuple[str, List[Attribute]]]:
-    output = []
-    current_text = ""
-    current_attributes = []
-    c_index = 0
+BOLD = Attribute(bold=True)
+ITALIC = Attribute(italic=True)
+UNDERLINE = Attribute(underline=True)
+STRIKETHROUGH = Attribute(strikethrough=True)
+CONTROL_CODES = re.compile('[\x02\x03\x0F\x16\x1D\x1E\x1F]')
+
+def read_digits(input_text: str, position: int) -> Tuple[str, int]:
+    # Colour codes take at most two digits
+    end = position
+    while end < len(input_text) and end - position < 2 and input_text[end].isdigit():
+        end += 1
+    return input_text[position:end], end
+
+@lru_cache(maxsize=4096)
+def decode_runs(input_text: str) -> Tuple[Tuple[str, Tuple[Attribute, ...]], ...]:
+    """
+    Split a line into runs of text sharing the same attributes.
+    Attribute state is an immutable tuple so runs can be compared and cached.
+    """
+    runs = []
+    attributes = ()
+    length = len(input_text)
+    position = 0
+
+    def emit(text, state):
+        if runs and runs[-1][1] == state:
+            runs[-1][0].append(text)
+        else:
+            runs.append(([text], state))
+
+    while position < length:
+        match = CONTROL_CODES.search(input_text, position)
+        end = match.start() if match else length
+
+        if end > position:
+            text = input_text[position:end]
+            if end == length:
+                # Formatting is reset on the final character of the line
+                if len(text) > 1:
+                    emit(text[:-1], attributes)
+                emit(text[-1], ())
+            else:
+                emit(text, attributes)
 
-    while c_index < len(input_text):
-        c = input_text[c_index]
-        match c:
+        if not match:
+            break
+
+        code = match.group()
+        position = match.end()
+        match code:
             case '\x02':
-                if not any(attr.bold for attr in current_attributes):
-                    current_attributes.append(Attribute(bold=True))
+                if not any(attr.bold for attr in attributes):
+                    attributes += (BOLD,)
             case '\x1D':
-                if not any(attr.italic for attr in current_attributes):
-                    current_attributes.append(Attribute(italic=True))
+                if not any(attr.italic for attr in attributes):
+                    attributes += (ITALIC,)
             case '\x1F':
-                if not any(attr.underline for attr in current_attributes):
-                    current_attributes.append(Attribute(underline=True))
+                if not any(attr.underline for attr in attributes):
+                    attributes += (UNDERLINE,)
             case '\x1E':
-                if not any(attr.strikethrough for attr in current_attributes):
-                    current_attributes.append(Attribute(strikethrough=True))
+                if not any(attr.strikethrough for attr in attributes):
+                    attributes += (STRIKETHROUGH,)
             case '\x16':
-                existing_colours = [attr for attr in current_attributes if attr.colour or attr.background]
+                existing_colours = [attr for attr in attributes if attr.colour or attr.background]
                 if existing_colours:
-                    # Assuming there is at most one colour and background attribute at any time
+                    # Swap the first colour pair and drop the rest
                     current_colour = existing_colours[0].colour
                     current_background = existing_colours[0].background
-                    # Clear existing color and background
-                    current_attributes = [attr for attr in current_attributes if not (attr.colour or attr.background)]
-                    # Swap the colors
-                    current_attributes.append(Attribute(colour=current_background, background=current_colour))
+                    attributes = tuple(attr for attr in attributes if not (attr.colour or attr.background))
+                    attributes += (Attribute(colour=current_background, background=current_colour),)
                 else:
                     # If no colors were set, default to swapping black (01) and white (00)
-                    current_attributes.append(Attribute(colour=1, background=0))
+                    attributes += (Attribute(colour=1, background=0),)
             case '\x03':
-                current_attributes = []
-                colour_code = ''
+                attributes = ()
+                colour_code, position = read_digits(input_text, position)
                 background_code = ''
-                
-                # Extracting color code
-                digit_count = 0
-                while c_index + 1 < len(input_text) and input_text[c_index + 1].isdigit() and digit_count < 2:
-                    c_index += 1
-                    colour_code += input_text[c_index]
-                    digit_count += 1
-                
-                # Extracting background code
-                if c_index + 1 < len(input_text) and input_text[c_index + 1] == ',':
-                    c_index += 1
-                    digit_count = 0
-                    while c_index + 1 < len(input_text) and input_text[c_index + 1].isdigit() and digit_count < 2:
-                        c_index += 1
-                        background_code += input_text[c_index]
-                        digit_count += 1
-                
+                if position < length and input_text[position] == ',':
+                    background_code, position = read_digits(input_text, position + 1)
+
                 # Converting codes to integers
                 try:
                     colour = int(colour_code)
@@ -73,22 +100,11 @@ def decoder(input_text: str) -> List[Tuple[str, List[Attribute]]]:
                 except ValueError:
                     pass
                 else:
-                    new_attribute = Attribute(colour=colour, background=background)
-                    if new_attribute not in current_attributes:
-                        current_attributes.append(new_attribute)
+                    attributes = (Attribute(colour=colour, background=background),)
             case '\x0F':
-                current_attributes = []
-            case _:
-                current_text += c
-
-        # Check for the end of the string
-        if c_index == len(input_text) - 1:
-            current_attributes = []
+                attributes = ()
 
-        if current_text:
-            output.append((current_text, list(current_attributes)))
-            current_text = ''
+    return tuple(("".join(pieces), state) for pieces, state in runs)
 
-        c_index += 1
-
-    return output
+def decoder(input_text: str) -> List[Tuple[str, List[Attribute]]]:
+    return [(text, list(attributes)) for text, attributes in decode_runs(input_text)]
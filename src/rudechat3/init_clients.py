@@ -11,16 +11,30 @@ async def initialize_clients(app):
         print("No .rude configuration files found.")
         return
 
-    for i, config_file in enumerate(config_files):
-        try:
-            await app.init_client_with_config(config_file, f'Server_{i+1}')
-        except OSError as e:
-            print(f"An unexpected OS error occurred: {str(e)}")
-        except Exception as e:
-            print(f"Failed to connect to Server_{i+1} due to {e}. Proceeding to the next server.")
+    # Servers connect side by side, a slow or dead network only holds up its own slot
+    semaphore = asyncio.Semaphore(max(1, getattr(app, "max_connecting", 4)))
+    shown = False
+
+    async def start_client(i, config_file):
+        nonlocal shown
+        async with semaphore:
+            try:
+                server_name = await app.init_client_with_config(config_file, f'Server_{i+1}')
+            except OSError as e:
+                print(f"An unexpected OS error occurred: {str(e)}")
+                return
+            except Exception as e:
+                print(f"Failed to connect to Server_{i+1} due to {e}. Proceeding to the next server.")
+                return
+
+        # Show the first server that is ready instead of waiting for all of them
+        if server_name and not shown:
+            shown = True
+            app.select_server(server_name)
+
+    await asyncio.gather(*(start_client(i, config_file) for i, config_file in enumerate(config_files)))
 
     # Update the Listbox with the new list of servers
-    if app.server_listbox.size() > 0:
+    if not shown and app.server_listbox.size() > 0:
         first_server = app.server_listbox.get(0)
-        app.server_var.set(first_server)
-        app.on_server_change(None)
+        app.select_server(first_server.split(" ")[0])
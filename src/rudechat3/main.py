@@ -24,6 +24,8 @@ from rudechat3.rude_gui import RudeGui
 from rudechat3.rude_client import RudeChatClient
 # Import Initializer
 from rudechat3.init_clients import initialize_clients
+# Import Engine
+from rudechat3.rude_engine import RudeEngine
 # Everything else.
 from rudechat3.shared_imports import *
 
@@ -32,33 +34,12 @@ def main():
     if first_run.first_run_detect == 0:
         first_run.open_client_config_window()
 
-        root = tk.Tk()
-        app = RudeGui(root)
+    root = tk.Tk()
+    app = RudeGui(root)
 
-        new_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(new_loop)
+    engine = RudeEngine(root)
+    engine.start(initialize_clients(app))
 
-        loop = asyncio.get_event_loop()
-        loop.create_task(initialize_clients(app))
-    else:
-        root = tk.Tk()
-        app = RudeGui(root)
-
-        new_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(new_loop)
-
-        loop = asyncio.get_event_loop()
-        loop.create_task(initialize_clients(app))
-
-    def tk_update():
-        try:
-            loop.stop()
-            loop.run_forever()
-        finally:
-            loop.stop()
-            root.after(100, tk_update)
-
-    root.after(100, tk_update)
     root.mainloop()
 
 if __name__ == '__main__':
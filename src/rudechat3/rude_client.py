@@ -3,6 +3,22 @@ from rudechat3.list_window import ChannelListWindow
 from rudechat3.rude_pronouns import replace_pronouns
 from rudechat3.rude_auto_away import AutoAway
 from rudechat3.rude_friends import RudeFriends
+from rudechat3.rude_line_framer import LineFramer
+from rudechat3.rude_dispatch import DispatchRegistry, WELCOME, CONNECTED
+from rudechat3.rude_history import HistoryStore
+from rudechat3.rude_members import MembershipIndex
+from rudechat3.rude_history_db import HistoryDatabase
+from rudechat3.rude_log_writer import log_writer
+from rudechat3.rude_log_search import log_index
+from rudechat3.rude_send_queue import SendQueue, URGENT, BULK
+from rudechat3.rude_reconnect import Backoff
+from rudechat3.rude_who_scheduler import WhoScheduler, WHO_TOKEN, WHOX_FIELDS
+from rudechat3.rude_notifier import BEEP, CUSTOM
+from rudechat3.rude_highlight import HighlightEngine
+from rudechat3.rude_ignore import IgnoreMatcher
+from rudechat3.rude_multiline import MultilineBatches, MULTILINE
+from rudechat3.rude_splitter import line_budget, split_message
+from rudechat3.rude_welcome import WelcomeState
 from rudechat3.shared_imports import *
 from rudechat3.rude_logger import configure_logging
 
@@ -16,6 +32,9 @@ class RudeChatClient:
         self.script_directory = os.path.dirname(os.path.abspath(__file__))
         self.nicknamelen = 0
         self.chan_limit = 0
+        self.chanlimits = {}
+        self.targmax = {}
+        self.channel_keys = {}
         self.channellen = 0
         self.topiclen = 0
         self.current_channel = ''
@@ -31,9 +50,9 @@ class RudeChatClient:
         self.cap_who_for_chan = []
         self.away_servers = []
         self.motd_dict = {}
-        self.channel_messages = {}
-        self.channel_users = {}
-        self.user_modes = {}
+        self.history = HistoryStore()
+        self.history_db = None
+        self.members = MembershipIndex()
         self.mode_to_symbol = {}
         self.whois_data = {}
         self.download_channel_list = {}
@@ -47,13 +66,28 @@ class RudeChatClient:
         self.away_notified = set()
         self.decoder = irctokens.StatefulDecoder()
         self.encoder = irctokens.StatefulEncoder()
+        self.framer = LineFramer()
+        self.dispatcher = DispatchRegistry()
+        self.welcome = WelcomeState()
         self.config = ''
         self.reader = None
         self.writer = None
+        self.send_queue = SendQueue(on_error=self.report_send_error)
         self.ping_start_time = None
         self.who_user_request = False
         self.isupport_flag = False
         self.loop_running = True
+        self.registered = False
+        self.backoff = Backoff()
+        self.who_scheduler = WhoScheduler()
+        self.highlights = HighlightEngine(self.members.fold)
+        self.ignores = IgnoreMatcher(self.members.fold)
+        self.whox = False
+        self.own_userhost = None
+        self.offered_caps = {}
+        self.multiline = None
+        self.batch_ref = 0
+        self.multiline_batches = MultilineBatches()
         self.away_notify = False
         self.extended_join = False
         self.account_notify = False
@@ -62,6 +96,8 @@ class RudeChatClient:
         self.time_zone = get_localzone()
         configure_logging()
         self.friends = RudeFriends()
+        self.register_handlers()
+        self.register_welcome_handlers()
 
     async def read_config(self, config_file):
         config = configparser.ConfigParser()
@@ -96,12 +132,25 @@ class RudeChatClient:
         self.auto_whois = config.getboolean('IRC', 'auto_whois', fallback=True)
         self.custom_sounds = config.getboolean('IRC', 'custom_sounds', fallback=False)
         self.use_logging = config.getboolean('IRC', 'use_logging', fallback=True)
+        self.log_per_day = config.getboolean('IRC', 'log_per_day', fallback=False)
+        self.send_queue.burst = config.getint('IRC', 'send_burst', fallback=5)
+        self.send_queue.rate = config.getfloat('IRC', 'send_rate', fallback=2.5)
+        self.who_scheduler.interval = config.getint('IRC', 'who_interval', fallback=300)
+        self.highlights.configure(
+            HighlightEngine.split_words(config.get('IRC', 'highlight_words', fallback='')),
+            HighlightEngine.split_words(config.get('IRC', 'nick_aliases', fallback='')),
+            HighlightEngine.parse_channel_words(config.get('IRC', 'channel_highlights', fallback='')),
+            HighlightEngine.split_words(config.get('IRC', 'highlight_ignore', fallback='')),
+        )
+        self.use_multiline = config.getboolean('IRC', 'use_multiline', fallback=True)
         self.replace_pronouns = config.getboolean('IRC', 'replace_pronouns', fallback=False)
         self.send_ctcp_response = config.getboolean('IRC', 'send_ctcp_response', fallback=True)
         self.green_text = config.getboolean('IRC', 'green_text', fallback=True)
         self.auto_join_invite = config.getboolean('IRC', 'auto_join_invite', fallback=True)
         self.log_on = config.getboolean('IRC', 'log_on', fallback=False)
         await self.load_channel_messages()
+        if self.use_logging:
+            log_index.start()
         self.load_away_users_from_file()
         self.load_ignore_list()
         self.gui.update_nick_channel_label()
@@ -124,6 +173,17 @@ class RudeChatClient:
         self.auto_whois = config.getboolean('IRC', 'auto_whois', fallback=True)
         self.custom_sounds = config.getboolean('IRC', 'custom_sounds', fallback=False)
         self.use_logging = config.getboolean('IRC', 'use_logging', fallback=True)
+        self.log_per_day = config.getboolean('IRC', 'log_per_day', fallback=False)
+        self.send_queue.burst = config.getint('IRC', 'send_burst', fallback=5)
+        self.send_queue.rate = config.getfloat('IRC', 'send_rate', fallback=2.5)
+        self.who_scheduler.interval = config.getint('IRC', 'who_interval', fallback=300)
+        self.highlights.configure(
+            HighlightEngine.split_words(config.get('IRC', 'highlight_words', fallback='')),
+            HighlightEngine.split_words(config.get('IRC', 'nick_aliases', fallback='')),
+            HighlightEngine.parse_channel_words(config.get('IRC', 'channel_highlights', fallback='')),
+            HighlightEngine.split_words(config.get('IRC', 'highlight_ignore', fallback='')),
+        )
+        self.use_multiline = config.getboolean('IRC', 'use_multiline', fallback=True)
         self.use_colors = config.getboolean('IRC', 'use_irc_colors', fallback=False)
         self.replace_pronouns = config.getboolean('IRC', 'replace_pronouns', fallback=False)
         self.display_user_modes = config.getboolean('IRC', 'display_user_modes', fallback=True)
@@ -172,64 +232,57 @@ class RudeChatClient:
                 logging.error(f"Error deleting {lock_file}: {e}")
 
     async def load_channel_messages(self):
-        file_path = os.path.join(self.script_directory, f'channel_messages_{self.server_name}.json')
+        if self.history_db is None:
+            self.history_db = HistoryDatabase(
+                os.path.join(self.script_directory, f'channel_history_{self.server_name}.db'),
+                legacy_json_path=os.path.join(self.script_directory, f'channel_messages_{self.server_name}.json'),
+                keep_messages=self.history.max_messages
+            )
         try:
-            async with aiofiles.open(file_path, 'r') as file:
-                file_content = await file.read()
-                if file_content:
-                    self.channel_messages = json.loads(file_content)
-                else:
-                    self.channel_messages = {}
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.channel_messages = {}
+            rows = await asyncio.to_thread(self.history_db.load_recent)
+            self.history.load_records(rows)
+        except Exception as e:
+            logging.error(f"Error occurred while loading channel messages: {e}")
 
     async def save_channel_messages(self):
-        file_path = os.path.join(self.script_directory, f'channel_messages_{self.server_name}.json')
-        lock_file_path = os.path.join(self.script_directory, f'channel_messages_{self.server_name}.lock')
-
+        """
+        Append the history changes made since the last save. The write runs
+        in a worker thread; if it fails the batch is queued again.
+        """
+        if self.history_db is None:
+            return
+        pending = self.history.take_pending()
+        if not pending:
+            return
         try:
-            # Acquire the lock
-            while os.path.exists(lock_file_path):
-                await asyncio.sleep(0.1)  # Wait for the lock to be released
-
-            async with aiofiles.open(lock_file_path, 'w') as lock_file:
-                await lock_file.write("locked")
-
-            # Read existing data
-            existing_messages = {}
-            if os.path.exists(file_path):
-                try:
-                    async with aiofiles.open(file_path, 'r') as file:
-                        existing_messages = json.loads(await file.read())
-                except json.JSONDecodeError:
-                    logging.error("JSON decode error occurred, initializing with an empty dictionary.")
-                    existing_messages = {}
-
-            # Update existing data with new channel messages
-            existing_messages.update(self.channel_messages)
-
-            # Write the updated data back to the file
-            async with aiofiles.open(file_path, 'w') as file:
-                await file.write(json.dumps(existing_messages, indent=2))
-
+            await asyncio.to_thread(self.history_db.write, pending)
         except Exception as e:
             logging.error(f"Error occurred while saving channel messages: {e}")
-
-        finally:
-            # Release the lock
-            try:
-                os.remove(lock_file_path)
-            except Exception as e:
-                logging.error(f"Error occurred while removing lock file: {e}")
+            self.history.pending[:0] = pending
 
     async def connect(self, config_file):
         await self.connect_to_server(config_file)
+        if self.writer is None:
+            return
         await self.send_initial_commands()
         await self.wait_for_welcome(config_file)
 
     async def connect_to_server(self, config_file):
         TIMEOUT = 256  # seconds
-        self.gui.insert_text_widget(f'Connecting to server: {self.server}:{self.port}\n')
+        # Lines queued for a previous connection are not replayed on this one
+        self.send_queue.stop()
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+        self.registered = False
+        # Announced again in the new ISUPPORT
+        self.whox = False
+        self.own_userhost = None
+        self.offered_caps = {}
+        self.multiline = None
+        self.multiline_batches.reset()
+        self.insert_startup_text(f'Connecting to server: {self.server}:{self.port}\n')
         self.gui.highlight_nickname()
 
         try:
@@ -256,15 +309,19 @@ class RudeChatClient:
                     timeout=TIMEOUT
                 )
 
+            # Fresh connection, drop any partial line left from the last one
+            self.framer.reset()
+            self.send_queue.start(self.writer)
+
             if self.znc_connection:
                 await self.send_message(f'PASS {self.znc_password}')
 
         except asyncio.TimeoutError:
-            self.gui.insert_text_widget(f"Connection timeout. Please try again later.\n")
+            self.insert_startup_text(f"Connection timeout. Please try again later.\n")
             logging.error(f"Connection timeout. Please try again later.")
 
     async def send_initial_commands(self):
-        self.gui.insert_text_widget(f'Sent client registration commands.\n')
+        self.insert_startup_text(f'Sent client registration commands.\n')
 
         # Start capability negotiation
         await self.send_message('CAP LS 302')
@@ -293,7 +350,7 @@ class RudeChatClient:
         else:
             self.motd_dict[self.server_name] = full_motd + "\n"
 
-        self.gui.insert_text_widget(f"Message of the Day:\n{full_motd}\n")
+        self.insert_startup_text(f"Message of the Day:\n{full_motd}\n")
         self.motd_lines.clear()
             
     async def wait_for_welcome(self, config_file):
@@ -306,17 +363,17 @@ class RudeChatClient:
 
     def handle_connection_info(self, tokens):
         connection_info = tokens.params[-1]  # Assumes the connection info is the last parameter
-        self.gui.insert_text_widget(f"Server Info: {connection_info}\n")
+        self.insert_startup_text(f"Server Info: {connection_info}\n")
 
     def handle_global_users_info(self, tokens):
         global_users_info = tokens.params[-1]  # Assumes the global users info is the last parameter
-        self.gui.insert_text_widget(f"Server Users Info: {global_users_info}\n")
+        self.insert_startup_text(f"Server Users Info: {global_users_info}\n")
 
     async def handle_nickname_conflict(self, tokens):
         new_nickname = self.nickname + str(random.randint(1, 99))
         await self.send_message(f'NICK {new_nickname}')
         self.nickname = new_nickname
-        self.gui.insert_text_widget(f"Nickname already in use. Changed nickname to: {self.nickname}\n")
+        self.insert_startup_text(f"Nickname already in use. Changed nickname to: {self.nickname}\n")
 
     async def initial_ping(self, tokens):
         ping_param = tokens.params[0]
@@ -324,28 +381,58 @@ class RudeChatClient:
 
     async def automatic_join(self):
         if self.use_auto_join:
-            for channel in self.auto_join_channels:
-                await self.join_channel(channel)
-                await asyncio.sleep(0.1)
+            # Entries are "#channel" or "#channel key"
+            entries = [entry.strip().split(" ", 1) for entry in self.auto_join_channels if entry.strip()]
+            # Channels kept across a reconnect are left to rejoin_channels
+            await self.join_channels([
+                (entry[0], entry[1].strip() if len(entry) > 1 else None)
+                for entry in entries if entry[0] not in self.joined_channels
+            ])
 
     async def request_who_for_all_channels(self):
+        """
+        Poll WHO for every joined channel, one at a time, to learn away
+        states and accounts. With away-notify the server reports changes
+        afterwards and one round is enough, without it the rounds repeat
+        every who_interval seconds.
+        """
+        scheduler = self.who_scheduler
         await asyncio.sleep(4)
-        while True:
-            for channel in self.joined_channels:
-                if not self.away_notify:
-                    self.gui.highlight_away_users()
-                    self.cap_who_for_chan.append(channel)
-                    self.gui.highlight_who_channels()
-                    break
-                if self.account_notify:
-                    await self.send_message(f"WHO {channel} %nuhsrcdfa")
+        while self.loop_running:
+            try:
+                if self.writer is None or not self.registered:
+                    await asyncio.sleep(5)
+                    continue
+
+                channel = scheduler.next_channel(
+                    [channel for channel in self.joined_channels if self.is_valid_channel(channel)],
+                    self.channel_on_screen, self.members.count)
+                if channel is None:
+                    await scheduler.wait_for_round(repeat=not self.away_notify and scheduler.interval > 0)
+                    continue
+
+                await scheduler.wait_for_budget(self.send_queue)
+                scheduler.done.add(channel)
+                reply = scheduler.expect(self.members.fold(channel))
+                if self.whox:
+                    await self.send_message(f"WHO {channel} %{WHOX_FIELDS},{WHO_TOKEN}")
                 else:
                     await self.send_message(f"WHO {channel}")
+                try:
+                    await asyncio.wait_for(reply, scheduler.timeout)
+                except asyncio.TimeoutError:
+                    scheduler.finished(self.members.fold(channel))
+                    logging.warning(f"No end of WHO for {channel} within {scheduler.timeout} seconds")
+
+                if channel not in self.cap_who_for_chan:
+                    self.cap_who_for_chan.append(channel)
                 self.gui.highlight_away_users()
-                self.cap_who_for_chan.append(channel)
-                await asyncio.sleep(8.5)
                 self.gui.highlight_who_channels()
-            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error in request_who_for_all_channels: {e}")
+                await asyncio.sleep(5)
 
     async def auto_topic_nicklist(self):
         for channel in self.auto_join_channels:
@@ -354,7 +441,7 @@ class RudeChatClient:
                 if len(self.gui.channel_topics.get(self.server, {}).get(channel, [])) < 10:
                     await self.send_message(f"TOPIC {channel}")
                 # Check if names list is empty
-                if len(self.channel_users.get(channel, [])) < 10:
+                if self.members.count(channel) < 10:
                     await self.send_message(f"NAMES {channel}")
 
     def server_message_handler(self, tokens):
@@ -375,14 +462,9 @@ class RudeChatClient:
             self.handle_join(tokens)
             return
 
-        # Check if the server entry exists
-        if self.server not in self.channel_messages:
-            self.channel_messages[self.server] = {}
+        # Make sure the channel has a history entry
+        self.history.target(self.server, channel)
 
-        # Add the channel entry if it doesn't exist
-        if channel not in self.channel_messages[self.server]:
-            self.channel_messages[self.server][channel] = []
-            
         # Check if the channel is already in the list of joined channels
         if channel not in self.joined_channels:
             self.joined_channels.append(channel)
@@ -390,321 +472,295 @@ class RudeChatClient:
             self.update_gui_channel_list()
 
     async def _await_welcome_message(self):
-        self.gui.insert_text_widget(f'Waiting for welcome message from the server.\n')
-        buffer = ""
-        sync = True
-        received_001 = False
-        motd_received = False
-        sasl_authenticated = False
-        logged_in = False
-        nickserv_sent = False
-        got_396 = False
-        znc_connected = False
-        count_366 = 0
-        got_topic = 0
-        last_366_time = None
-        TIMEOUT_SECONDS = 0.2
+        self.insert_startup_text(f'Waiting for welcome message from the server.\n')
+        self.welcome = WelcomeState()
         MAX_WAIT_TIME = 60
-        PRIVMSGTOKENS = []
-        NAMESTOKENS = []
-        TOPICTOKENS = []
 
         start_time = asyncio.get_event_loop().time()
 
-        async def insert_processing_symbols(PRIVMSGTOKENS):
-            symbol_list = ['░', '▒', '▓', '█']
-            num_tokens = len(PRIVMSGTOKENS)
-            block_thresholds = [num_tokens // len(symbol_list) * (i + 1) for i in range(len(symbol_list))]
-
-            self.gui.insert_text_widget(f'\n\x0307\x02Processing Tokens: \x0F')
-            for i, tokens in enumerate(PRIVMSGTOKENS):
-                for j, threshold in enumerate(block_thresholds):
-                    if i < threshold:
-                        self.gui.insert_text_widget(f'\x0303{symbol_list[j]}\x0F')
-                        break
-                await self.handle_privmsg(tokens, znc_privmsg=True)
-            self.gui.insert_text_widget(f'\n\x0303\x02DONE!\x0F\n')
-            await self.send_message('CAP REQ :away-notify')
-            await self.send_message('CAP REQ :account-notify')
-            await self.send_message('CAP REQ :extended-join')
-            await self.send_message("AWAY")
-            await asyncio.sleep(0.8)
-            self.gui.clear_text_widget()
-            self.gui.show_startup_art()
-
-        def reset_timer(symbol):
-            nonlocal last_366_time
-            nonlocal sync
-            if not self.use_auto_join:
-                last_366_time = time.time()
-                if motd_received:
-                    if sync:
-                        self.gui.insert_text_widget(f'\x0307\x02Syncing with ZNC:\x0F ')
-                        sync = False
-                    else:
-                        self.gui.insert_text_widget(f'\x0303\x02{symbol}\x0F')
-
-        def check_timeout():
-            nonlocal last_366_time
-            if not self.use_auto_join:
-                if last_366_time is None:
-                    return False
-                return time.time() - last_366_time > TIMEOUT_SECONDS
-
         while True:
             data = await self.reader.read(4096)
             if not data:
                 raise ConnectionError("Connection lost while waiting for the welcome message.")
 
-            decoded_data = data.decode('UTF-8', errors='ignore')
-            buffer += decoded_data
-            while '\r\n' in buffer:
-                line, buffer = buffer.split('\r\n', 1)
+            self.framer.feed(data)
+            for line in self.framer.lines():
+                if not line:
+                    continue
+                if self.welcome_sync_timed_out() and self.znc_connection:
+                    # The playback is over, this line belongs to normal operation
+                    await self.finish_znc_sync()
+                    await self.handle_incoming_line(line)
+                    return
+
                 tokens = irctokens.tokenise(line)
-                if check_timeout():
-                    # Timeout occurred
-                    if self.znc_connection:
-                        for token in TOPICTOKENS:
-                            self.handle_topic(token)
-                        for tokens in NAMESTOKENS:
-                            self.handle_names_list(tokens)
-                        await insert_processing_symbols(PRIVMSGTOKENS)
-                        return
-
-                match tokens.command:
-                    case "ACCOUNT":
-                        self.handle_account_message(tokens)
-                    case "AWAY":
-                        self.handle_away(tokens)
-                    case "NOTICE":
-                        if self.handle_notice_message(tokens):
-                            if self.use_auto_join:
-                                await self.automatic_join()
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-                            elif not self.use_auto_join:
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-                    case "CAP":
-                        await self.handle_cap(tokens)
-
-                    case "AUTHENTICATE":
-                        self.gui.insert_text_widget("Handling AUTHENTICATE message\n")
-                        await self.handle_sasl_auth(tokens)
-
-                    case "903":
-                        self.gui.insert_text_widget("Handling SASL successful message\n")
-                        await self.handle_sasl_successful()
-                        sasl_authenticated = True
-                        if logged_in and sasl_authenticated and self.isupport_flag and motd_received:
-                            if self.use_auto_join:
-                                await self.automatic_join()
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-                            elif not self.use_auto_join:
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-
-                    case "904":
-                        self.gui.insert_text_widget("Handling SASL failed message\n")
-                        self.handle_sasl_failed()
-
-                    case "001":
-                        if self.znc_connection:
-                            reset_timer("")
-                        self.gui.insert_text_widget(f'Connected to the server: {self.server}:{self.port}\n')
-                        received_001 = True
-                        self.gui.insert_and_scroll()
-                    case "002" | "003" | "004":
-                        if self.znc_connection:
-                            reset_timer("")
-                        self.server_message_handler(tokens)
-                    case "005":
-                        if self.znc_connection:
-                            reset_timer("")
-                        self.handle_isupport(tokens)
-                        self.isupport_flag = True
-                        self.gui.insert_and_scroll()
-
-                    case "251" | "252" | "253" | "254" | "255" | "265":
-                        self.server_message_handler(tokens)
-                        reset_timer("")
-                    case "311" | "312" | "313" | "317" | "319" | "301" | "671" | "338" | "318" | "330":
-                        await self.handle_whois_replies(tokens.command, tokens)
-                        reset_timer("")
-                    case "PART":
-                        self.handle_part(tokens)
-                    case "QUIT":
-                        self.handle_quit(tokens)
-                    case "NICK":
-                        zncnick = 0
-                        if self.znc_connection and self.nickname != tokens.hostmask.nickname and zncnick == 0:
-                            new_nick = tokens.params[0]
-                            await self.change_nickname(new_nick, is_from_token=True)
-                            self.away_clean()
-                            zncnick += 1
-                        else:
-                            await self.handle_nick(tokens)
-                    case "JOIN":
-                        if self.znc_connection:
-                            self.join_znc_channel(tokens)
-                            reset_timer("#")
-                    case "PRIVMSG":
-                        if self.znc_connection:
-                            PRIVMSGTOKENS.append(tokens)
-                            reset_timer("")
-                        else:
-                            await self.handle_privmsg(tokens)
-
-                    case "MODE":
-                        self.handle_mode(tokens)
-                    case "305" | "306":
-                        pass
-                    case "328":
-                        self.handle_328(tokens)
-
-                    case "332" | "333" | "TOPIC":
-                        got_topic += 1
-                        if not self.use_auto_join:
-                            TOPICTOKENS.append(tokens)
-                            reset_timer("")
-                        else:
-                            self.handle_topic(tokens)
-
-                    case "353":  # NAMES list
-                        if not self.use_auto_join:
-                            NAMESTOKENS.append(tokens)
-                            reset_timer("")
-                        else:
-                            self.handle_names_list(tokens)
-                                
-                    case "366":  # End of NAMES list
-                        count_366 += 1
-                        if not self.use_auto_join:
-                            NAMESTOKENS.append(tokens)
-                            reset_timer("")
-                        elif self.use_auto_join:
-                            self.handle_names_list(tokens)
-                            if count_366 >= len(self.joined_channels) and got_topic >= len(self.joined_channels) and znc_connected:
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-
-                    case "250":
-                        self.handle_connection_info(tokens)
-
-                    case "266":
-                        self.handle_global_users_info(tokens)
-
-                    case "433":
-                        await self.handle_nickname_conflict(tokens)
-
-                    case "372":
-                        if self.znc_connection:
-                            reset_timer("")
-                        self.handle_motd_line(tokens)
-
-                    case "375":
-                        if self.znc_connection:
-                            reset_timer("")
-                        self.handle_motd_start(tokens)
-
-                    case "376":
-                        self.handle_motd_end(tokens)
-                        motd_received = True
-                        if not self.use_nickserv_auth and not self.sasl_enabled and not self.znc_connection:
-                            if self.use_auto_join:
-                                await self.automatic_join()
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-                            elif not self.use_auto_join:
-                                return
-                        elif self.znc_connection and self.isupport_flag and not self.sasl_enabled and not self.use_nickserv_auth:
-                            if self.use_auto_join:
-                                await self.automatic_join()
-                                znc_connected = True
-                                reset_timer("")
-                            elif not self.use_auto_join:
-                                znc_connected = True
-                                reset_timer("")
-                        elif sasl_authenticated and self.isupport_flag and not self.znc_connection:
-                            if self.use_auto_join:
-                                await self.automatic_join()
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-                            elif not self.use_auto_join:
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-                        elif self.use_nickserv_auth and not self.sasl_enabled and not self.znc_connection:
-                            await self.send_message(f'PRIVMSG NickServ :IDENTIFY {self.nickname} {self.nickserv_password}\r\n')
-                            self.gui.insert_text_widget(f"Sent NickServ authentication.\n")
-                            nickserv_sent = True
-
-                    case "PING":
-                        await self.initial_ping(tokens)
-
-                    case "900":
-                        logged_in = True
-                        if self.use_nickserv_auth and logged_in and nickserv_sent and not self.sasl_enabled:
-                            if self.use_auto_join:
-                                await self.automatic_join()
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-                            elif not self.use_auto_join:
-                                await self.send_message("AWAY")
-                                self.gui.clear_text_widget()
-                                self.gui.show_startup_art()
-                                return
-
-                    case "396":
-                        got_396 = True
-
-                    case _:
-                        if self.log_on:
-                            logging.info(f"Unhandled Token command in _await_welcome_message: {tokens.command}. Token: {tokens}")
-                        self.gui.insert_and_scroll()
-
-                if check_timeout():
-                    # Timeout occurred
-                    if self.znc_connection:
-                        for token in TOPICTOKENS:
-                            self.handle_topic(token)
-                        for tokens in NAMESTOKENS:
-                            self.handle_names_list(tokens)
-                        await insert_processing_symbols(PRIVMSGTOKENS)
-                        return
+                if self.multiline_batches.collect(tokens):
+                    continue
+                if not await self.dispatcher.dispatch(tokens, WELCOME):
+                    if self.log_on:
+                        logging.info(f"Unhandled Token command in _await_welcome_message: {tokens.command}. Token: {tokens}")
+                    self.gui.insert_and_scroll()
+
+                if self.welcome.done:
+                    return
+
+                if self.welcome_sync_timed_out() and self.znc_connection:
+                    await self.finish_znc_sync()
+                    return
 
             # Check for overall timeout
             elapsed_time = asyncio.get_event_loop().time() - start_time
             if elapsed_time > MAX_WAIT_TIME:
+                self.insert_startup_text("\nMaximum sync time exceeded\n")
                 if self.znc_connection:
-                    self.gui.insert_text_widget("\nMaximum sync time exceeded\n")
-                    for token in TOPICTOKENS:
-                        self.handle_topic(token)
-                    for token in NAMESTOKENS:
-                        self.handle_names_list(token)
-                    await insert_processing_symbols(PRIVMSGTOKENS)
-                    return
-                else:
-                    gui.insert_text_widget("\nMaximum sync time exceeded\n")
-                    return
+                    await self.finish_znc_sync()
+                return
+
+    def register_welcome_handlers(self):
+        """
+        Command and numeric routing for _await_welcome_message.
+        """
+        def register(commands, handler):
+            self.dispatcher.register(commands, handler, WELCOME)
+
+        register("ACCOUNT", self.handle_account_message)
+        register("AWAY", self.handle_away)
+        register("NOTICE", self.welcome_notice)
+        register("CAP", self.handle_cap)
+        register("AUTHENTICATE", self.welcome_authenticate)
+        register("903", self.welcome_sasl_successful)
+        register("904", self.welcome_sasl_failed)
+        register("001", self.welcome_001)
+        register(("002", "003", "004"), self.welcome_server_info)
+        register("005", self.welcome_isupport)
+        register(("251", "252", "253", "254", "255", "265"), self.welcome_lusers)
+        register(("311", "312", "313", "317", "319", "301", "671", "338", "318", "330"), self.welcome_whois)
+        register("PART", self.handle_part)
+        register("QUIT", self.handle_quit)
+        register("NICK", self.welcome_nick)
+        register("JOIN", self.welcome_join)
+        register("PRIVMSG", self.welcome_privmsg)
+        register("MODE", self.handle_mode)
+        register(("305", "306"), self.ignore_tokens)
+        register("328", self.handle_328)
+        register(("332", "333", "TOPIC"), self.welcome_topic)
+        register("353", self.welcome_names)
+        register("366", self.welcome_end_of_names)
+        register("250", self.handle_connection_info)
+        register("266", self.handle_global_users_info)
+        register("433", self.handle_nickname_conflict)
+        register(("372", "375"), self.welcome_motd)
+        register("376", self.welcome_motd_end)
+        register("PING", self.initial_ping)
+        register("900", self.welcome_logged_in)
+        register("396", self.welcome_396)
+        register("BATCH", lambda tokens: self.handle_batch(tokens, WELCOME))
+
+    def welcome_reset_timer(self, symbol):
+        """Note ZNC playback arriving, the sync is over once it goes quiet."""
+        if self.use_auto_join:
+            return
+        self.welcome.last_366_time = time.time()
+        if self.welcome.motd_received:
+            if self.welcome.sync:
+                self.insert_startup_text(f'\x0307\x02Syncing with ZNC:\x0F ')
+                self.welcome.sync = False
+            else:
+                self.insert_startup_text(f'\x0303\x02{symbol}\x0F')
+
+    def welcome_sync_timed_out(self):
+        if self.use_auto_join or self.welcome.last_366_time is None:
+            return False
+        return time.time() - self.welcome.last_366_time > 0.2
+
+    def is_shown(self):
+        """True if this is the server in the window, or no server is shown yet."""
+        shown = self.gui.irc_client
+        return shown is self or shown not in self.gui.clients.values()
+
+    def insert_startup_text(self, message):
+        """
+        Connection and registration output. Servers connect side by side,
+        one that is not shown keeps its output in its server buffer, which
+        is displayed when it gets selected.
+        """
+        if self.is_shown():
+            self.gui.insert_text_widget(message)
+        else:
+            self.motd_dict[self.server_name] = self.motd_dict.get(self.server_name, "") + message
+
+    def show_startup_screen(self):
+        if self.is_shown():
+            self.gui.clear_text_widget()
+            self.gui.show_startup_art()
+
+    async def finish_welcome(self, join=True):
+        if join and self.use_auto_join:
+            await self.automatic_join()
+        await self.send_message("AWAY")
+        self.show_startup_screen()
+        self.welcome.done = True
+
+    async def finish_znc_sync(self):
+        """Show the topics, names and messages ZNC played back during the sync."""
+        for tokens in self.welcome.topic_tokens:
+            self.handle_topic(tokens)
+        for tokens in self.welcome.names_tokens:
+            self.handle_names_list(tokens)
+
+        privmsg_tokens = self.welcome.privmsg_tokens
+        symbol_list = ['░', '▒', '▓', '█']
+        block_thresholds = [len(privmsg_tokens) // len(symbol_list) * (i + 1) for i in range(len(symbol_list))]
+
+        self.insert_startup_text(f'\n\x0307\x02Processing Tokens: \x0F')
+        for i, tokens in enumerate(privmsg_tokens):
+            for j, threshold in enumerate(block_thresholds):
+                if i < threshold:
+                    self.insert_startup_text(f'\x0303{symbol_list[j]}\x0F')
+                    break
+            await self.handle_privmsg(tokens, znc_privmsg=True)
+        self.insert_startup_text(f'\n\x0303\x02DONE!\x0F\n')
+        await self.send_message('CAP REQ :away-notify')
+        await self.send_message('CAP REQ :account-notify')
+        await self.send_message('CAP REQ :extended-join')
+        await self.send_message("AWAY")
+        await asyncio.sleep(0.8)
+        self.show_startup_screen()
+        self.welcome.done = True
+
+    async def welcome_notice(self, tokens):
+        if self.handle_notice_message(tokens):
+            await self.finish_welcome()
+
+    async def welcome_authenticate(self, tokens):
+        self.insert_startup_text("Handling AUTHENTICATE message\n")
+        await self.handle_sasl_auth(tokens)
+
+    async def welcome_sasl_successful(self, tokens):
+        self.insert_startup_text("Handling SASL successful message\n")
+        await self.handle_sasl_successful()
+        self.welcome.sasl_authenticated = True
+        if self.welcome.logged_in and self.isupport_flag and self.welcome.motd_received:
+            await self.finish_welcome()
+
+    def welcome_sasl_failed(self, tokens):
+        self.insert_startup_text("Handling SASL failed message\n")
+        self.handle_sasl_failed()
+
+    def welcome_001(self, tokens):
+        if self.znc_connection:
+            self.welcome_reset_timer("")
+        self.insert_startup_text(f'Connected to the server: {self.server}:{self.port}\n')
+        self.welcome.received_001 = True
+        self.registered = True
+        # Many servers end the welcome with nick!user@host
+        welcome_words = tokens.params[-1].split()
+        if welcome_words and "!" in welcome_words[-1] and "@" in welcome_words[-1]:
+            self.own_userhost = welcome_words[-1].split("!", 1)[1]
+        self.gui.insert_and_scroll()
+
+    def welcome_server_info(self, tokens):
+        if self.znc_connection:
+            self.welcome_reset_timer("")
+        self.server_message_handler(tokens)
+
+    def welcome_isupport(self, tokens):
+        if self.znc_connection:
+            self.welcome_reset_timer("")
+        self.handle_isupport(tokens)
+        self.isupport_flag = True
+        self.gui.insert_and_scroll()
+
+    def welcome_lusers(self, tokens):
+        self.server_message_handler(tokens)
+        self.welcome_reset_timer("")
+
+    async def welcome_whois(self, tokens):
+        await self.handle_whois_replies(tokens.command, tokens)
+        self.welcome_reset_timer("")
+
+    async def welcome_nick(self, tokens):
+        if self.znc_connection and self.nickname != tokens.hostmask.nickname:
+            new_nick = tokens.params[0]
+            await self.change_nickname(new_nick, is_from_token=True)
+            self.away_clean()
+        else:
+            await self.handle_nick(tokens)
+
+    def welcome_join(self, tokens):
+        if self.znc_connection:
+            self.join_znc_channel(tokens)
+            self.welcome_reset_timer("#")
+
+    async def welcome_privmsg(self, tokens):
+        if self.znc_connection:
+            self.welcome.privmsg_tokens.append(tokens)
+            self.welcome_reset_timer("")
+        else:
+            await self.handle_privmsg(tokens)
+
+    def welcome_topic(self, tokens):
+        self.welcome.got_topic += 1
+        if not self.use_auto_join:
+            self.welcome.topic_tokens.append(tokens)
+            self.welcome_reset_timer("")
+        else:
+            self.handle_topic(tokens)
+
+    def welcome_names(self, tokens):
+        if not self.use_auto_join:
+            self.welcome.names_tokens.append(tokens)
+            self.welcome_reset_timer("")
+        else:
+            self.handle_names_list(tokens)
+
+    async def welcome_end_of_names(self, tokens):
+        self.welcome.count_366 += 1
+        if not self.use_auto_join:
+            self.welcome.names_tokens.append(tokens)
+            self.welcome_reset_timer("")
+            return
+        self.handle_names_list(tokens)
+        joined = len(self.joined_channels)
+        if self.welcome.count_366 >= joined and self.welcome.got_topic >= joined and self.welcome.znc_connected:
+            await self.finish_welcome(join=False)
+
+    def welcome_motd(self, tokens):
+        if self.znc_connection:
+            self.welcome_reset_timer("")
+        if tokens.command == "375":
+            self.handle_motd_start(tokens)
+        else:
+            self.handle_motd_line(tokens)
+
+    async def welcome_motd_end(self, tokens):
+        self.handle_motd_end(tokens)
+        self.welcome.motd_received = True
+        if not self.use_nickserv_auth and not self.sasl_enabled and not self.znc_connection:
+            if self.use_auto_join:
+                await self.finish_welcome()
+            else:
+                self.welcome.done = True
+        elif self.znc_connection and self.isupport_flag and not self.sasl_enabled and not self.use_nickserv_auth:
+            if self.use_auto_join:
+                await self.automatic_join()
+            self.welcome.znc_connected = True
+            self.welcome_reset_timer("")
+        elif self.welcome.sasl_authenticated and self.isupport_flag and not self.znc_connection:
+            await self.finish_welcome()
+        elif self.use_nickserv_auth and not self.sasl_enabled and not self.znc_connection:
+            await self.send_message(f'PRIVMSG NickServ :IDENTIFY {self.nickname} {self.nickserv_password}\r\n')
+            self.insert_startup_text(f"Sent NickServ authentication.\n")
+            self.welcome.nickserv_sent = True
+
+    async def welcome_logged_in(self, tokens):
+        self.welcome.logged_in = True
+        if self.use_nickserv_auth and self.welcome.nickserv_sent and not self.sasl_enabled:
+            await self.finish_welcome()
+
+    def welcome_396(self, tokens):
+        self.welcome.got_396 = True
+        self.command_396(tokens)
 
     async def handle_cap(self, tokens):
         # Check if the server is listing capabilities
@@ -714,6 +770,13 @@ class RudeChatClient:
             await self.send_message('CAP REQ :extended-join')
             if self.sasl_enabled:
                 await self.send_message("CAP REQ :sasl")
+            # CAP LS 302 spreads long lists over several lines, all but the last marked with *
+            for cap in tokens.params[-1].split():
+                name, _, value = cap.partition("=")
+                self.offered_caps[name] = value
+            last_line = len(tokens.params) < 4 or tokens.params[2] != "*"
+            if last_line and self.use_multiline and "batch" in self.offered_caps and "draft/multiline" in self.offered_caps:
+                await self.send_message("CAP REQ :batch draft/multiline")
 
         # Check if the server has acknowledged a capability request
         elif "ACK" in tokens.params:
@@ -723,27 +786,33 @@ class RudeChatClient:
                 # Handle away-notify ACK
                 if "away-notify" in acknowledged_capabilities and not self.away_notify:
                     data = f"{self.server_name}: Server acknowledged away-notify capability.\n"
-                    self.gui.insert_text_widget(f"\n{self.server_name}: Server acknowledged away-notify capability.\n")
+                    self.insert_startup_text(f"\n{self.server_name}: Server acknowledged away-notify capability.\n")
                     self.add_server_message(data)
                     self.away_notify = True
 
                 # Handle account-notify ACK
                 if "account-notify" in acknowledged_capabilities and not self.account_notify:
                     data = f"{self.server_name}: Server acknowledged account-notify capability.\n"
-                    self.gui.insert_text_widget(f"\n{self.server_name}: Server acknowledged account-notify capability.\n")
+                    self.insert_startup_text(f"\n{self.server_name}: Server acknowledged account-notify capability.\n")
                     self.add_server_message(data)
                     self.account_notify = True
 
                 if "extended-join" in acknowledged_capabilities and not self.extended_join:
                     data = f"{self.server_name}: Server acknowledged extended-join capability.\n"
-                    self.gui.insert_text_widget(f"\n{self.server_name}: Server acknowledged extended-join capability.\n")
+                    self.insert_startup_text(f"\n{self.server_name}: Server acknowledged extended-join capability.\n")
                     self.add_server_message(data)
                     self.extended_join = True
 
+                if "draft/multiline" in acknowledged_capabilities and self.multiline is None:
+                    self.multiline = self.multiline_limits(self.offered_caps.get("draft/multiline", ""))
+                    data = f"{self.server_name}: Server acknowledged draft/multiline capability.\n"
+                    self.insert_startup_text(f"\n{data}")
+                    self.add_server_message(data)
+
                 # Handle SASL ACK
                 if "sasl" in acknowledged_capabilities and self.sasl_enabled:
                     data = f"{self.server_name}: Server acknowledged SASL capability.\n"
-                    self.gui.insert_text_widget(f"\n{self.server_name}: Server acknowledged SASL capability.\n")
+                    self.insert_startup_text(f"\n{self.server_name}: Server acknowledged SASL capability.\n")
                     self.add_server_message(data)
                     await self.send_message("AUTHENTICATE PLAIN")
 
@@ -760,25 +829,28 @@ class RudeChatClient:
 
                 if "away-notify" in rejected_capabilities:
                     data = f"{self.server_name}: Server denied away-notify capability.\n"
-                    self.gui.insert_text_widget(f"\n{self.server_name}: Server denied away-notify capability.\n")
+                    self.insert_startup_text(f"\n{self.server_name}: Server denied away-notify capability.\n")
                     self.add_server_message(data)
                     self.away_notify = False
 
                 if "account-notify" in rejected_capabilities:
                     data = f"{self.server_name}: Server denied account-notify capability.\n"
-                    self.gui.insert_text_widget(f"\n{self.server_name}: Server denied account-notify capability.\n")
+                    self.insert_startup_text(f"\n{self.server_name}: Server denied account-notify capability.\n")
                     self.add_server_message(data)
                     self.account_notify = False
 
                 if "extended-join" in rejected_capabilities:
                     data = f"{self.server_name}: Server denied extended-join capability.\n"
-                    self.gui.insert_text_widget(f"\n{self.server_name}: Server denied extended-join capability.\n")
+                    self.insert_startup_text(f"\n{self.server_name}: Server denied extended-join capability.\n")
                     self.add_server_message(data)
                     self.extended_join = False
 
+                if "draft/multiline" in rejected_capabilities:
+                    self.multiline = None
+
                 if "sasl" in rejected_capabilities:
                     data = f"{self.server_name}: Server denied SASL capability.\n"
-                    self.gui.insert_text_widget(f"\n{self.server_name}: Server denied SASL capability.\n")
+                    self.insert_startup_text(f"\n{self.server_name}: Server denied SASL capability.\n")
                     self.add_server_message(data)
 
                 if not self.sasl_enabled:
@@ -804,9 +876,40 @@ class RudeChatClient:
             except Exception as e:
                 logging.error(f"Error3 in handle_cap NEW block: {e}")
 
+        elif "DEL" in tokens.params:
+            removed_capabilities = tokens.params[-1].split()
+            if "draft/multiline" in removed_capabilities or "batch" in removed_capabilities:
+                self.multiline = None
+
+    async def handle_batch(self, tokens, phase=CONNECTED):
+        """
+        Open or close a batch. A draft/multiline batch is handled as one
+        PRIVMSG or NOTICE once it closes, other batch types are not grouped.
+        """
+        if not tokens.params:
+            return
+        ref = tokens.params[0]
+        if ref.startswith("+"):
+            if len(tokens.params) > 1 and tokens.params[1] == MULTILINE:
+                self.multiline_batches.start(ref[1:])
+        elif ref.startswith("-"):
+            message = self.multiline_batches.finish(ref[1:])
+            if message is not None:
+                await self.dispatcher.dispatch(message, phase)
+
+    @staticmethod
+    def multiline_limits(value):
+        """Parse the draft/multiline value, "max-bytes=4096,max-lines=24"."""
+        limits = {"max-bytes": 4096, "max-lines": None}
+        for item in value.split(","):
+            key, _, number = item.partition("=")
+            if key in limits and number.isdigit():
+                limits[key] = int(number)
+        return limits
+
     async def handle_sasl_auth(self, tokens):
         if not self.sasl_enabled:
-            self.gui.insert_text_widget(f"SASL is not enabled.\n")
+            self.insert_startup_text(f"SASL is not enabled.\n")
             return  # Skip SASL if it's not enabled
         if tokens.params[0] == '+':
             auth_string = f"{self.sasl_username}\0{self.sasl_username}\0{self.sasl_password}"
@@ -815,92 +918,138 @@ class RudeChatClient:
 
     async def handle_sasl_successful(self):
         if not self.sasl_enabled:
-            self.gui.insert_text_widget(f"SASL is not enabled.\n")
+            self.insert_startup_text(f"SASL is not enabled.\n")
             return  # Skip SASL if it's not enabled
-        self.gui.insert_text_widget(f"SASL authentication successful.\n")
+        self.insert_startup_text(f"SASL authentication successful.\n")
         await self.send_message("CAP END")
 
     def handle_sasl_failed(self):
         if not self.sasl_enabled:
-            self.gui.insert_text_widget(f"SASL is not enabled.\n")
+            self.insert_startup_text(f"SASL is not enabled.\n")
             return
-        self.gui.insert_text_widget(f"SASL authentication failed. Disconnecting.\n")
+        self.insert_startup_text(f"SASL authentication failed. Disconnecting.\n")
+
+    async def send_message(self, message, lane=None):
+        """
+        Queue message for the server. Urgent lines (PONG, QUIT, registration)
+        are waited for so they are on the wire when this returns, anything
+        else returns straight away and is paced by the send queue.
+        """
+        if self.log_on:
+            logging.debug(f"Queueing message: {message}")
+        if self.writer is None:
+            logging.warning("send_message called, but self.writer is not set.")
+            return False
 
-    async def send_message(self, message):
+        if lane is None:
+            lane = self.send_queue.lane_for(message)
+        sent = self.send_queue.put(message, lane)
+        if lane != URGENT:
+            return True
         try:
-            if self.log_on:
-                logging.debug(f"Attempting to send message: {message}")
-            if self.writer is None:
-                logging.warning("send_message called, but self.writer is not set.")
-                raise AttributeError("Writer is not initialized.")
-            
-            if self.log_on:
-                logging.debug("Writing to writer...")
-            self.writer.write(f'{message}\r\n'.encode('UTF-8'))
-            
-            if self.log_on:
-                logging.debug("Draining writer...")
-            await asyncio.wait_for(self.writer.drain(), timeout=10)
-            
-            if self.log_on:
-                logging.info(f"Message sent successfully: {message}")
-            
-        except AttributeError as e:
-            logging.error(f"AttributeError in send_message: {e}")
-            
-        except BrokenPipeError as e:
-            logging.error(f"BrokenPipeError in send_message: {e}. The connection might have been lost.")
-            self.gui.insert_text_widget(f"Connection Error: {e}: Cannot send message.\n")
-            
-        except TimeoutError as e:
-            logging.error(f"TimeoutError in send_message: {e}. The operation took too long.")
-            self.gui.insert_text_widget(f"Connection Error: {e}: Cannot send message.\n")
-            
-        except ConnectionResetError as e:
-            logging.error(f"ConnectionResetError in send_message: {e}. The connection was reset by the peer.")
-            self.gui.insert_text_widget(f"Connection Error: {e}: Cannot send message.\n")
-            
-        except ConnectionRefusedError as e:
-            logging.error(f"ConnectionRefusedError in send_message: {e}. The connection attempt was refused.")
-            self.gui.insert_text_widget(f"Connection Error: {e}: Cannot send message.\n")
-            
-        except OSError as e:
-            logging.error(f"OSError in send_message: {e}. A general OS-related error occurred.")
-            self.gui.insert_text_widget(f"Connection Error: {e}: Cannot send message.\n")
+            return await asyncio.wait_for(asyncio.shield(sent), timeout=10)
+        except asyncio.TimeoutError:
+            logging.error(f"TimeoutError in send_message: {message.split(' ', 1)[0]} took too long.")
+            return False
 
-    def is_valid_channel(self, channel):
-        return any(channel.startswith(prefix) for prefix in self.chantypes)
+    async def send_paced(self, message):
+        """
+        Queue one line of a macro, fortune or paste and wait until it is sent.
+        Returns False if it was cancelled with /stop or could not be sent.
+        """
+        if self.writer is None:
+            logging.warning("send_paced called, but self.writer is not set.")
+            return False
+        return await self.send_queue.put(message, BULK)
 
-    async def join_channel(self, channel):
-        if not self.is_valid_channel(channel):
-            self.gui.insert_text_widget(f"Invalid channel name {channel}.\n")
-            return
+    def report_send_error(self, e):
+        self.gui.insert_text_widget(f"Connection Error: {e}: Cannot send message.\n")
 
-        if len(channel) >= self.channellen:
-            self.gui.insert_text_widget(f"Maximum Channel Character Limit Reached, Max Allowed: {self.channellen}")
-            return
+    def stop_paced_sending(self):
+        dropped = self.send_queue.cancel_bulk()
+        self.gui.insert_text_widget(f"Stopped sending, {dropped} queued line(s) dropped.\n")
 
-        if len(self.joined_channels) >= self.chan_limit:
-            self.gui.insert_text_widget(f"You have reached the maximum number of channels allowed.\n")
-            return
+    def is_valid_channel(self, channel):
+        return any(channel.startswith(prefix) for prefix in self.chantypes)
 
-        if channel in self.joined_channels:
-            self.gui.insert_text_widget(f"You are already in channel {channel}.\n")
-            return
+    async def join_channel(self, channel, key=None):
+        await self.join_channels([(channel, key)])
 
-        # Ensure the server entry exists in the dictionary
-        if self.server not in self.channel_messages:
-            self.channel_messages[self.server] = {}
+    async def join_channels(self, entries):
+        """
+        Join (channel, key) pairs, key being None for most channels.
+        Everything accepted is booked at once and sent as batched JOIN lines.
+        """
+        accepted = []
+        for channel, key in entries:
+            problem = self.join_problem(channel)
+            if problem:
+                self.gui.insert_text_widget(problem)
+                continue
 
-        # Ensure the channel entry exists in the dictionary
-        if channel not in self.channel_messages[self.server]:
-            self.channel_messages[self.server][channel] = []
+            # Ensure the channel has a history entry
+            self.history.target(self.server, channel)
+            self.joined_channels.append(channel)
+            if key:
+                self.channel_keys[channel] = key
+            accepted.append((channel, key))
 
-        await self.send_message(f'JOIN {channel}')
-        self.joined_channels.append(channel)
+        if not accepted:
+            return
+        for line in self.join_lines(accepted):
+            await self.send_message(line)
         self.gui.channel_lists[self.server] = self.joined_channels  # Update the GUI channel list
         self.update_gui_channel_list()  # Update the channel list in GUI
 
+    def join_problem(self, channel):
+        """Why channel cannot be joined, or None."""
+        if not self.is_valid_channel(channel):
+            return f"Invalid channel name {channel}.\n"
+        if len(channel) >= self.channellen:
+            return f"Maximum Channel Character Limit Reached, Max Allowed: {self.channellen}\n"
+        if not self.room_for_channel(channel):
+            return f"You have reached the maximum number of channels allowed.\n"
+        if channel in self.joined_channels:
+            return f"You are already in channel {channel}.\n"
+        return None
+
+    def room_for_channel(self, channel):
+        # CHANLIMIT counts channels per group of prefixes, e.g. #&:100
+        if not self.chanlimits:
+            return len(self.joined_channels) < self.chan_limit
+        for prefixes, limit in self.chanlimits.items():
+            if channel[:1] in prefixes:
+                if limit is None:
+                    return True
+                return sum(1 for joined in self.joined_channels if joined[:1] in prefixes) < limit
+        return True
+
+    def join_lines(self, entries):
+        """
+        Pack (channel, key) pairs into as few JOIN lines as the 512 byte line
+        limit and TARGMAX allow. Keyed channels go first in every line so
+        the key list lines up with them.
+        """
+        max_targets = self.targmax.get("JOIN") or len(entries)
+        ordered = [entry for entry in entries if entry[1]] + [entry for entry in entries if not entry[1]]
+
+        def render(batch):
+            channels = ",".join(channel for channel, _ in batch)
+            keys = ",".join(key for _, key in batch if key)
+            return f"JOIN {channels} {keys}" if keys else f"JOIN {channels}"
+
+        lines = []
+        batch = []
+        for entry in ordered:
+            candidate = batch + [entry]
+            if batch and (len(candidate) > max_targets or len(f"{render(candidate)}\r\n".encode('UTF-8')) > 512):
+                lines.append(render(batch))
+                batch = []
+            batch.append(entry)
+        if batch:
+            lines.append(render(batch))
+        return lines
+
     async def detach_channel(self, channel):
         if channel in self.joined_channels:
             self.detached_channels.append(channel)
@@ -962,9 +1111,16 @@ class RudeChatClient:
             logging.error(f"Error in update_gui_channel_list: {e}")
 
     def update_gui_user_list(self, channel):
-        self.gui.user_listbox.delete(0, tk.END)
-        for user in self.channel_users.get(channel, []):
-            self.gui.user_listbox.insert(tk.END, user)
+        # Channels that just went off screen stop keeping a sorted list
+        for watched in list(self.members.watched):
+            if watched != channel and not self.channel_on_screen(watched):
+                self.members.unwatch(watched)
+        self.gui.show_user_list(self, channel)
+
+    def channel_on_screen(self, channel):
+        if channel in self.gui.popped_out_channels:
+            return True
+        return channel == self.current_channel and self.gui.irc_client == self
 
     async def stop_async_loop(self):
         loop = self.loop  # Access the loop from the client object
@@ -984,12 +1140,13 @@ class RudeChatClient:
         await asyncio.gather(*tasks, return_exceptions=True)
 
     async def reset_state(self):
+        """
+        Forget what only made sense for the lost connection. Joined channels,
+        members, topics and history are kept so the GUI stays usable offline,
+        the NAMES replies after rejoining bring the member lists up to date.
+        """
         self.motd_dict.clear()
-        self.joined_channels.clear()
         self.motd_lines.clear()
-        self.channel_users.clear()
-        self.user_modes.clear()
-        self.mode_to_symbol.clear()
         self.whois_data.clear()
         self.download_channel_list.clear()
         self.whois_executed.clear()
@@ -1004,36 +1161,48 @@ class RudeChatClient:
             server = split_config[-1].split(".")
             return server[1]
 
-    async def reconnect(self, config_file):
+    async def reconnect(self, config_file, ping_timeout=False):
         disconnected_server = self.grab_server_name(config_file)
-        MAX_RETRIES = 5
-        RETRY_DELAY = 245 if not self.znc_connection else 5
-        retries = 0
-        self.add_server_message(f"****Resetting State\n")
+        server_name = self.server_name or disconnected_server
+        rejoin = [channel for channel in self.joined_channels if self.is_valid_channel(channel)]
         await self.reset_state()
-        self.gui.insert_text_widget(f"You have been \x0304DISCONNECTED\x0F Auto Reconnecting In Progress\x0303... in {RETRY_DELAY} seconds\x0F \n")
-        self.add_server_message(f"You have been \x0304DISCONNECTED\x0F Auto Reconnecting In Progress\x0303... in {RETRY_DELAY} seconds\x0F \n")
+        self.backoff.reset()
+        self.gui.insert_text_widget(f"You have been \x0304DISCONNECTED\x0F Auto Reconnecting In Progress\x0303...\x0F \n")
+        self.add_server_message(f"****Server {disconnected_server} Disconnected\n")
 
-        while retries < MAX_RETRIES:
-            retries += 1
-            try:
-                self.add_server_message(f"****Server {disconnected_server} Disconnected\n")
-                self.add_server_message(f"****Giving Time For Ping TimeOut: {RETRY_DELAY} seconds\n")
-                await asyncio.sleep(RETRY_DELAY)
+        # Retry until connected or the client is closed, the backoff caps the delay
+        while self.loop_running:
+            # A dropped socket is retried at once, a ping timeout backs off first
+            delay = self.backoff.next_delay(immediate=not ping_timeout)
+            self.gui.show_server_status(server_name, "reconnecting")
+            if delay:
+                self.add_server_message(f"****Reconnect attempt {self.backoff.attempt} in {delay:.0f} seconds\n")
+                await asyncio.sleep(delay)
 
+            try:
                 self.add_server_message("****Attempt Connection\n")
                 await self.connect(config_file)
-                self.loop_running = True
-                self.add_server_message(f"****Connected: {self.loop_running}\n")
-                self.gui.select_first_server()
-                return
-
             except Exception as e:
-                logging.error(f"Failed to reconnect ({retries}/{MAX_RETRIES}): {e}. Retrying in {RETRY_DELAY} seconds.")
-                await asyncio.sleep(RETRY_DELAY)
+                logging.error(f"Failed to reconnect (attempt {self.backoff.attempt}): {e}")
+                continue
 
-        if self.log_on:
-            logging.info(f"Failed to reconnect ({retries}/{MAX_RETRIES}): Retrying in {RETRY_DELAY} seconds.")
+            if not self.registered:
+                logging.error(f"Failed to reconnect (attempt {self.backoff.attempt}): not registered")
+                continue
+
+            self.add_server_message(f"****Connected: {self.loop_running}\n")
+            self.gui.show_server_status(server_name)
+            if not self.znc_connection:
+                # ZNC keeps us in our channels and replays them itself
+                await self.rejoin_channels(rejoin)
+            # Away states went stale while we were gone
+            self.who_scheduler.restart()
+            return
+
+    async def rejoin_channels(self, channels):
+        """Rejoin channels that are still booked as joined, with batched JOIN lines."""
+        for line in self.join_lines([(channel, self.channel_keys.get(channel)) for channel in channels]):
+            await self.send_message(line)
 
     async def away_watcher(self):
         while self.loop_running:
@@ -1106,7 +1275,7 @@ class RudeChatClient:
     async def auto_save(self):
         while self.loop_running:
             try:
-                await asyncio.sleep(30)
+                await asyncio.sleep(5)
                 await self.save_channel_messages()
                 if not self.loop_running:
                     break
@@ -1124,27 +1293,6 @@ class RudeChatClient:
                 logging.error(f"Unhandled exception in auto_save: {e}")
                 continue
 
-    async def auto_trim(self):
-        while self.loop_running:
-            try:
-                await asyncio.sleep(125)
-                self.trim_messages()
-                if not self.loop_running:
-                    break
-
-            except asyncio.CancelledError:
-                self.loop_running = False
-                logging.info("Exiting auto_trim loop.")
-                break
-
-            except AttributeError as e:  # Catch AttributeError
-                logging.error(f"AttributeError caught in auto_trim: {e}")
-                continue
-
-            except Exception as e:  # Catch other exceptions
-                logging.error(f"Unhandled exception in auto_trim: {e}")
-                continue
-
     async def the_cleaner(self):
         while self.loop_running:
             try:
@@ -1171,6 +1319,10 @@ class RudeChatClient:
             ssender = str(sender).lower()
             smessage = str(message).lower()
 
+            # CTCP replies from ignored users
+            if message.startswith("\x01") and tokens.hostmask and self.should_ignore_sender(tokens.hostmask):
+                return False
+
             if ssender.startswith("nickserv") and "invalid password" in smessage:
                 self.gui.insert_text_widget(f"{sdata}")
                 self.add_server_message(data)
@@ -1265,12 +1417,7 @@ class RudeChatClient:
                 action_message = f"* {sender} {ctcp_content}\n"
 
             # Update the message history
-            if self.server not in self.channel_messages:
-                self.channel_messages[self.server] = {}
-            if target not in self.channel_messages[self.server]:
-                self.channel_messages[self.server][target] = []
-
-            self.channel_messages[self.server][target].append(action_message)
+            self.history.add_action(self.server, target, sender, ctcp_content)
 
             # Display the message in the text_widget if the target matches the current channel or DM
             if target == self.current_channel and self.gui.irc_client == self and target not in self.gui.popped_out_channels:
@@ -1295,21 +1442,9 @@ class RudeChatClient:
         except Exception as e:
             logging.error(f"Exception in handle_action_ctcp: {e}")
 
-    def trim_messages(self):
-        for server, channels in self.channel_messages.items():
-            # Trim the message history for remaining channels to the last 125 messages
-            for channel, messages in channels.items():
-                channels[channel] = messages[-125:]
-
     def remove_bang_channels(self):
         try:
-            for server, channels in self.channel_messages.items():
-                # Identify keys to be deleted
-                keys_to_delete = [channel for channel in channels.keys() if channel.startswith('!')]
-                
-                # Delete identified keys
-                for key in keys_to_delete:
-                    del channels[key]
+            self.history.remove_targets(lambda channel: channel.startswith('!'))
         except (AttributeError, Exception) as e:
             logging.error(f'AttributeError or Exception in remove_bang_channels: {e}')
 
@@ -1361,34 +1496,14 @@ class RudeChatClient:
 
     async def trigger_beep_notification(self, channel_name=None, message_content=None):
         """
-        You've been pinged! Plays a beep or noise on mention.
+        You've been pinged! Plays a beep or noise on mention, the GUI's
+        notifier does the playing off the network loop.
         """
         try:
-            if sys.platform.startswith("linux"):
-                # Check if paplay is available
-                if self.custom_sounds:
-                    if shutil.which("paplay"):
-                        # Linux-specific notification sound using paplay
-                        sound_path = os.path.join(self.script_directory, "Sounds", "Notification4.wav")
-                        os.system(f"paplay {sound_path}")
-                elif not self.custom_sounds:
-                    # System bell beep
-                    os.system("echo -e '\a'")
-            elif sys.platform == "darwin":
-                # macOS-specific notification sound using afplay
-                os.system("afplay /System/Library/Sounds/Ping.aiff")
-            elif sys.platform == "win32":
-                # Windows-specific notification using winsound
-                import winsound
-                duration = 75  # milliseconds
-                frequency = 1200  # Hz
-                winsound.Beep(frequency, duration)
-            else:
-                # For other platforms, print a message
-                if self.log_on:
-                    logging.info("Beep notification not supported on this platform.")
-
-            await self.gui.trigger_desktop_notification(channel_name, message_content=message_content)
+            sound = CUSTOM if self.custom_sounds else BEEP
+            # No desktop notification while the window has focus
+            toast = not self.gui.is_app_focused()
+            self.gui.notifier.notify((self.server, channel_name), channel_name, message_content, sound=sound, toast=toast)
         except Exception as e:
             logging.error(f"Error triggering desktop notification: {e}")
 
@@ -1421,21 +1536,20 @@ class RudeChatClient:
 
         if self.is_direct_message(target):
             target = await self.get_direct_message_target(sender, target)
-            await self.prepare_direct_message(sender, target, gmessage, timestamp, mode_symbol, znc_privmsg)
+            # Every check below shares this one match
+            mention = self.is_it_a_mention(message, sender, sender_hostmask)
+            await self.prepare_direct_message(sender, target, gmessage, timestamp, mode_symbol, znc_privmsg, mention)
         else:
-            await self.handle_channel_message(sender, target, gmessage, timestamp, mode_symbol, znc_privmsg)
+            mention = self.is_it_a_mention(message, target, sender_hostmask)
+            await self.handle_channel_message(sender, target, gmessage, timestamp, mode_symbol, znc_privmsg, mention)
 
-        await self.notify_user_if_mentioned(gmessage, target, sender, timestamp)
+        await self.notify_user_if_mentioned(gmessage, target, sender, timestamp, mention)
 
     def should_ignore_sender(self, sender_hostmask):
-        return any(fnmatch.fnmatch(sender_hostmask, ignored) for ignored in self.ignore_list)
+        return self.ignores.ignored(str(sender_hostmask))
 
-    async def notify_user_if_mentioned(self, message, target, sender, timestamp):
-        # Compile a regex pattern to match the exact nickname
-        pattern = re.compile(r'\b' + re.escape(self.nickname) + r'\b', re.IGNORECASE)
-        
-        # Check if the exact nickname is mentioned in the message
-        if pattern.search(message):
+    async def notify_user_if_mentioned(self, message, target, sender, timestamp, mention):
+        if mention:
             await self.notify_user_of_mention(self.server, target, sender, message)
 
             if self.znc_connection:
@@ -1489,7 +1603,7 @@ class RudeChatClient:
         else:
             return target
 
-    async def handle_znc_status_message(self, target, sender, message, mode_symbol):
+    async def handle_znc_status_message(self, target, sender, message, mode_symbol, mention=False):
         if self.log_on:
             logging.info(f"handle_znc_status_message variables: Target: {target} / Sender: {sender} / Message: {message} / Mode symbol: {mode_symbol}")
         try:
@@ -1502,7 +1616,7 @@ class RudeChatClient:
 
             elif sender != self.current_channel and sender not in self.gui.popped_out_channels:
                 self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
-                user_mention = self.is_it_a_mention(message)
+                user_mention = mention
                 if not user_mention:
                     await self.trigger_beep_notification(channel_name=sender, message_content=f"Message From {sender}")
                     self.highlight_channel_if_not_current(target, sender, user_mention)
@@ -1512,18 +1626,18 @@ class RudeChatClient:
             else:
                 self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
                 if sender not in self.gui.popped_out_channels:
-                    self.display_message(timestamp, sender, message, target, mode_symbol, is_direct=True)
+                    self.display_message(timestamp, sender, message, target, mode_symbol, is_direct=True, mention=mention)
                 else:
-                    await self.pip_to_pop_out(timestamp, sender, message, target, mode_symbol)
+                    await self.pip_to_pop_out(timestamp, sender, message, target, mode_symbol, mention)
 
         except Exception as e:
             logging.error(f"Error in handle_znc_status_message: {e}")
 
-    async def prepare_direct_message(self, sender, target, message, timestamp, mode_symbol, znc_privmsg):
+    async def prepare_direct_message(self, sender, target, message, timestamp, mode_symbol, znc_privmsg, mention=False):
         self.log_message(self.server_name, target, sender, message, is_sent=False)
         try:
             if sender != self.nickname:
-                self.channel_messages.setdefault(self.server, {}).setdefault(sender, [])
+                self.history.target(self.server, sender)
 
                 if sender not in self.cap_who_for_chan:
                     self.cap_who_for_chan.append(sender)
@@ -1535,12 +1649,12 @@ class RudeChatClient:
 
                 if sender.startswith("*status"):
                     self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
-                    await self.handle_znc_status_message(target, sender, message, mode_symbol)
+                    await self.handle_znc_status_message(target, sender, message, mode_symbol, mention)
                     return
 
                 if znc_privmsg:
                     self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
-                    user_mention = self.is_it_a_mention(message)
+                    user_mention = mention
                     if not user_mention:
                         await self.trigger_beep_notification(channel_name=sender, message_content=f"Message From {sender}")
                         self.highlight_channel_if_not_current(target, sender, user_mention)
@@ -1549,7 +1663,7 @@ class RudeChatClient:
 
                 elif sender != self.current_channel and sender not in self.gui.popped_out_channels:
                     self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
-                    user_mention = self.is_it_a_mention(message)
+                    user_mention = mention
                     if not user_mention:
                         await self.trigger_beep_notification(channel_name=sender, message_content=f"Message From {sender}")
                         self.highlight_channel_if_not_current(target, sender, user_mention)
@@ -1560,87 +1674,61 @@ class RudeChatClient:
                     self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
 
                     if sender not in self.gui.popped_out_channels:
-                        self.display_message(timestamp, sender, message, target, mode_symbol, is_direct=True)
+                        self.display_message(timestamp, sender, message, target, mode_symbol, is_direct=True, mention=mention)
                     else:
-                        await self.pip_to_pop_out(timestamp, sender, message, target, mode_symbol)
+                        await self.pip_to_pop_out(timestamp, sender, message, target, mode_symbol, mention)
 
         except Exception as e:
             logging.error(f"Exception in prepare_direct_message: {e}")
 
-    async def pip_to_pop_out(self, timestamp, sender, message, target, mode_symbol):
+    async def pip_to_pop_out(self, timestamp, sender, message, target, mode_symbol, mention=False):
         try:
             window = self.gui.pop_out_windows.get(target) or self.gui.pop_out_windows.get(sender)
             if window:
                 formatted_message = f"{timestamp}<{mode_symbol}{sender}> {message}\n" if self.use_time_stamp else f"<{mode_symbol}{sender}> {message}\n"
                 window.insert_text(formatted_message)
                 window.highlight_nickname()
-                await window.check_focus_and_notify(message)
+                await window.check_focus_and_notify(message, mention)
                 window.update_users_label()
         except Exception as e:
             logging.error(f"Error in pip_to_pop_out: {e}")
 
-    async def handle_channel_message(self, sender, target, message, timestamp, mode_symbol, znc_privmsg):
+    async def handle_channel_message(self, sender, target, message, timestamp, mode_symbol, znc_privmsg, mention=False):
         if znc_privmsg:
-            if self.server not in self.channel_messages:
-                self.channel_messages[self.server] = {}
-            if target not in self.channel_messages[self.server]:
-                self.channel_messages[self.server][target] = []
             self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
             self.log_message(self.server_name, target, sender, message, is_sent=False)
-            user_mention = self.is_it_a_mention(message)
+            user_mention = mention
             if not user_mention:
                 self.highlight_channel_if_not_current(target, sender, user_mention)
             elif user_mention:
                 self.highlight_channel_if_not_current(target, sender, user_mention)
 
         elif target != self.current_channel and target not in self.gui.popped_out_channels:
-            if self.server not in self.channel_messages:
-                self.channel_messages[self.server] = {}
-            if target not in self.channel_messages[self.server]:
-                self.channel_messages[self.server][target] = []
             self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
             self.log_message(self.server_name, target, sender, message, is_sent=False)
-            user_mention = self.is_it_a_mention(message)
+            user_mention = mention
             if not user_mention:
                 self.highlight_channel_if_not_current(target, sender, user_mention)
             elif user_mention:
                 self.highlight_channel_if_not_current(target, sender, user_mention)
 
         else:
-            if self.server not in self.channel_messages:
-                self.channel_messages[self.server] = {}
-            if target not in self.channel_messages[self.server] and target != self.nickname:
-                self.channel_messages[self.server][target] = []
             self.save_message(self.server, target, sender, message, mode_symbol, is_sent=False)
             self.log_message(self.server_name, target, sender, message, is_sent=False)
 
             if target not in self.gui.popped_out_channels:
-                self.display_message(timestamp, sender, message, target, mode_symbol, is_direct=False)
+                self.display_message(timestamp, sender, message, target, mode_symbol, is_direct=False, mention=mention)
             else:
-                await self.pip_to_pop_out(timestamp, sender, message, target, mode_symbol)
+                await self.pip_to_pop_out(timestamp, sender, message, target, mode_symbol, mention)
 
     def save_message(self, server, target, sender, message, mode_symbol, is_sent):
-        timestamp = datetime.datetime.now().strftime('[%H:%M:%S] ')
-        if self.is_direct_message(target):
-            # If it's a DM, handle it differently
-            if sender not in self.channel_messages[server]:
-                self.channel_messages[server][sender] = []  # Create a list for the sender if it doesn't exist
-            message_list = self.channel_messages[server][sender]
-        else:
-            if target not in self.channel_messages[server]:
-                self.channel_messages[server][target] = []  # Create a list for the target if it doesn't exist
-            message_list = self.channel_messages[server][target]
-        # Append the message to the appropriate list
-        if self.use_time_stamp == True:
-            message_list.append(f"{timestamp}<{mode_symbol}{sender}> {message}\n")
-        elif self.use_time_stamp == False:
-            message_list.append(f"<{mode_symbol}{sender}> {message}\n")
+        # DMs are kept under the sender, channel messages under the channel
+        history_target = sender if self.is_direct_message(target) else target
+        self.history.add_message(server, history_target, sender, message, mode_symbol)
 
-    def is_it_a_mention(self, message):
-        if self.nickname.lower() in message.lower():
-            return True
-        else:
-            return False
+    def is_it_a_mention(self, message, channel=None, sender_hostmask=None):
+        """True if message highlights us: our nick, an alias or a highlight word for channel."""
+        return self.highlights.match(self.nickname, channel, message, sender_hostmask) is not None
 
     def get_mode_symbol(self, mode):
         """Return the symbol corresponding to the IRC mode."""
@@ -1652,13 +1740,11 @@ class RudeChatClient:
     def get_user_mode(self, user, channel):
         """Retrieve the user's mode for the given channel."""
         if self.display_user_modes:
-            channel_modes = self.user_modes.get(channel, {})
-            user_modes = channel_modes.get(user, set())
-            return next(iter(user_modes), None)  # Get the first mode if available, else None
+            return self.members.top_mode(channel, user)
         else:
             return None
 
-    def display_message(self, timestamp, sender, message, target, mode_symbol, is_direct=False):
+    def display_message(self, timestamp, sender, message, target, mode_symbol, is_direct=False, mention=False):
         try:
             if target == self.current_channel and self.gui.irc_client == self:
                 if self.use_time_stamp:
@@ -1674,7 +1760,7 @@ class RudeChatClient:
                         self.gui.insert_text_widget(f"<{sender}> {message}\n")
                     self.gui.highlight_nickname()
             else:
-                user_mention = self.is_it_a_mention(message)
+                user_mention = mention
                 if not user_mention:
                     self.highlight_channel_if_not_current(target, sender, user_mention)
                 else:
@@ -1737,6 +1823,9 @@ class RudeChatClient:
                 account = tokens.params[1]
                 self.cache_accountname(user_info, account)
 
+            # Ignored users still join, we just don't hear about it
+            show = self.show_join_part_quit_nick and not self.should_ignore_sender(user_mask)
+
             friends_here = self.friends.friend_online(channel, user_info)
             if friends_here is not None:
                 self.gui.insert_text_widget(f"{friends_here}\n")
@@ -1747,38 +1836,32 @@ class RudeChatClient:
                 join_message = f"\x0312(→)\x0F {user_info} has joined channel {channel}\n"
 
             # Update the message history for the channel
-            if self.server not in self.channel_messages:
-                self.channel_messages[self.server] = {}
-            if channel not in self.channel_messages[self.server]:
-                self.channel_messages[self.server][channel] = []
-
-            if self.show_join_part_quit_nick:
-                self.channel_messages[self.server][channel].append(join_message)
+            self.history.target(self.server, channel)
+            if show:
+                self.history.add_line(self.server, channel, join_message)
 
             # Display the message in the text_widget only if the channel matches the current channel
             if channel == self.current_channel and self.gui.irc_client == self and channel not in self.gui.popped_out_channels:
-                if self.show_join_part_quit_nick:
+                if show:
                     self.gui.insert_text_widget(join_message)
                     self.gui.highlight_nickname()
             if channel in self.gui.popped_out_channels:
-                if self.show_join_part_quit_nick:
+                if show:
                     self.pipe_mode_to_pop_out(join_message, channel)
 
             # If the user joining is the client's user, return
             if user_info == self.nickname:
+                # The server's own view of our user@host sizes outgoing messages
+                if user_mask.username and user_mask.hostname:
+                    self.own_userhost = f"{user_mask.username}@{user_mask.hostname}"
                 if self.znc_connection:
                     self.join_znc_channel(tokens)
                 return
 
-            # Check if the user is not already in the channel_users list for the channel
-            if user_info not in self.channel_users.get(channel, []):
-                # Add the user to the channel_users list
-                self.channel_users.setdefault(channel, []).append(user_info)
-
-            # Sort the user list for the channel
-            sorted_users = self.sort_users(self.channel_users[channel], channel)
+            # Add the user to the channel members
+            self.members.add(channel, user_info)
 
-            # Update the user listbox for the channel with sorted users
+            # Update the user listbox for the channel
             self.update_user_listbox(channel)
 
         except Exception as e:
@@ -1786,11 +1869,11 @@ class RudeChatClient:
 
     def handle_part(self, tokens):
         try:
-            modes_to_strip = ''.join(self.mode_values)
             user_info = tokens.hostmask.nickname
             user_mask = tokens.hostmask
             channel = tokens.params[0]
             reason = tokens.params[1] if len(tokens.params) > 1 else None
+            show = self.show_join_part_quit_nick and not self.should_ignore_sender(user_mask)
             
             if reason:
                 part_message = f"\x0304(←)\x0F {user_mask} has parted from channel {channel}: {reason}\n"
@@ -1801,37 +1884,24 @@ class RudeChatClient:
                 part_message = part_message.replace(user_mask, user_info)
 
             # Update the message history for the channel
-            if self.server not in self.channel_messages:
-                self.channel_messages[self.server] = {}
-            if channel not in self.channel_messages[self.server]:
-                self.channel_messages[self.server][channel] = []
-
-            if self.show_join_part_quit_nick:
-                self.channel_messages[self.server][channel].append(part_message)
+            self.history.target(self.server, channel)
+            if show:
+                self.history.add_line(self.server, channel, part_message)
 
             # Display the message in the text_widget only if the channel matches the current channel
             if channel == self.current_channel and self.gui.irc_client == self and channel not in self.gui.popped_out_channels:
-                if self.show_join_part_quit_nick:
+                if show:
                     self.gui.insert_text_widget(part_message)
                     self.gui.highlight_nickname()
             if channel in self.gui.popped_out_channels:
-                if self.show_join_part_quit_nick:
+                if show:
                     self.pipe_mode_to_pop_out(part_message, channel)
 
-            # Check if the user is in the channel_users list for the channel
-            user_found = False
-            for user_with_symbol in self.channel_users.get(channel, []):
-                # Check if the stripped user matches user_info
-                if user_with_symbol.lstrip(modes_to_strip) == user_info:
-                    user_found = True
-                    self.channel_users[channel].remove(user_with_symbol)
-                    break
-
-            if user_found:
-                # Update the user listbox for the channel & Modes
-                current_modes = self.user_modes.get(channel, {})
-                user_modes = current_modes.get(user_info, set())
-                current_modes.pop(user_info, None)
+            # We left, so the member list is stale
+            if self.members.fold(user_info) == self.members.fold(self.nickname):
+                self.members.remove_channel(channel)
+            elif self.members.remove(channel, user_info):
+                # Update the user listbox for the channel
                 self.update_user_listbox(channel)
 
         except Exception as e:
@@ -1839,92 +1909,59 @@ class RudeChatClient:
 
     def handle_quit(self, tokens):
         try:
-            modes_to_strip = ''.join(self.mode_values)
             user_info = tokens.hostmask.nickname
             user_mask = tokens.hostmask
             reason = tokens.params[0] if tokens.params else "No reason"
+            show = self.show_join_part_quit_nick and not self.should_ignore_sender(user_mask)
             if self.show_full_hostmask == True:
                 quit_message = f"\x0304(←)\x0F {user_mask} has quit: {reason}\n"
             elif self.show_full_hostmask == False:
                 quit_message = f"\x0304(←)\x0F {user_info} has quit: {reason}\n"
 
-            # Remove the user from all channel_users lists
-            for channel, users in self.channel_users.items():
-                user_found = False
-                for idx, user_with_symbol in enumerate(users):
-                    # Check if the stripped user matches user_info
-                    if user_with_symbol.lstrip(modes_to_strip) == user_info:
-                        user_found = True
-                        del self.channel_users[channel][idx]
-                        
-                        # Update the message history for the channel
-                        if self.server not in self.channel_messages:
-                            self.channel_messages[self.server] = {}
-                        if channel not in self.channel_messages[self.server]:
-                            self.channel_messages[self.server][channel] = []
-                        if self.show_join_part_quit_nick:
-                            self.channel_messages[self.server][channel].append(quit_message)
-
-                        # Display the message in the text_widget only if the channel matches the current channel
-                        if channel == self.current_channel and self.gui.irc_client == self and channel not in self.gui.popped_out_channels:
-                            if self.show_join_part_quit_nick:
-                                self.gui.insert_text_widget(quit_message)
-                                self.gui.highlight_nickname()
-                        if channel in self.gui.popped_out_channels:
-                            if self.show_join_part_quit_nick:
-                                self.pipe_mode_to_pop_out(quit_message, channel)
+            # Remove the user from every channel they were in
+            for channel in self.members.quit(user_info):
+                # Update the message history for the channel
+                if show:
+                    self.history.add_line(self.server, channel, quit_message)
 
-                        break
+                # Display the message in the text_widget only if the channel matches the current channel
+                if channel == self.current_channel and self.gui.irc_client == self and channel not in self.gui.popped_out_channels:
+                    if show:
+                        self.gui.insert_text_widget(quit_message)
+                        self.gui.highlight_nickname()
+                if channel in self.gui.popped_out_channels:
+                    if show:
+                        self.pipe_mode_to_pop_out(quit_message, channel)
 
-                if user_found:
-                    # Update the user listbox for the channel & Modes
-                    current_modes = self.user_modes.get(channel, {})
-                    user_modes = current_modes.get(user_info, set())
-                    current_modes.pop(user_info, None)
-                    self.update_user_listbox(channel)
+                # Update the user listbox for the channel
+                self.update_user_listbox(channel)
 
         except Exception as e:
             logging.error(f"Error in handle_quit: {e}")
 
     async def handle_nick(self, tokens):
         try:
-            modes_to_strip = ''.join(self.mode_values)
             old_nick = tokens.hostmask.nickname
             new_nick = tokens.params[0]
             message = f"\x0307(⟳)\x0F {old_nick} has changed their nickname to {new_nick}\n"
 
-            # Update the user's nick in all channel_users lists they are part of
-            for channel, users in self.channel_users.items():
-                for idx, user_with_symbol in enumerate(users):
-                    # Check if the stripped user matches old_nick
-                    if user_with_symbol.lstrip(modes_to_strip) == old_nick:
-                        # Extract the mode symbols from the old nickname
-                        mode_symbols = ''.join([c for c in user_with_symbol if c in modes_to_strip])
-                        
-                        # Replace old_nick with new_nick, retaining the mode symbols
-                        users[idx] = mode_symbols + new_nick
-                        
-                        # Update the user listbox for the channel if necessary
-                        self.update_user_listbox(channel)
-
-                        # Display the nick change message in the channel
-                        if self.server not in self.channel_messages:
-                            self.channel_messages[self.server] = {}
-                        if channel not in self.channel_messages[self.server]:
-                            self.channel_messages[self.server][channel] = []
-                        if self.show_join_part_quit_nick:
-                            self.channel_messages[self.server][channel].append(f"\x0307(⟳)\x0F {old_nick} has changed their nickname to {new_nick}\n")
-                        
-                        # Insert message into the text widget only if this is the current channel
-                        if channel == self.current_channel and self.gui.irc_client == self and channel not in self.gui.popped_out_channels:
-                            if self.show_join_part_quit_nick:
-                                self.gui.insert_text_widget(message)
-                                self.gui.highlight_nickname()
-                        if channel in self.gui.popped_out_channels:
-                            if self.show_join_part_quit_nick:
-                                self.pipe_mode_to_pop_out(message, channel)
+            # Rename the user in every channel they are in, modes are kept
+            for channel in self.members.rename(old_nick, new_nick):
+                # Update the user listbox for the channel if necessary
+                self.update_user_listbox(channel)
 
-                        break
+                # Display the nick change message in the channel
+                if self.show_join_part_quit_nick:
+                    self.history.add_line(self.server, channel, message)
+
+                # Insert message into the text widget only if this is the current channel
+                if channel == self.current_channel and self.gui.irc_client == self and channel not in self.gui.popped_out_channels:
+                    if self.show_join_part_quit_nick:
+                        self.gui.insert_text_widget(message)
+                        self.gui.highlight_nickname()
+                if channel in self.gui.popped_out_channels:
+                    if self.show_join_part_quit_nick:
+                        self.pipe_mode_to_pop_out(message, channel)
 
             # If the old nickname is the same as the client's current nickname, update the client state
             if old_nick == self.nickname:
@@ -1933,58 +1970,6 @@ class RudeChatClient:
         except Exception as e:
             logging.error(f"Error in handle_nick: {e}")
 
-    def sort_users(self, users, channel):
-        try:
-            self.channel_users[channel] = []
-            sorted_users = []
-            current_modes = self.user_modes.get(channel, {})
-
-            raw_users = []
-            for user_with_possible_mode in users:
-                detected_modes = set()
-                for mode, symbol in self.mode_to_symbol.items():
-                    if user_with_possible_mode.startswith(symbol):
-                        detected_modes.add(mode)
-                        user_with_possible_mode = user_with_possible_mode[len(symbol):]
-
-                # Update the user's modes in the current_modes dictionary
-                if detected_modes:
-                    if user_with_possible_mode in current_modes:
-                        current_modes[user_with_possible_mode].update(detected_modes)
-                    else:
-                        current_modes[user_with_possible_mode] = detected_modes
-
-                raw_users.append(user_with_possible_mode)
-
-            # Now, for each raw user, apply the highest-priority mode
-            mode_priority = list(self.mode_to_symbol.keys())
-            for user in raw_users:
-                modes = current_modes.get(user, set())
-
-                # Pick the highest priority mode for the user
-                chosen_mode = None
-                for priority_mode in mode_priority:
-                    if priority_mode in modes:
-                        chosen_mode = priority_mode
-                        break
-
-                mode_symbol = self.mode_to_symbol.get(chosen_mode, "")
-                sorted_users.append(f"{mode_symbol}{user}")
-
-            # Sort the user list based on the mode symbols
-            sorted_users = sorted(
-                sorted_users,
-                key=lambda x: (mode_priority.index(next((m for m, s in self.mode_to_symbol.items() if s == x[0]), None)) if x and x[0] in self.mode_to_symbol.values() else len(mode_priority),x,))
-
-
-            # Update the user modes dictionary and the channel_users list
-            self.user_modes[channel] = current_modes
-            self.channel_users[channel] = sorted_users
-            return sorted_users
-
-        except Exception as e:
-            logging.error(f"Error in sort_users: {e}")
-
     def handle_mode(self, tokens):
         try:
             giver = tokens.source.split("!")[0]
@@ -2007,8 +1992,6 @@ class RudeChatClient:
                 if adding is None:
                     continue
 
-                current_modes = self.user_modes.get(channel, {})
-
                 if adding:
                     if stripped_mode in self.chanmodes.get('no_parameter', []) or stripped_mode in self.chanmodes.get('parameter', []):
                         message = f"\x0304(!)\x0F +{mode} mode for {channel} by {giver}\n"
@@ -2025,7 +2008,7 @@ class RudeChatClient:
                         self._log_channel_message(channel, message)
                         continue
 
-                    current_modes.setdefault(user, set()).add(mode)
+                    self.members.set_mode(channel, user, mode, True)
                     message = f"\x0303(+)\x0F {user} has been given mode +{mode} by {giver}\n"
                     self._log_channel_message(channel, message)
                     user_index += 1
@@ -2046,37 +2029,12 @@ class RudeChatClient:
                         self._log_channel_message(channel, message)
                         continue
 
-                    if mode in self.mode_to_symbol:
-                        symbol_to_remove = self.mode_to_symbol[mode]
-                        self.channel_users[channel] = [
-                            u.replace(symbol_to_remove, '') if u.endswith(user) else u
-                            for u in self.channel_users.get(channel, [])
-                        ]
-
-                    user_modes = current_modes.get(user, set())
-                    user_modes.discard(mode)
+                    self.members.set_mode(channel, user, mode, False)
 
                     message = f"\x0304(-)\x0F {user} has had mode +{mode} removed by {giver}\n"
                     self._log_channel_message(channel, message)
-
-                    if not user_modes:
-                        if user in current_modes:
-                            del current_modes[user]
-                        else:
-                            user_modes = set()
-                            for mode, symbol in self.mode_to_symbol.items():
-                                if symbol in user:
-                                    user_modes.add(mode)
-                            # Update the current_modes dictionary
-                            current_modes[user] = user_modes
-                    else:
-                        current_modes[user] = user_modes
-
-                    self.user_modes[channel] = current_modes
                     user_index += 1
 
-                sorted_users = self.sort_users(self.channel_users.get(channel, []), channel)
-                self.channel_users[channel] = sorted_users
                 self.update_user_listbox(channel)
                 if channel == self.current_channel:
                     self.gui.update_nick_channel_label()
@@ -2104,28 +2062,18 @@ class RudeChatClient:
                     self.gui.highlight_nickname()
             if channel in self.gui.popped_out_channels:
                 self.pipe_mode_to_pop_out(message, channel)
-            if self.server not in self.channel_messages:
-                self.channel_messages[self.server] = {}
-            if channel not in self.channel_messages[self.server]:
-                self.channel_messages[self.server][channel] = []
-            self.channel_messages[self.server][channel].append(message)
+            self.history.add_line(self.server, channel, message)
 
     def update_user_listbox(self, channel):
         try:
-            current_users = self.channel_users.get(channel, [])
-            sorted_users = self.sort_users(current_users, channel)
-            
-            # Remove duplicates from the sorted_users list
-            unique_users = list(dict.fromkeys(sorted_users))
-            
             # Only update the user listbox if the channel is the currently selected channel
             if channel == self.current_channel and self.gui.irc_client == self and channel not in self.gui.popped_out_channels:
-                # Update the Tkinter Listbox to reflect the current users in the channel
-                self.gui.user_listbox.delete(0, tk.END)  # Clear existing items
-                for user in unique_users:
-                    self.gui.user_listbox.insert(tk.END, user)
-                self.gui.highlight_away_users()
+                # Apply the membership changes to the Tkinter Listbox
+                self.gui.show_user_list(self, channel)
                 self.gui.update_users_label()
+            elif not self.channel_on_screen(channel):
+                # Background channel, it is sorted again when it is shown
+                self.members.unwatch(channel)
         except Exception as e:
             logging.error(f"Error1 in update_user_listbox: {e}")
         
@@ -2159,15 +2107,34 @@ class RudeChatClient:
                     _, mappings = param.split("=")
                     modes, symbols = mappings[1:].split(")")
                     self.mode_to_symbol = dict(zip(modes, symbols))
+                    self.members.set_prefix(self.mode_to_symbol)
+                elif param.startswith("CASEMAPPING="):
+                    _, casemapping = param.split("=")
+                    self.members.set_casemapping(casemapping)
+                    # Masks are folded with the casemapping
+                    self.ignores.compile(self.ignore_list)
+                    self.highlights.refold()
                 elif param.startswith("CHANTYPES="):
                     _, channel_types = param.split("=")
                     self.chantypes = list(channel_types)
+                elif param == "WHOX" or param.startswith("WHOX="):
+                    self.whox = True
                 elif param.startswith("NICKLEN="):
                     _, nick_len = param.split("=")
                     self.nicknamelen = int(nick_len)
                 elif param.startswith("CHANLIMIT="):
-                    _, chan_limit = param.split("=")
-                    self.chan_limit = int(chan_limit.split(":")[1])
+                    _, chan_limit = param.split("=", 1)
+                    self.chanlimits = {}
+                    for group in chan_limit.split(","):
+                        prefixes, _, limit = group.partition(":")
+                        self.chanlimits[prefixes] = int(limit) if limit else None
+                    limits = [limit for limit in self.chanlimits.values() if limit is not None]
+                    self.chan_limit = max(limits) if limits else 0
+                elif param.startswith("TARGMAX="):
+                    _, targmax = param.split("=", 1)
+                    for target in targmax.split(","):
+                        command, _, limit = target.partition(":")
+                        self.targmax[command.upper()] = int(limit) if limit else None
                 elif param.startswith("CHANNELLEN="):
                     _, channel_len = param.split("=")
                     self.channellen = int(channel_len)
@@ -2243,6 +2210,17 @@ class RudeChatClient:
             except Exception as e:
                 logging.error(f"Error in handle_who_reply command 352: {e}")
 
+        elif tokens.command == "354" and tokens.params[1] == WHO_TOKEN: # Scheduled WHOX poll
+            try:
+                nickname = tokens.params[6]
+                status = tokens.params[7]
+                account = tokens.params[9]
+                self._who_reply_data_handler("Away" if status.startswith('G') else "Active", nickname)
+                self.cache_accountname(nickname, account)
+
+            except Exception as e:
+                logging.error(f"Error in handle_who_reply command 354: {e}")
+
         elif tokens.command == "354": # WHOX %nuhsrcdfa
             try:
                 channel = tokens.params[1]
@@ -2278,6 +2256,7 @@ class RudeChatClient:
 
         elif tokens.command == "315":  # End of WHO list
             try:
+                self.who_scheduler.finished(self.members.fold(tokens.params[1]))
                 messages = []
                 for details in self.who_details:
                     message = f"User {details['nickname']} ({details['username']}@{details['host']}) on {details['server']} in {details['channel']} - Status: {details['status']} ({details['mode']}) {details['who_message']}"
@@ -2400,9 +2379,7 @@ class RudeChatClient:
                 self.gui.update_channel_label()
 
             # Add data to the channel history
-            if whois_channel not in self.channel_messages[self.server]:
-                self.channel_messages[self.server][whois_channel] = [] 
-            self.channel_messages[self.server][whois_channel].append(f"{whois_response}\n")
+            self.history.add_line(self.server, whois_channel, f"{whois_response}\n")
 
             # Update the GUI
             self.gui.insert_and_scroll()
@@ -2443,20 +2420,13 @@ class RudeChatClient:
         Handle the KICK event from the server.
         """
         try:
-            modes_to_strip = ''.join(self.mode_values)
             channel = tokens.params[0]
             kicked_nickname = tokens.params[1]
             reason = tokens.params[2] if len(tokens.params) > 2 else 'No reason provided'
 
-            # Update the message history for the channel
-            if self.server not in self.channel_messages:
-                self.channel_messages[self.server] = {}
-            if channel not in self.channel_messages[self.server]:
-                self.channel_messages[self.server][channel] = []
-
             # Display the kick message in the chat window only if the channel is the current channel
             kick_message_content = f"\x0304(←)\x0F {kicked_nickname} has been kicked from {channel} by {tokens.hostmask.nickname} ({reason})\n"
-            self.channel_messages[self.server][channel].append(kick_message_content)
+            self.history.add_line(self.server, channel, kick_message_content)
 
             if channel == self.current_channel and self.gui.irc_client == self and channel not in self.gui.popped_out_channels:
                 self.gui.insert_text_widget(kick_message_content)
@@ -2464,20 +2434,11 @@ class RudeChatClient:
             if channel in self.gui.popped_out_channels:
                 self.pipe_mode_to_pop_out(kick_message_content, channel)
 
-            # Remove the user from the channel_users list for the channel
-            user_found = False
-            for user_with_symbol in self.channel_users.get(channel, []):
-                # Check if the stripped user matches kicked_nickname
-                if user_with_symbol.lstrip(modes_to_strip) == kicked_nickname:
-                    user_found = True
-                    self.channel_users[channel].remove(user_with_symbol)
-                    break
-
-            if user_found:
+            # Remove the user from the channel members
+            if self.members.fold(kicked_nickname) == self.members.fold(self.nickname):
+                self.members.remove_channel(channel)
+            elif self.members.remove(channel, kicked_nickname):
                 # Update the user listbox for the channel
-                current_modes = self.user_modes.get(channel, {})
-                user_modes = current_modes.get(kicked_nickname, set())
-                current_modes.pop(kicked_nickname, None)
                 self.update_user_listbox(channel)
         except Exception as e:
             logging.error(f"Error1 in handle_kick_event: {e}")
@@ -2534,14 +2495,8 @@ class RudeChatClient:
             try:
                 current_channel = tokens.params[2]
                 users = tokens.params[3].split(" ")
-                # If this channel isn't in channel_users, initialize it with an empty list
-                if current_channel not in self.channel_users:
-                    self.channel_users[current_channel] = []
-
-                # Append the users to the channel's list only if they are not already in it
-                for user in users:
-                    if user not in self.channel_users[current_channel]:
-                        self.channel_users[current_channel].append(user)
+                # Add or refresh each member, prefixes become modes
+                self.members.add_names(current_channel, users)
 
             except Exception as e:
                 logging.error(f"Error in handle_names_list command 353: {e}")
@@ -2550,12 +2505,8 @@ class RudeChatClient:
             try:
                 current_channel = tokens.params[1]
                 if current_channel:
-                    # Get the list of users for the current channel or an empty list if the key doesn't exist
-                    channel_users = self.channel_users.get(current_channel, [])
-                    # Sort the list of users
-                    sorted_users = self.sort_users(channel_users, current_channel)
-                    # Update the channel users with the sorted list
-                    self.channel_users[current_channel] = sorted_users
+                    # Drop anyone who was not in this NAMES reply
+                    self.members.end_names(current_channel)
                     # Update the user listbox
                     self.update_user_listbox(current_channel)
 
@@ -2622,12 +2573,7 @@ class RudeChatClient:
                 self.gui.channel_topics[self.server][channel_name] = topic
 
                 # Add TOPIC CHANGED message to channel history & Display message 
-                if self.server not in self.channel_messages:
-                    self.channel_messages[self.server] = {}
-                if channel_name not in self.channel_messages[self.server]:
-                    self.channel_messages[self.server][channel_name] = []
-
-                self.channel_messages[self.server][channel_name].append(message)
+                self.history.add_line(self.server, channel_name, message)
 
                 # Set the topic for the channel under the server entry
                 if channel_name == self.current_channel and self.gui.irc_client == self:
@@ -2706,12 +2652,16 @@ class RudeChatClient:
             logging.error(f"Error in parse_prefix: {e}")
 
     async def handle_incoming_message(self, config_file):
-        buffer = ""
         current_users_list = []
         current_channel = ""
         timeout_seconds = 256
 
         while self.loop_running:
+            # Lines framed with the last read, or left over from the welcome
+            # phase, are handled before waiting on the socket again
+            for line in self.framer.lines():
+                await self.handle_incoming_line(line)
+
             try:
                 if self.log_on:
                     logging.debug("Waiting for data...")
@@ -2723,7 +2673,7 @@ class RudeChatClient:
                 self.gui.insert_text_widget(f"TimeoutError Caught In handle_incoming_message: {e}\n")
                 logging.warning(f"TimeoutError Caught In handle_incoming_message: {e}")
                 await self.send_message(f'QUIT :{e.strerror}')
-                await self.reconnect(config_file)
+                await self.reconnect(config_file, ping_timeout=True)
                 continue
 
             except OSError as e:
@@ -2744,189 +2694,182 @@ class RudeChatClient:
                 await self.reconnect(config_file)
                 continue
 
-            try:
-                decoded_data = data.decode('UTF-8', errors='ignore')
+            self.framer.feed(data)
+
+    async def handle_incoming_line(self, line):
+        try:
+            line = line.replace("\x06", "")  # Remove the character with ASCII value 6
+
+            if not self.use_colors:
+                # Remove IRC colors and formatting using regular expressions
+                line = re.sub(r'\x03(?:\d{1,2}(?:,\d{1,2})?)?', '', line)
+
+            if self.log_on:
+                logging.debug(f"Line framed: {line}")
+        except Exception as e:
+            logging.exception(f"Exception occurred during data processing: {e}")
+            return
+
+        try:
+            # Check for an empty line or line with only whitespace before attempting to tokenize
+            if len(line.strip()) == 0:
                 if self.log_on:
-                    logging.debug(f"Decoded data: {decoded_data}...")
-                cleaned_data = decoded_data.replace("\x06", "")  # Remove the character with ASCII value 6
+                    logging.info(f"Debug: Received an empty or whitespace-only line: '{line}'\n")
+                return
+
+            # Additional check: Ensure that the line has at least one character
+            if len(line) < 1:
                 if self.log_on:
-                    logging.debug(f"Cleaned data (post ASCII-6 removal): {cleaned_data}...")
+                    logging.info(f"Debug: Received a too-short line: '{line}'\n")
+                return
 
-                if not self.use_colors:
-                    # Remove IRC colors and formatting using regular expressions
-                    cleaned_data = re.sub(r'\x03(?:\d{1,2}(?:,\d{1,2})?)?', '', cleaned_data)
-                    if self.log_on:
-                        logging.debug(f"Cleaned data (post color removal): {cleaned_data}...")
+            # Debug statement before tokenizing line
+            if self.log_on:
+                logging.info(f"Debug: About to tokenize the line - '{line}'")
 
-                buffer += cleaned_data
-                if self.log_on:
-                    logging.debug(f"Buffer updated: {buffer}...")
+            tokens = irctokens.tokenise(line)
+        except ValueError as e:
+            self.gui.insert_text_widget(f"ValueError in handle_incoming_message: {e}\n")
+            logging.error(f"ValueError in handle_incoming_message: {e}")
+            return
+        except IndexError as ie:
+            self.gui.insert_text_widget(f"IndexError in handle_incoming_message: {ie}. Line: '{line}'\n")
+            logging.error(f"IndexError in handle_incoming_message: {ie}. Line: '{line}'")
+            return
 
-            except Exception as e:
-                logging.exception(f"Exception occurred during data processing: {e}")
-                continue
+        if self.multiline_batches.collect(tokens):
+            return
 
-            while '\n' in buffer:
-                line, buffer = buffer.split('\n', 1)
-                try:
-                    # Check for an empty line or line with only whitespace before attempting to tokenize
-                    if len(line.strip()) == 0:
-                        if self.log_on:
-                            logging.info(f"Debug: Received an empty or whitespace-only line: '{line}'\n")
-                        continue
+        if not await self.dispatcher.dispatch(tokens):
+            if self.log_on:
+                logging.info(f"Unhandled Token command in handle_incoming_message: {tokens.command}.")
+                logging.info(f"Unhandled Token in handle_incoming_message: {tokens}")
+                logging.info(f"Unhandled Line in handle_incoming_message: {line}")
+            if line.startswith(f":{self.server}"):
+                self.handle_server_message(line)
 
-                    # Additional check: Ensure that the line has at least one character
-                    if len(line) < 1:
-                        if self.log_on:
-                            logging.info(f"Debug: Received a too-short line: '{line}'\n")
-                        continue
+    def register_handlers(self):
+        """
+        Command and numeric routing for handle_incoming_message.
+        """
+        register = self.dispatcher.register
+        register("PRIVMSG", self.handle_privmsg)
+        register("AWAY", self.handle_away)
+        register("CAP", self.handle_cap)
+        register("ERROR", self.handle_error)
+        register(("001", "005", "321", "412"), self.ignore_tokens)
+        register(("002", "003", "004"), self.server_message_handler)
+        register("250", self.handle_connection_info)
+        register(("251", "252", "253", "254", "255", "265"), self.server_message_handler)
+        register("266", self.handle_global_users_info)
+        register("263", self.handle_263)
+        register(("353", "366"), self.handle_names_list)
+        register("372", self.handle_motd_line)
+        register("375", self.handle_motd_start)
+        register("376", self.handle_motd_end)
+        register(("305", "306"), self.handle_away_status)
+        register("307", self.command_307)
+        register("391", self.handle_time_request)
+        register(("352", "315", "354"), self.handle_who_reply)
+        register(("311", "312", "313", "317", "319", "301", "671", "338", "318", "330"), lambda tokens: self.handle_whois_replies(tokens.command, tokens))
+        register(("332", "333", "TOPIC"), self.handle_topic)
+        register("324", self.handle_mode_info)
+        register("329", self.handle_creation_time)
+        register("328", self.handle_328)
+        register("367", self.handle_banlist)
+        register("368", self.handle_endofbanlist)
+        register("378", self.command_378)
+        register("379", self.command_379)
+        register("401", self.handle_nickname_doesnt_exist)
+        register("396", self.command_396)
+        register("900", self.command_900)
+        register("403", self.command_403)
+        register("404", self.command_404)
+        register("442", self.handle_not_on_channel)
+        register("443", self.handle_already_on_channel)
+        register("472", self.handle_unknown_mode)
+        register(("473", "475", "474", "471"), self.unable_to_join_channel)
+        register("477", self.handle_cannot_join_channel)
+        register("482", self.handle_not_channel_operator)
+        register("487", self.command_487)
+        register("433", self.command_433)
+        register("432", self.command_432)
+        register("322", self.handle_list_entry)
+        register("323", lambda tokens: self.save_channel_list_to_file())
+        register(("476", "479"), self.handle_bad_channel_name)
+        register("KICK", self.handle_kick_event)
+        register("NOTICE", self.handle_notice_message)
+        register("JOIN", self.handle_join)
+        register("PART", self.handle_part)
+        register("QUIT", self.handle_quit)
+        register("NICK", self.handle_nick)
+        register("MODE", self.handle_mode)
+        register("PING", self.handle_ping)
+        register("KILL", self.handle_kill_command)
+        register("PONG", self.handle_pong)
+        register("INVITE", self.handle_invite)
+        register("ACCOUNT", self.handle_account_message)
+        register("BATCH", self.handle_batch)
+
+    def ignore_tokens(self, tokens):
+        pass
+
+    def handle_away_status(self, tokens):
+        if tokens.command == "305":
+            message = f"{self.server_name}: You are no longer marked as being away"
+        else:
+            message = f"{self.server_name}: You have been marked as being away"
+        self.gui.insert_text_widget(f"{message}\n")
 
-                    # Debug statement before tokenizing line
-                    if self.log_on:
-                        logging.info(f"Debug: About to tokenize the line - '{line}'")
+    async def handle_ping(self, tokens):
+        ping_param = tokens.params[0]
+        await self.send_message(f'PONG {ping_param}')
 
-                    tokens = irctokens.tokenise(line)
-                except ValueError as e:
-                    self.gui.insert_text_widget(f"ValueError in handle_incoming_message: {e}\n")
-                    logging.error(f"ValueError in handle_incoming_message: {e}")
-                    continue
-                except IndexError as ie:
-                    self.gui.insert_text_widget(f"IndexError in handle_incoming_message: {ie}. Line: '{line}'\n")
-                    logging.error(f"IndexError in handle_incoming_message: {ie}. Line: '{line}'")
-                    continue
+    async def handle_list_entry(self, tokens):
+        await self.handle_list_response(tokens)
+        await self.channel_window.update_channel_info(tokens.params[1], tokens.params[2], tokens.params[3])
+
+    def show_handler_stats(self, args):
+        if len(args) > 2 and args[2] == "reset":
+            self.dispatcher.reset()
+            self.gui.insert_text_widget("Handler stats have been reset.\n")
+            return
+        self.gui.insert_text_widget(f"Handler stats for {self.server_name}:\n")
+        for line in self.dispatcher.report():
+            self.gui.insert_text_widget(f"{line}\n")
+
+    async def search_logs(self, args):
+        """
+        /search [#channel] [nick:foo] terms - ranked hits from the chat logs.
+        """
+        channel = None
+        nick = None
+        terms = []
+        for arg in args:
+            if channel is None and not terms and arg[:1] in self.chantypes:
+                channel = arg
+            elif arg.lower().startswith("nick:") and len(arg) > 5:
+                nick = arg[5:]
+            else:
+                terms.append(arg)
 
-                match tokens.command:
-                    case "PRIVMSG":
-                        await self.handle_privmsg(tokens)
-                    case "AWAY":
-                        self.handle_away(tokens)
-                    case "CAP":
-                       await self.handle_cap(tokens)
-                    case "ERROR":
-                        self.handle_error(tokens)
-                    case "001":
-                        pass
-                    case "002" | "003" | "004":
-                        self.server_message_handler(tokens)
-                    case "005":
-                        pass
-                    case "250":
-                        self.handle_connection_info(tokens)
-                    case "251" | "252" | "253" | "254" | "255" | "265":
-                        self.server_message_handler(tokens)
-                    case "266":
-                        self.handle_global_users_info(tokens)
-                    case "263":
-                        self.handle_263(tokens)
-                    case "412":
-                        pass
-                    case "353" | "366":  # NAMES list
-                        self.handle_names_list(tokens)
-                    case "372":
-                        self.handle_motd_line(tokens)
-                    case "375":
-                        self.handle_motd_start(tokens)
-                    case "376":
-                        self.handle_motd_end(tokens)
-                    case "305":
-                        message = f"{self.server_name}: You are no longer marked as being away"
-                        self.gui.insert_text_widget(f"{message}\n")
-                    case "306":
-                        message = f"{self.server_name}: You have been marked as being away"
-                        self.gui.insert_text_widget(f"{message}\n")
-                    case "307":
-                        self.command_307(tokens)
-                    case "391":
-                        self.handle_time_request(tokens)
-                    case "352" | "315" | "354":
-                        await self.handle_who_reply(tokens)
-                    case "311" | "312" | "313" | "317" | "319" | "301" | "671" | "338" | "318" | "330":
-                        await self.handle_whois_replies(tokens.command, tokens)
-                    case "332" | "333" | "TOPIC":
-                        self.handle_topic(tokens)
-                    case "321":
-                        pass
-                    case "324":
-                        self.handle_mode_info(tokens)
-                    case "329":
-                        self.handle_creation_time(tokens)
-                    case "328":
-                        self.handle_328(tokens)
-                    case "367":  
-                        self.handle_banlist(tokens)     
-                    case "368":  
-                        self.handle_endofbanlist(tokens)
-                    case "378":
-                        self.command_378(tokens)
-                    case "379":
-                        self.command_379(tokens)
-                    case "401":
-                        self.handle_nickname_doesnt_exist(tokens)
-                    case "396":
-                        self.command_396(tokens)
-                    case "900":
-                        self.command_900(tokens)
-                    case "403":
-                        self.command_403(tokens)
-                    case "404":
-                        self.command_404(tokens)
-                    case "442":
-                        self.handle_not_on_channel(tokens)
-                    case "443":
-                        self.handle_already_on_channel(tokens)
-                    case "472":
-                        self.handle_unknown_mode(tokens)
-                    case "473" | "475" | "474" | "471":
-                        self.unable_to_join_channel(tokens)
-                    case "477":
-                        self.handle_cannot_join_channel(tokens)
-                    case "482":
-                        self.handle_not_channel_operator(tokens)
-                    case "487":
-                        self.command_487(tokens)
-                    case "433":
-                        self.command_433(tokens)
-                    case "432":
-                        self.command_432(tokens)
-                    case "322":  # Channel list
-                        await self.handle_list_response(tokens)
-                        await self.channel_window.update_channel_info(tokens.params[1], tokens.params[2], tokens.params[3])
-                    case "323":  # End of channel list
-                        await self.save_channel_list_to_file()
-                    case "476" | "479":
-                        await self.handle_bad_channel_name(tokens)
-                    case "KICK":
-                        await self.handle_kick_event(tokens)
-                    case "NOTICE":
-                        self.handle_notice_message(tokens)
-                    case "JOIN":
-                        self.handle_join(tokens)
-                    case "PART":
-                        self.handle_part(tokens)
-                    case "QUIT":
-                        self.handle_quit(tokens)
-                    case "NICK":
-                        await self.handle_nick(tokens)
-                    case "MODE":
-                        self.handle_mode(tokens)
-                    case "PING":
-                        ping_param = tokens.params[0]
-                        await self.send_message(f'PONG {ping_param}')
-                    case "KILL":
-                        self.handle_kill_command(tokens)
-                    case "PONG":
-                        self.handle_pong(tokens)
-                    case "INVITE":
-                        await self.handle_invite(tokens)
-                    case "ACCOUNT":
-                        self.handle_account_message(tokens)
-                    case _:
-                        if self.log_on:
-                            logging.info(f"Unhandled Token command in handle_incoming_message: {tokens.command}.")
-                            logging.info(f"Unhandled Token in handle_incoming_message: {tokens}")
-                            logging.info(f"Unhandled Line in handle_incoming_message: {line}")
-                        if line.startswith(f":{self.server}"):
-                            self.handle_server_message(line)
+        if not terms and not nick:
+            self.gui.insert_text_widget("Usage: /search [#channel] [nick:foo] terms\n")
+            return
+
+        source = f"{self.server_name}_{self.sanitize_channel_name(channel)}" if channel else None
+        log_index.start()
+        try:
+            hits, elapsed = await asyncio.to_thread(log_index.search, terms, nick, source)
+        except Exception as e:
+            logging.error(f"Error searching logs: {e}")
+            self.gui.insert_text_widget(f"Search failed: {e}\n")
+            return
+
+        self.gui.insert_text_widget(f"Search results for {' '.join(args)} ({len(hits)} hits in {elapsed:.1f} ms):\n")
+        for timestamp, hit_source, hit_nick, text in hits:
+            sender = f"<{hit_nick}> " if hit_nick else ""
+            self.gui.insert_text_widget(f"[{timestamp}] {hit_source}: {sender}{text}\n")
 
     def unable_to_join_channel(self, tokens):
         channel = tokens.params[1]
@@ -2991,6 +2934,10 @@ class RudeChatClient:
     def command_396(self, tokens):
         hidden_host = tokens.params[1]
         reason = tokens.params[2]
+        if "@" in hidden_host:
+            self.own_userhost = hidden_host
+        elif self.own_userhost:
+            self.own_userhost = f"{self.own_userhost.split('@', 1)[0]}@{hidden_host}"
         data = f"Your host is now hidden as: {hidden_host}. Reason: {reason}\n"
         self.add_server_message(data)
 
@@ -3154,23 +3101,24 @@ class RudeChatClient:
             else:
                 log_line += f'           <{sender if is_sent else self.nickname}> {line}\n'
 
-        # Determine script directory
-        logs_directory = os.path.join(self.script_directory, 'Logs')
-
         try:
             if channel == self.nickname:
                 channel = sender
-            # Create the Logs directory if it doesn't exist
-            os.makedirs(logs_directory, exist_ok=True)
-
-            # Construct the full path for the log file inside the Logs directory
-            filename = os.path.join(logs_directory, f'irc_log_{server}_{self.sanitize_channel_name(channel)}.txt')
-
-            with open(filename, 'a', encoding='utf-8') as file:
-                file.write(log_line)
+            # Queued for the background log writer
+            log_writer.write(self.log_file_path(server, channel), log_line)
         except Exception as e:
             logging.error(f"Error logging message: {e}")
 
+    def log_file_path(self, server, channel):
+        """
+        Path of the log file for a channel, split per day when log_per_day is set
+        so finished days can be compressed or archived.
+        """
+        name = f'irc_log_{server}_{self.sanitize_channel_name(channel)}'
+        if self.log_per_day:
+            name += datetime.datetime.now().strftime('_%Y-%m-%d')
+        return os.path.join(self.script_directory, 'Logs', f'{name}.txt')
+
     async def handle_query_command(self, args, timestamp):
         modes_to_strip = ''.join(self.mode_values)
         if len(args) < 2:
@@ -3237,8 +3185,8 @@ class RudeChatClient:
         else:
             await self.send_message(f'PART {channel}')
 
-        # Remove the channel entry from user_modes if it exists
-        self.user_modes.pop(channel, None)
+        # Forget the channel members
+        self.members.remove_channel(channel)
 
         # Remove the channel from joined_channels if it exists
         if channel in self.joined_channels:
@@ -3329,15 +3277,12 @@ class RudeChatClient:
             self.update_gui_channel_list()
             self.gui.update_channel_label()
 
-        if mentions_channel not in self.channel_messages[self.server]:
-            self.channel_messages[self.server][mentions_channel] = []
-
         for target, messages in self.mentions.items():
             mention_header = f"Mentions for {target}:\n"
-            self.channel_messages[self.server][mentions_channel].append(mention_header)
+            self.history.add_line(self.server, mentions_channel, mention_header)
             for message in messages:
                 mention_message = f" - {message}\n"
-                self.channel_messages[self.server][mentions_channel].append(mention_message)
+                self.history.add_line(self.server, mentions_channel, mention_message)
 
         self.gui.highlight_nickname()
                 
@@ -3390,6 +3335,7 @@ class RudeChatClient:
     async def spec_quit(self):
         self.gui.save_nickname_colors()
         self.remove_bang_channels()
+        await self.save_channel_messages()
         await self.send_message(f"QUIT :RudeChat3")
         self.loop_running = False
         await self.stop_async_loop()
@@ -3427,7 +3373,7 @@ class RudeChatClient:
         match primary_command:
             case "join":
                 channel_name = args[1]
-                await self.join_channel(channel_name)
+                await self.join_channel(channel_name, args[2] if len(args) > 2 else None)
                 if self.account_notify:
                     await self.send_message(f'WHO {channel_name} %nuhsrcdfa')
                 else:
@@ -3616,6 +3562,9 @@ class RudeChatClient:
             case "mac":
                 await self.handle_mac_command(args)
 
+            case "stop":
+                self.stop_paced_sending()
+
             case "notice":
                 await self.handle_notice_command(args)
 
@@ -3664,6 +3613,15 @@ class RudeChatClient:
             case "logs" | "fortunes" | "macros" | "swhois":
                 self.show_file_folder(primary_command)
 
+            case "search":
+                await self.search_logs(args[1:])
+
+            case "stats":
+                if len(args) > 1 and args[1] == "handlers":
+                    self.show_handler_stats(args)
+                else:
+                    self.gui.insert_text_widget("Usage: /stats handlers [reset]\n")
+
             case None:
                 await self.handle_user_input(user_input, timestamp)
 
@@ -3707,43 +3665,112 @@ class RudeChatClient:
             self.gui.insert_text_widget("Error: /watch [+/-]nickname, Example: /watch +Rude to add, /watch -Rude to remove.\n")
             self.gui.insert_text_widget(f"{watch_list}\n")
 
-    async def send_message_chunks(self, message_chunks, timestamp):
-        for chunk in message_chunks:
-            # Split the chunk into lines
-            lines = chunk.split('\n')
+    async def send_message_chunks(self, lines, timestamp):
+        # Green text is applied per line, before lines are split to fit
+        styled_lines = [self.green_texter(line) for line in lines if line]
 
-            # Send each line separately
-            for line in lines:
-                if line:  # Skip empty lines
-                    # Apply green text formatting here for each line
-                    styled_line = self.green_texter(line)
+        async def show(styled_line):
+            # Get the mode symbol for the current user
+            user_mode = self.get_user_mode(self.nickname, self.current_channel)
+            mode_symbol = self.get_mode_symbol(user_mode) if user_mode else ''
 
-                    # Send the styled line as a message
-                    await self.send_message(f'PRIVMSG {self.current_channel} :{styled_line}')
-                    
-                    # Get the mode symbol for the current user
-                    user_mode = self.get_user_mode(self.nickname, self.current_channel)
-                    mode_symbol = self.get_mode_symbol(user_mode) if user_mode else ''
-                    
-                    # Insert the message into the text widget
-                    if self.use_time_stamp:
-                        self.gui.insert_text_widget(f"{timestamp}<{mode_symbol}{self.nickname}> {styled_line}\n")
-                    else:
-                        self.gui.insert_text_widget(f"<{mode_symbol}{self.nickname}> {styled_line}\n")
-                    self.gui.highlight_nickname()
+            # Insert the message into the text widget
+            if self.use_time_stamp:
+                self.gui.insert_text_widget(f"{timestamp}<{mode_symbol}{self.nickname}> {styled_line}\n")
+            else:
+                self.gui.insert_text_widget(f"<{mode_symbol}{self.nickname}> {styled_line}\n")
+            self.gui.highlight_nickname()
 
-                    # Check if it's a DM or channel
-                    if any(self.current_channel.startswith(prefix) for prefix in self.chantypes):  # It's a channel
-                        self.user_input_channel_message(styled_line, timestamp, mode_symbol)
-                    else:  # It's a DM
-                        self.user_input_dm_message(styled_line, timestamp)
-                        await self._away_user_helper()
+            # Check if it's a DM or channel
+            if any(self.current_channel.startswith(prefix) for prefix in self.chantypes):  # It's a channel
+                self.user_input_channel_message(styled_line, timestamp, mode_symbol)
+            else:  # It's a DM
+                self.user_input_dm_message(styled_line, timestamp)
+                await self._away_user_helper()
 
-                    # If there's only one item in the list, don't wait
-                    if len(message_chunks) == 1 and len(lines) == 1:
-                        return
-                    else:
-                        await asyncio.sleep(0.7)
+        await self.send_privmsg_lines(self.current_channel, styled_lines, show)
+
+    async def send_privmsg_lines(self, target, lines, show=None):
+        """
+        Send lines to target as PRIVMSGs. Lines that would not fit the 512
+        byte limit once the server puts our nick!user@host in front are
+        split on spaces, formatting carrying over to the next piece. With
+        draft/multiline several lines, or one long one, go out as a batch
+        the receiving clients show as one message.
+
+        show is awaited with each piece once it is sent, or with each line
+        of a batch. Several messages go through the bulk lane, so /stop
+        cuts them short.
+        """
+        lines = [line for line in lines if line]
+        if not lines:
+            return
+        budget = line_budget(self.nickname, self.own_userhost, target)
+        if self.multiline and (len(lines) > 1 or len(lines[0].encode('utf-8')) > budget):
+            await self.send_multiline(target, lines, budget, show)
+            return
+
+        pieces = [piece for line in lines for piece in split_message(line, budget)]
+        paced = len(pieces) > 1
+        for piece in pieces:
+            if paced:
+                if not await self.send_paced(f'PRIVMSG {target} :{piece}'):
+                    return
+            else:
+                await self.send_message(f'PRIVMSG {target} :{piece}')
+            if show:
+                await show(piece)
+
+    async def send_multiline(self, target, lines, budget, show=None):
+        """
+        Send lines as draft/multiline batches within the server's max-bytes
+        and max-lines. Pieces of a split line are sent with
+        draft/multiline-concat so they are joined back without a line break.
+        """
+        max_bytes = self.multiline["max-bytes"]
+        max_lines = self.multiline["max-lines"]
+
+        # (text, joins the previous piece, the line it ends or None)
+        entries = []
+        for line in lines:
+            pieces = split_message(line, budget, carry_formatting=False)
+            for index, piece in enumerate(pieces):
+                entries.append((piece, index > 0, line if index == len(pieces) - 1 else None))
+
+        batches = []
+        batch = []
+        batch_bytes = 0
+        for piece, concat, ends in entries:
+            size = len(piece.encode('utf-8')) + (0 if concat or not batch else 1)
+            if batch and (batch_bytes + size > max_bytes or (max_lines and len(batch) >= max_lines)):
+                batches.append(batch)
+                batch = []
+                batch_bytes = 0
+                size = len(piece.encode('utf-8'))
+            batch.append((piece, concat, ends))
+            batch_bytes += size
+        batches.append(batch)
+
+        for batch in batches:
+            self.batch_ref += 1
+            ref = f"rude{self.batch_ref}"
+            if not await self.send_paced(f'BATCH +{ref} draft/multiline {target}'):
+                return
+            sent = 0
+            for piece, concat, _ in batch:
+                # A batch never starts with a continuation
+                tags = f"batch={ref};draft/multiline-concat" if concat and sent else f"batch={ref}"
+                if not await self.send_paced(f'@{tags} PRIVMSG {target} :{piece}'):
+                    break
+                sent += 1
+            # Close it even after /stop so the server delivers what it already has
+            await self.send_message(f'BATCH -{ref}')
+            if show:
+                for _, _, ends in batch[:sent]:
+                    if ends is not None:
+                        await show(ends)
+            if sent < len(batch):
+                return
 
     async def _away_user_helper(self):
         try:
@@ -3796,43 +3823,19 @@ class RudeChatClient:
             return
 
     def user_input_channel_message(self, chunk, timestamp, mode_symbol):
-        if self.server not in self.channel_messages:
-            self.channel_messages[self.server] = {}
-        if self.current_channel not in self.channel_messages[self.server]:
-            self.channel_messages[self.server][self.current_channel] = []
-
-        if self.use_time_stamp == True:
-            self.channel_messages[self.server][self.current_channel].append(f"{timestamp}<{mode_symbol}{self.nickname}> {chunk}\n")
-        elif self.use_time_stamp == False:
-            self.channel_messages[self.server][self.current_channel].append(f"<{mode_symbol}{self.nickname}> {chunk}\n")
+        self.history.add_message(self.server, self.current_channel, self.nickname, chunk, mode_symbol)
 
         # Log the sent message using the new logging method
         self.log_message(self.server_name, self.current_channel, self.nickname, chunk, is_sent=True)
 
     def user_input_dm_message(self, chunk, timestamp):
-        server_name = self.server
-        if server_name not in self.channel_messages:
-            self.channel_messages[server_name] = {}
-        if self.current_channel not in self.channel_messages[server_name]:
-            self.channel_messages[server_name][self.current_channel] = []
-        if self.use_time_stamp == True:
-            self.channel_messages[server_name][self.current_channel].append(f"{timestamp}<{self.nickname}> {chunk}\n")
-        elif self.use_time_stamp == False:
-            self.channel_messages[server_name][self.current_channel].append(f"<{self.nickname}> {chunk}\n")
+        self.history.add_message(self.server, self.current_channel, self.nickname, chunk)
 
         # Log the sent message using the new logging method
         self.log_message(self.server_name, self.current_channel, self.nickname, chunk, is_sent=True)
 
     def query_msg_handler(self, user, chunk, timestamp):
-        server_name = self.server
-        if server_name not in self.channel_messages:
-            self.channel_messages[server_name] = {}
-        if user not in self.channel_messages[server_name]:
-            self.channel_messages[server_name][user] = []
-        if self.use_time_stamp == True:
-            self.channel_messages[server_name][user].append(f"{timestamp}<{self.nickname}> {chunk}\n")
-        elif self.use_time_stamp == False:
-            self.channel_messages[server_name][user].append(f"<{self.nickname}> {chunk}\n")
+        self.history.add_message(self.server, user, self.nickname, chunk)
 
         # Log the sent message using the new logging method
         self.log_message(self.server_name, user, self.nickname, chunk, is_sent=True)
@@ -3854,20 +3857,8 @@ class RudeChatClient:
             processed_input = escaped_input
 
         if self.current_channel:
-            # Split the input into lines
-            lines = processed_input.splitlines()
-            
-            # Check the length of the first line
-            first_line = lines[0]
-            if len(first_line) > 420:
-                # If the first line is longer than 420 characters, split the input into chunks
-                message_chunks = [processed_input[i:i+420] for i in range(0, len(processed_input), 420)]
-            else:
-                # Otherwise, pass the input without chunking
-                message_chunks = [processed_input]
-            
-            # Send message chunks (green text is applied within send_message_chunks)
-            await self.send_message_chunks(message_chunks, timestamp)
+            # Lines are split to fit the server's limit in send_message_chunks
+            await self.send_message_chunks(processed_input.splitlines(), timestamp)
         else:
             self.gui.insert_text_widget(f"No channel selected. Use /join to join a channel.\n")
 
@@ -3888,8 +3879,8 @@ class RudeChatClient:
             if macro_name in self.ASCII_ART_MACROS:
                 for line in self.ASCII_ART_MACROS[macro_name].splitlines():
                     formatted_message = self.format_message(line, timestamp)
-                    await self.send_message(f'PRIVMSG {channel} :{formatted_message}')
-                    await asyncio.sleep(0.4)
+                    if not await self.send_paced(f'PRIVMSG {channel} :{formatted_message}'):
+                        break
                     if self.use_time_stamp:
                         window.insert_text(f"{timestamp} <{mode_symbol}{self.nickname}> {formatted_message}")
                     else:
@@ -3915,8 +3906,8 @@ class RudeChatClient:
             current_time = datetime.datetime.now().strftime('[%H:%M:%S] ')
             for line in self.ASCII_ART_MACROS[macro_name].splitlines():
                 formatted_message = self.format_message(line, current_time)
-                await self.send_message(f'PRIVMSG {selected_channel} :{formatted_message}')
-                await asyncio.sleep(0.4)
+                if not await self.send_paced(f'PRIVMSG {selected_channel} :{formatted_message}'):
+                    break
                 if selected_channel == self.current_channel:
                     if self.use_time_stamp:
                         self.gui.insert_text_widget(f"{current_time}<{mode_symbol}{self.nickname}> {formatted_message}")
@@ -3968,6 +3959,7 @@ class RudeChatClient:
             user_to_ignore = " ".join(args[1:])
             if user_to_ignore not in self.ignore_list:
                 self.ignore_list.append(user_to_ignore)
+                self.ignores.compile(self.ignore_list)
                 self.gui.insert_text_widget(f"You've ignored {user_to_ignore}.\n")
                 await self.save_ignore_list()
             else:
@@ -3984,6 +3976,7 @@ class RudeChatClient:
         user_to_unignore = args[1]
         if user_to_unignore in self.ignore_list:
             self.ignore_list.remove(user_to_unignore)
+            self.ignores.compile(self.ignore_list)
             self.gui.insert_text_widget(f"You've unignored {user_to_unignore}.\n")
             await self.save_ignore_list()
         else:
@@ -4004,6 +3997,7 @@ class RudeChatClient:
         if os.path.exists(file_path):
             with open(file_path, "r", encoding='utf-8') as f:
                 self.ignore_list = [line.strip() for line in f.readlines()]
+            self.ignores.compile(self.ignore_list)
         else:
             # If the file doesn't exist, create it
             with open(file_path, "w", encoding='utf-8') as f:
@@ -4011,6 +4005,7 @@ class RudeChatClient:
 
     def reload_ignore_list(self):
         self.ignore_list = []
+        self.ignores.compile(self.ignore_list)
         self.load_ignore_list()
         self.gui.insert_text_widget(f"Ignore List reloaded.\n")
 
@@ -4040,32 +4035,9 @@ class RudeChatClient:
         self.gui.insert_text_widget(end_message) 
 
     async def append_to_channel_history(self, channel, message, mode_symbol, is_action=False):
-        timestamp = datetime.datetime.now().strftime('[%H:%M:%S] ')
-        
         # Escape color codes in the message
         escaped_message = self.escape_color_codes(message)
-        if self.use_time_stamp:
-            formatted_message = f"{timestamp}<{mode_symbol}{self.nickname}> {escaped_message}\n"
-        else:
-            formatted_message = f"<{mode_symbol}{self.nickname}> {escaped_message}\n"
-
-        # Initialize the server name
-        server_name = self.server
-
-        # Determine if it's a channel or DM
-        is_channel = any(channel.startswith(prefix) for prefix in self.chantypes)
-        if is_channel:  # It's a channel
-            if server_name not in self.channel_messages:
-                self.channel_messages[server_name] = {}
-            if channel not in self.channel_messages[server_name]:
-                self.channel_messages[server_name][channel] = []
-            self.channel_messages[server_name][channel].append(formatted_message)
-        else:  # It's a DM
-            if server_name not in self.channel_messages:
-                self.channel_messages[server_name] = {}
-            if channel not in self.channel_messages[server_name]:
-                self.channel_messages[server_name][channel] = []
-            self.channel_messages[server_name][channel].append(formatted_message)
+        self.history.add_message(self.server, channel, self.nickname, escaped_message, mode_symbol)
 
     async def handle_cowsay_command(self, args):
         user_mode = self.get_user_mode(self.nickname, self.current_channel)
@@ -4169,8 +4141,8 @@ class RudeChatClient:
                 formatted_message = f"{timestamp}<{mode_symbol}{self.nickname}> {line}\n"
             elif self.use_time_stamp == False:
                 formatted_message = f"<{mode_symbol}{self.nickname}> {line}\n"
-            await self.send_message(f'PRIVMSG {selected_channel} :{line}')
-            await asyncio.sleep(0.4)
+            if not await self.send_paced(f'PRIVMSG {selected_channel} :{line}'):
+                break
             await self.append_to_channel_history(selected_channel, line, mode_symbol)
             if selected_channel == self.current_channel:
                 self.gui.insert_text_widget(formatted_message)
@@ -4188,8 +4160,8 @@ class RudeChatClient:
                 formatted_message = f"{timestamp}<{mode_symbol}{self.nickname}> {line}\n"
             elif self.use_time_stamp == False:
                 formatted_message = f"<{mode_symbol}{self.nickname}> {line}\n"
-            await self.send_message(f'PRIVMSG {selected_channel} :{line}')
-            await asyncio.sleep(0.4)
+            if not await self.send_paced(f'PRIVMSG {selected_channel} :{line}'):
+                break
             await self.append_to_channel_history(selected_channel, line, mode_symbol)
             if selected_channel == self.current_channel:
                 self.gui.insert_text_widget(formatted_message)
@@ -4212,8 +4184,8 @@ class RudeChatClient:
                 formatted_message = f"{timestamp}<{mode_symbol}{self.nickname}> {line}\n"
             elif self.use_time_stamp == False:
                 formatted_message = f"<{mode_symbol}{self.nickname}> {line}\n"
-            await self.send_message(f'PRIVMSG {selected_channel} :{line}')
-            await asyncio.sleep(0.4)
+            if not await self.send_paced(f'PRIVMSG {selected_channel} :{line}'):
+                break
             await self.append_to_channel_history(selected_channel, line, mode_symbol)
             if selected_channel == self.current_channel:
                 self.gui.insert_text_widget(formatted_message)
@@ -4337,15 +4309,8 @@ class RudeChatClient:
             self.gui.insert_text_widget(f"{formatted_message}\n")
         self.gui.highlight_nickname()
 
-        # Save the action message to the channel_messages dictionary
-        if self.server not in self.channel_messages:
-            self.channel_messages[self.server] = {}
-        if self.current_channel not in self.channel_messages[self.server]:
-            self.channel_messages[self.server][self.current_channel] = []
-        if self.use_time_stamp == True:
-            self.channel_messages[self.server][self.current_channel].append(f"{timestamp}{formatted_message}\n")
-        elif self.use_time_stamp == False:
-            self.channel_messages[self.server][self.current_channel].append(f"{formatted_message}\n")
+        # Save the action message to the channel history
+        self.history.add_action(self.server, self.current_channel, self.nickname, escaped_input)
 
     def display_help(self):
         # Categories and their associated commands
@@ -4365,6 +4330,7 @@ class RudeChatClient:
                 "/watch Example /watch [+/-]: /watch +exampleuser or /watch -exampleuser",
                 "/mentions to show your nicknames mentions. /mentions clear to clear them.",
                 "/logs - Shows the channel logs folder",
+                "/search [#channel] [nick:foo] terms - Searches the chat logs, best matches first",
                 "/swhois - shows the whois logs collected from DMs if auto whois is turned on or if you've whois'd a user",
                 "_________",
             ],
@@ -4403,6 +4369,7 @@ class RudeChatClient:
                 "/quote <IRC command> - Sends raw IRC message to the server",
                 "/CTCP <nickname> <command> - Sends a CTCP request",
                 "/mode <mode> [channel] - Sets mode for user (optionally in a specific channel)",
+                "/stats handlers [reset] - Shows call counts and timing for each server message handler",
                 "_________",
             ],
             "Broadcasting": [
@@ -4438,6 +4405,7 @@ class RudeChatClient:
                 "/cowsay: Built in, /cowsay <text> | /cowsay <fortune list>",
                 "/fortune: Built in, /fortune <fortune list>",
                 "/mac <macro> - sends a chosen macro to a channel /mac - shows available macros",
+                "/stop - stops a macro, fortune or paste that is still being sent",
                 "/macros - Shows the macros folder",
                 "/fortunes - Shows the fortunes folder",
                 "Macros: To add a macro, save a .txt file with your chosen macro and add it to the Art folder within your installation directory.",
@@ -4462,11 +4430,9 @@ class RudeChatClient:
 
                 # Add help data to the channel history
                 for category, commands in categories.items():
-                    if help_channel not in self.channel_messages[self.server]:
-                        self.channel_messages[self.server][help_channel] = [] 
-                    self.channel_messages[self.server][help_channel].append(f"{category}:\n")
+                    self.history.add_line(self.server, help_channel, f"{category}:\n")
                     for cmd in commands:
-                        self.channel_messages[self.server][help_channel].append(f"{cmd}\n")
+                        self.history.add_line(self.server, help_channel, f"{cmd}\n")
 
             # Update the GUI
             self.gui.insert_and_scroll()
@@ -4481,10 +4447,12 @@ class RudeChatClient:
         self.gui.update_nick_channel_label()
 
     def display_last_messages(self, channel, num=125, server_name=None):
-        if server_name:
-            messages = self.channel_messages.get(server_name, {}).get(channel, [])
-        for message in messages[-num:]:
-            self.gui.insert_text_widget(message)
+        self.display_records(self.history.last(server_name, channel, num))
+
+    def display_records(self, records):
+        # Records are formatted here so display options apply to old lines too
+        for record in records:
+            self.gui.insert_text_widget(record.render(self.use_time_stamp))
 
     def display_server_motd(self, server_name=None):
         if server_name:
@@ -0,0 +1,105 @@
+import inspect
+import time
+from collections import deque
+
+# Registration, from CAP LS to the end of the MOTD (or the ZNC sync)
+WELCOME = "welcome"
+# Everything after that
+CONNECTED = "connected"
+
+
+class HandlerStats:
+    __slots__ = ("calls", "total", "samples")
+
+    def __init__(self, sample_size):
+        self.calls = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+    def record(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        self.samples.append(elapsed)
+
+    def p99(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+class DispatchRegistry:
+    """
+    Maps IRC commands and numerics to handlers and keeps timing for each one.
+    Handlers take the tokenised line and may be plain functions or coroutines.
+
+    Registration and normal operation route the same command differently,
+    so each phase has its own table. Timing is kept per command across both.
+    """
+    def __init__(self, sample_size=512):
+        self.handlers = {WELCOME: {}, CONNECTED: {}}
+        self.stats = {}
+        self.unhandled = {}
+        self.sample_size = sample_size
+
+    def register(self, commands, handler, phase=CONNECTED):
+        if isinstance(commands, str):
+            commands = (commands,)
+        for command in commands:
+            self.handlers[phase][command] = handler
+
+    def get(self, command, phase=CONNECTED):
+        return self.handlers[phase].get(command)
+
+    async def dispatch(self, tokens, phase=CONNECTED):
+        """
+        Run the handler registered for tokens.command in phase.
+        Returns False when nothing is registered so the caller can fall back.
+        """
+        handler = self.handlers[phase].get(tokens.command)
+        if handler is None:
+            self.record_unhandled(tokens.command)
+            return False
+
+        start = time.perf_counter()
+        try:
+            result = handler(tokens)
+            if inspect.isawaitable(result):
+                await result
+        finally:
+            self.record(tokens.command, time.perf_counter() - start)
+        return True
+
+    def record(self, command, elapsed):
+        stats = self.stats.get(command)
+        if stats is None:
+            stats = self.stats[command] = HandlerStats(self.sample_size)
+        stats.record(elapsed)
+
+    def record_unhandled(self, command):
+        self.unhandled[command] = self.unhandled.get(command, 0) + 1
+
+    def reset(self):
+        self.stats.clear()
+        self.unhandled.clear()
+
+    def report(self, limit=25):
+        """Lines describing the slowest handlers by cumulative time."""
+        if not self.stats and not self.unhandled:
+            return ["No handler stats recorded yet."]
+
+        lines = [f"{'Command':<10} {'Calls':>8} {'Total ms':>10} {'Avg ms':>8} {'p99 ms':>8}"]
+        ordered = sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+        for command, stats in ordered[:limit]:
+            average = stats.total / stats.calls if stats.calls else 0.0
+            lines.append(
+                f"{command:<10} {stats.calls:>8} {stats.total * 1000:>10.1f} "
+                f"{average * 1000:>8.2f} {stats.p99() * 1000:>8.2f}"
+            )
+
+        unhandled_total = sum(self.unhandled.values())
+        if unhandled_total:
+            top = sorted(self.unhandled.items(), key=lambda item: item[1], reverse=True)[:10]
+            listed = ", ".join(f"{command}({count})" for command, count in top)
+            lines.append(f"Unhandled: {unhandled_total} - {listed}")
+        return lines
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+
+
+class RudeEngine:
+    """
+    Drives the asyncio loop the clients run on from the Tk main loop.
+
+    Tk used to give the loop a single iteration every 100ms, so a PING or a
+    PRIVMSG waited up to 100ms for each await on its way through, and a
+    line that needed a read, a dispatch and a send took several ticks.
+    Now every frame_ms the loop runs for up to slice_ms. It sleeps in
+    select() for that slice, so a line arriving then is handled straight
+    away and every callback it schedules runs in the same slice. Tk gets
+    the rest of the frame for input and redraws.
+
+    Everything stays on the Tk thread, so the clients can keep calling
+    the GUI directly.
+    """
+    def __init__(self, root, frame_ms=16, slice_ms=8):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.slice_ms = slice_ms
+        self.loop = asyncio.new_event_loop()
+
+    def start(self, coro):
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(coro)
+        self.root.after(self.frame_ms, self.tk_update)
+
+    def tk_update(self):
+        # Scheduled before the slice runs, so a frame starts every frame_ms
+        # and not frame_ms after the slice ended
+        self.root.after(self.frame_ms, self.tk_update)
+        try:
+            self.loop.call_later(self.slice_ms / 1000, self.loop.stop)
+            self.loop.run_forever()
+        except Exception as e:
+            logging.error(f"Exception in tk_update: {e}")
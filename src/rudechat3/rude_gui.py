@@ -5,6 +5,11 @@ from rudechat3.rude_colours import RudeColours
 from rudechat3.format_decoder import Attribute, decoder
 from rudechat3.gui_config_window import GuiConfigWindow
 from rudechat3.rude_popout import RudePopOut
+from rudechat3.rude_tagger import RudeTagger
+from rudechat3.rude_log_writer import log_writer
+from rudechat3.rude_user_list import UserListView
+from rudechat3.rude_text_pages import TextPage, TextPagePool
+from rudechat3.rude_notifier import Notifier
 from rudechat3.shared_imports import *
 from rudechat3.rude_dragndrop import DragDropListbox
 from rudechat3.nick_cleaner import clean_nicknames
@@ -27,6 +32,11 @@ class RudeGui:
             self.master.iconphoto(True, img)
 
         self.read_config()
+        self.notifier = Notifier(
+            os.path.join(self.script_directory, "Sounds", "Notification4.wav"),
+            os.path.join(self.script_directory, "rude.ico"),
+            cooldown=self.notify_cooldown,
+        )
         self.start_tray_icon()
 
         self.irc_colors = {
@@ -66,8 +76,9 @@ class RudeGui:
         self.nickname_colors = self.load_nickname_colors()
         self.clients = {}
         self.channel_topics = {}
-        self.url_cache = {}
-        self.tag_cache = {}
+        self.pending_render = []
+        self.render_job = None
+        self.render_interval = 16
         self.entry_history = []
         self.popped_out_channels = []
         self.pop_out_windows = {}
@@ -76,7 +87,6 @@ class RudeGui:
         self.last_selected_index = None
         self.previous_server_index = None
         self.iconed = False
-        self.url_pattern = re.compile(r'(\w+://[^\s()<>]*\([^\s()<>]*\)[^\s()<>]*(?<![.,;!?])|www\.[^\s()<>]*\([^\s()<>]*\)[^\s()<>]*(?<![.,;!?])|\w+://[^\s()<>]+(?<![.,;!?])|www\.[^\s()<>]+(?<![.,;!?]))')
 
         # Server and Topic Frame
         self.server_topic_frame = tk.Frame(self.master, bg="black")
@@ -90,9 +100,14 @@ class RudeGui:
         self.topic_label.bind("<Leave>", self.hide_topic_tooltip)
         self.tooltip = None
 
-        # Main text widget
-        self.text_widget = ScrolledText(self.frame, wrap='word', cursor="arrow")
-        self.text_widget.grid(row=0, column=0, sticky="nsew")
+        # Main text widget. The scratch page shows splash art and server output,
+        # recently viewed channels keep their own pages when text_cache_size is set
+        self.text_pages = TextPagePool(self.create_text_page, self.text_cache_size)
+        self.scratch_page = self.create_text_page()
+        self.text_page = self.scratch_page
+        self.text_widget = self.scratch_page.widget
+        self.tagger = self.scratch_page.tagger
+        self.tag_cache = self.scratch_page.tag_cache
         self.show_startup_art()
 
         # List frames
@@ -108,7 +123,7 @@ class RudeGui:
 
         self.user_listbox = tk.Listbox(self.user_frame, height=25, width=16)
         self.user_scrollbar = tk.Scrollbar(self.user_frame, orient="vertical", command=self.user_listbox.yview)
-        self.user_listbox.config(yscrollcommand=self.user_scrollbar.set)
+        self.user_list_view = UserListView(self.user_listbox, self.user_scrollbar, self.user_row_colour)
         self.user_listbox.grid(row=1, column=0, sticky='nsew')
         self.user_scrollbar.grid(row=1, column=1, sticky='ns')
         self.user_listbox.bind("<Button-3>", self.show_user_list_menu)
@@ -226,13 +241,15 @@ class RudeGui:
 
         # Apply font settings to text widgets
         self.master.configure(bg=self.master_bg)
-        self.text_widget.configure(font=(self.font_family, self.font_size))
+        for page in [self.scratch_page, *self.text_pages]:
+            page.widget.configure(font=(self.font_family, self.font_size))
         self.server_text_widget.configure(font=(self.font_family, self.font_size))
         self.entry_widget.configure(bg=self.input_bg, fg=self.input_fg, insertbackground=self.input_insertbackground, font=(self.font_family, self.font_size))
         self.nick_channel_label.configure(fg=self.input_label_fg, bg=self.input_label_bg, font=(self.font_family, self.font_size))
 
         # Apply maing GUI color settings
-        self.text_widget.configure(fg=self.main_fg_color, bg=self.main_bg_color)
+        for page in [self.scratch_page, *self.text_pages]:
+            page.widget.configure(fg=self.main_fg_color, bg=self.main_bg_color)
         self.server_text_widget.configure(fg=self.server_fg_color, bg=self.server_bg_color)
 
         # Apply Widget color settings
@@ -251,7 +268,7 @@ class RudeGui:
         self.to_tray = self.to_tray
         self.log_on = self.log_on
         self.hidden_windows()
-        self.highlight_nickname()
+        self.highlight_nickname(force=True)
         self.highlight_away_users()
 
     def read_config(self):
@@ -280,6 +297,9 @@ class RudeGui:
             self.topic_label_font_family = config.get('GUI', 'topic_label_font_family', fallback='Hack')
             self.to_tray = config.getboolean('GUI', 'minimize_to_tray', fallback=True)
             self.log_on = config.getboolean('GUI', 'turn_logging_on', fallback=False)
+            self.max_connecting = config.getint('GUI', 'max_connecting', fallback=4)
+            self.text_cache_size = config.getint('GUI', 'text_cache_size', fallback=0)
+            self.notify_cooldown = config.getfloat('GUI', 'notify_cooldown', fallback=10)
 
             # Read Widget Settings
             self.user_listbox_fg = config.get('WIDGETS', 'users_fg', fallback='#39ff14')
@@ -341,6 +361,9 @@ class RudeGui:
             self.show_server_window = True
             self.channel_select_color = 'blue'
             self.tab_complete_terminator = ":"
+            self.max_connecting = 4
+            self.text_cache_size = 0
+            self.notify_cooldown = 10
             if self.log_on:
                 logging.error("GUI Fallbacks hit.")
 
@@ -446,7 +469,7 @@ class RudeGui:
                 if self.log_on:
                     logging.info(f"Current Loop: {loop}")
 
-                loop.create_task(client.spec_quit(), name="quit_client_task")
+                self.run_coroutine(client.spec_quit(), name="quit_client_task")
 
                 if self.log_on:
                     logging.info(f"Sending QUIT to client: {client}")
@@ -471,7 +494,7 @@ class RudeGui:
                 if self.log_on:
                     logging.info(f"Current Loop: {loop}")
 
-                loop.create_task(client.send_quit(quit_message), name="quit_client_task")
+                self.run_coroutine(client.send_quit(quit_message), name="quit_client_task")
 
                 if self.log_on:
                     logging.info(f"Sending QUIT to client: {client}")
@@ -495,6 +518,17 @@ class RudeGui:
         except Exception as e:
             logging.error(f"Error quitting Clients: {e}")
 
+        try:
+            # Write out any buffered chat logs
+            log_writer.close()
+        except Exception as e:
+            logging.error(f"Error Flushing Logs: {e}")
+
+        try:
+            self.notifier.close()
+        except Exception as e:
+            logging.error(f"Error Stopping Notifier: {e}")
+
         try:
             # Stop and remove the tray icon
             self.remove_tray_icon()
@@ -528,6 +562,7 @@ class RudeGui:
         config_window = GuiConfigWindow(config_file)
         config_window.root.wait_window()
         self.read_config()
+        self.notifier.cooldown = self.notify_cooldown
         self.apply_settings()
 
     def show_startup_art(self):
@@ -571,7 +606,7 @@ class RudeGui:
                 if self.log_on:
                     logging.info(f"Current Loop: {loop}")
 
-                loop.create_task(client.send_away_notification(away_message), name="away_client_task")
+                self.run_coroutine(client.send_away_notification(away_message), name="away_client_task")
 
                 if self.log_on:
                     logging.info(f"Sending AWAY to client: {client}")
@@ -581,6 +616,10 @@ class RudeGui:
             logging.error(f"Error in quit_clients: {e}")
 
     def highlight_away_users(self):
+        if self.user_list_view.rows:
+            # Member lists only colour the rows on screen
+            self.user_list_view.paint_visible()
+            return
         # Loop through the items in the user_listbox
         for index in range(self.user_listbox.size()):
             # Get the username from the listbox
@@ -597,6 +636,15 @@ class RudeGui:
                 # Reset the foreground color if the user is not away
                 self.user_listbox.itemconfig(index, {'fg': self.user_listbox_fg})
 
+    def user_row_colour(self, username):
+        stripped_username = username.lstrip(''.join(self.irc_client.mode_values))
+        if stripped_username in self.irc_client.away_users_dict:
+            return self.away_user_fg
+        return self.user_listbox_fg
+
+    def show_user_list(self, irc_client, channel):
+        self.user_list_view.show(irc_client.members, channel)
+
     def highlight_who_channels(self):
         # Loop through the items in the channel_listbox
         for index in range(self.channel_listbox.size()):
@@ -633,15 +681,64 @@ class RudeGui:
         self.channel_listbox.see(0)
 
     def clear_user_listbox(self):
-        self.user_listbox.delete(0, tk.END)
+        self.user_list_view.clear()
 
     def clear_topic_label(self):
         self.current_topic.set("")
 
     def clear_text_widget(self):
-        self.text_widget.config(state=tk.NORMAL)
-        self.text_widget.delete(1.0, tk.END)
-        self.text_widget.config(state=tk.DISABLED)
+        # Channel pages are kept, the window goes back to an empty scratch page
+        self.show_text_page(self.scratch_page)
+        self.discard_pending_render()
+        self.scratch_page.clear()
+
+    def create_text_page(self):
+        text_widget = ScrolledText(self.frame, wrap='word', cursor="arrow")
+        text_widget.grid(row=0, column=0, sticky="nsew")
+        text_widget.configure(font=(self.font_family, self.font_size), fg=self.main_fg_color, bg=self.main_bg_color)
+        text_widget.bind("<Button-3>", self.show_message_menu)
+        return TextPage(text_widget, RudeTagger(text_widget, self))
+
+    def show_text_page(self, page):
+        if page is self.text_page:
+            return
+        # Queued lines belong to the page being left
+        self.flush_render_queue()
+        self.text_page.leave()
+        self.text_page = page
+        self.text_widget = page.widget
+        self.tagger = page.tagger
+        self.tag_cache = page.tag_cache
+        page.show()
+
+    def open_text_page(self, server, channel_name):
+        """
+        Bring up the page for channel_name. Returns the history records it is
+        missing, or None when the whole history has to be displayed.
+        """
+        if not self.text_pages.enabled:
+            self.clear_text_widget()
+            return None
+        if self.text_page.history is not None and (self.text_page.server, self.text_page.target) == (server, channel_name):
+            return []
+        # Flush before the pool possibly evicts the page being left
+        self.flush_render_queue()
+        history = self.irc_client.history
+        page = self.text_pages.get((server, channel_name))
+        missed = page.missed(history) if page is not None else None
+        if missed is None:
+            page = self.text_pages.add((server, channel_name))
+            page.follow(history, server, channel_name)
+        self.show_text_page(page)
+        if missed is not None:
+            # The nickname may have changed while the page was hidden
+            page.tagger.retag_all()
+        return missed
+
+    def drop_text_pages(self):
+        """Forget the pre-rendered pages, they are rebuilt from history when next shown."""
+        self.text_pages.clear(keep=self.text_page)
+        self.text_page.history = None
 
     def clear_server_widget(self):
         self.server_text_widget.config(state=tk.NORMAL)
@@ -851,13 +948,13 @@ class RudeGui:
         root.mainloop()
 
     def reload_macros(self):
-        loop = asyncio.get_event_loop()
-        loop.create_task(self.irc_client.update_available_macros())
+        self.run_coroutine(self.irc_client.update_available_macros())
     
     def open_client_config_window(self):
         def after_config_window_close():
             # Reload configuration after the configuration window is closed
             self.irc_client.reload_config(config_window.config_file)
+            self.drop_text_pages()
 
         def close_window():
             root.destroy()
@@ -1073,15 +1170,13 @@ class RudeGui:
         channel = self.irc_client.current_channel
         if selected_user_index:
             selected_user = self.user_listbox.get(selected_user_index)
-            loop = asyncio.get_event_loop()
-            loop.create_task(self.irc_client.handle_kick_command(["/kick", selected_user, channel, "Bye <3"]))
+            self.run_coroutine(self.irc_client.handle_kick_command(["/kick", selected_user, channel, "Bye <3"]))
 
     def open_query_from_menu(self):
         selected_user_index = self.user_listbox.curselection()
         if selected_user_index:
             selected_user = self.user_listbox.get(selected_user_index)
-            loop = asyncio.get_event_loop()
-            loop.create_task(self.irc_client.handle_query_command(["/query", selected_user], "<3 "))
+            self.run_coroutine(self.irc_client.handle_query_command(["/query", selected_user], "<3 "))
             self.update_channel_label()
 
     def close_query_from_menu(self):
@@ -1096,8 +1191,7 @@ class RudeGui:
         if selected_channel_index:
             selected_channel = self.channel_listbox.get(selected_channel_index)
             if '#' in selected_channel:
-                loop = asyncio.get_event_loop()
-                loop.create_task(self.irc_client.leave_channel(selected_channel, reason))
+                self.run_coroutine(self.irc_client.leave_channel(selected_channel, reason))
                 self.update_channel_label()
 
     def whois_from_menu(self):
@@ -1106,12 +1200,11 @@ class RudeGui:
         if selected_user_index:
             selected_user = self.user_listbox.get(selected_user_index)
             cleaned_nickname = selected_user.lstrip(modes_to_strip)
-            loop = asyncio.get_event_loop()
-            loop.create_task(self.irc_client.whois(cleaned_nickname))
+            self.run_coroutine(self.irc_client.whois(cleaned_nickname))
 
     def reset_nick_colors(self):
         self.nickname_colors = self.load_nickname_colors()
-        self.highlight_nickname()
+        self.highlight_nickname(force=True)
 
     def add_server_to_listbox(self, server_name):
         # Get the current list of servers from the Listbox
@@ -1147,35 +1240,77 @@ class RudeGui:
         self.tooltip = None
 
     def insert_text_widget(self, message):
-        try:
-            self.trim_text_widget()
-            urls = self.find_urls(message)
+        # Queue the message, everything queued within a frame is drawn in one pass
+        self.pending_render.append(message)
+        self.text_page.written += 1
+        if self.render_job is None:
+            self.render_job = self.master.after(self.render_interval, self.flush_render_queue)
+
+    def flush_render_queue(self):
+        self.render_job = None
+        if not self.pending_render:
+            return
+        messages = self.drop_trimmed_messages(self.pending_render)
+        self.pending_render = []
 
-            # Set the Text widget state to NORMAL before inserting and configuring tags
+        try:
             self.text_widget.config(state=tk.NORMAL)
-
-            formatted_text = decoder(message)
-            self.tag_text(formatted_text)
-
-            # Start tagging URLs using the non-blocking approach
-            self.tag_urls(urls)
+            start_index = self.text_widget.index("end-1c")
+
+            # Merge runs of characters sharing a tag so Tk gets one insert for the batch
+            insert_args = []
+            plain_text = []
+            run_text = []
+            run_tag = None
+            for message in messages:
+                for text, attributes in decoder(message):
+                    tag_name = self.get_attribute_tag(attributes)
+                    if tag_name != run_tag and run_text:
+                        plain_text.append("".join(run_text))
+                        insert_args.extend((plain_text[-1], (run_tag,)))
+                        run_text = []
+                    run_tag = tag_name
+                    run_text.append(text)
+            if run_text:
+                plain_text.append("".join(run_text))
+                insert_args.extend((plain_text[-1], (run_tag,)))
+            if insert_args:
+                self.text_widget.insert(tk.END, *insert_args)
+
+            # Nicknames and URLs are tagged for the new text only, before the trim moves line numbers
+            self.tagger.tag_region("".join(plain_text), start_index)
+            self.trim_text_widget()
         except Exception as e:
             logging.error(f"Exception in insert_text {e}")
+        finally:
+            self.text_widget.config(state=tk.DISABLED)
 
-    def tag_text(self, formatted_text):
-        for text, attributes in formatted_text:
-            # Create a tag name based on the attributes
-            tag_name = "_".join(str(attr) for attr in attributes)
-
-            # Check if the tag configuration has changed
-            if tag_name not in self.tag_cache:
-                # If tag configuration is new, determine and cache it
-                tag_config = self.configure_tag_based_on_attributes(attributes)
-                self.text_widget.tag_configure(tag_name, **tag_config)
-                self.tag_cache[tag_name] = tag_config
+        self.insert_and_scroll()
 
-            # Insert the formatted text with the current tag
-            self.text_widget.insert(tk.END, text, (tag_name,))
+    def drop_trimmed_messages(self, messages, max_lines=125):
+        # Anything older than the last max_lines lines would be trimmed straight away
+        line_count = 0
+        for index in range(len(messages) - 1, -1, -1):
+            line_count += messages[index].count("\n")
+            if line_count > max_lines:
+                return messages[index + 1:]
+        return messages
+
+    def discard_pending_render(self):
+        # The widget is being cleared, queued lines would be wiped with it
+        self.pending_render = []
+
+    def get_attribute_tag(self, attributes):
+        # Create a tag name based on the attributes
+        tag_name = "_".join(str(attr) for attr in attributes)
+
+        # Check if the tag configuration has changed
+        if tag_name not in self.tag_cache:
+            # If tag configuration is new, determine and cache it
+            tag_config = self.configure_tag_based_on_attributes(attributes)
+            self.text_widget.tag_configure(tag_name, **tag_config)
+            self.tag_cache[tag_name] = tag_config
+        return tag_name
 
     def configure_tag_based_on_attributes(self, attributes):
         # This method configures tag based on attributes efficiently
@@ -1198,37 +1333,6 @@ class RudeGui:
             tag_config['background'] = hex_background
         return tag_config
 
-    def tag_urls(self, urls, index=0):
-        if index < len(urls):
-            url = urls[index]
-            if url in self.url_cache:
-                tag_name = self.url_cache[url]
-            else:
-                tag_name = f"url_{url}"
-                self.url_cache[url] = tag_name
-                self.text_widget.tag_configure(tag_name, foreground="blue", underline=1)
-
-            start_idx = "1.0"
-            while True:
-                start_idx = self.text_widget.search(url, start_idx, tk.END)
-                if not start_idx:
-                    break
-                end_idx = f"{start_idx}+{len(url)}c"
-                self.text_widget.tag_add(tag_name, start_idx, end_idx)
-                self.text_widget.tag_bind(tag_name, "<Button-1>", lambda event, url=url: self.open_url(event, url))
-                start_idx = end_idx
-
-            # Schedule the next URL tagging
-            self.text_widget.after(1, self.tag_urls, urls, index + 1)
-        else:
-            # Set the Text widget state back to DISABLED after configuring tags
-            self.text_widget.config(state=tk.DISABLED)
-            self.insert_and_scroll()
-
-    def find_urls(self, text):
-        # Use the precompiled regex pattern to find URLs
-        return self.url_pattern.findall(text)
-
     def open_url(self, event, url):
         webbrowser.open(url)
 
@@ -1257,22 +1361,34 @@ class RudeGui:
     def add_client(self, server_name, irc_client):
         self.clients[server_name] = irc_client # Store clients here.
 
-        # Get the current list of servers from the Listbox
-        current_servers = list(self.server_listbox.get(0, tk.END))
-
-        # Add the new server_name to the list if it's not already there
-        if not any(server.startswith(server_name) for server in current_servers):
-            current_servers.append(server_name)
-
-        # Update the Listbox with the new list of servers
-        self.server_listbox.delete(0, tk.END)  # Clear the existing items
-        for server in current_servers:
-            self.server_listbox.insert(tk.END, server)
-
-        self.server_var.set(server_name)  # Set the current server
-        self.server_listbox.select_set(0)
+        # Add the server to the Listbox, replacing its connecting entry. The
+        # selection is left alone, it has to stay on the server being shown
+        self.show_server_status(server_name)
         self.channel_lists[server_name] = irc_client.joined_channels
 
+    def show_server_status(self, server_name, status=None):
+        """Show server_name in the server Listbox, with status in brackets while it connects."""
+        label = f"{server_name} ({status})" if status else server_name
+        for index, server in enumerate(self.server_listbox.get(0, tk.END)):
+            if server.split(" ")[0] == server_name:
+                if server != label:
+                    selected = index in self.server_listbox.curselection()
+                    self.server_listbox.delete(index)
+                    self.server_listbox.insert(index, label)
+                    if selected:
+                        self.server_listbox.selection_set(index)
+                return
+        self.server_listbox.insert(tk.END, label)
+
+    def select_server(self, server_name):
+        for index, server in enumerate(self.server_listbox.get(0, tk.END)):
+            if server.split(" ")[0] == server_name:
+                self.server_listbox.selection_clear(0, tk.END)
+                self.server_listbox.selection_set(index)
+                self.server_listbox.see(index)
+                self.on_server_change(None)
+                return
+
     def server_checker(self, existing_server):
         # Convert the existing server to lowercase
         existing_server_lower = existing_server.lower()
@@ -1337,12 +1453,19 @@ class RudeGui:
             clean_name = selected_server.split(" ")
             actual_server = clean_name[0]
 
+            if actual_server not in self.clients:
+                # Still connecting
+                return
+
             # Update the current server in the IRC client
             self.irc_client.current_server = actual_server
             self.irc_client = self.clients.get(actual_server, None)
 
             # If the IRC client exists
             if self.irc_client:
+                # Kept in step with the client being shown
+                self.server_var.set(actual_server)
+
                 # Set the server name in the RudeChatClient instance
                 self.irc_client.set_server_name(actual_server)
 
@@ -1419,15 +1542,19 @@ class RudeGui:
         except Exception as e:
             logging.error(f"Error reading configuration from {config_file}: {e}")
 
+        # Use the server_name from config, otherwise fallback
+        server_name = getattr(irc_client, "server_name", None) or fallback_server_name
+        self.show_server_status(server_name, "connecting")
+
         try:
             await irc_client.connect(config_file)
         except Exception as e:
             logging.error(f"Error connecting with configuration {config_file}: {e}")
 
         try:
-            # Use the server_name from config, otherwise fallback
-            server_name = irc_client.server_name if irc_client.server_name else fallback_server_name
             self.add_client(server_name, irc_client)
+            if irc_client.writer is None:
+                self.show_server_status(server_name, "failed")
         except Exception as e:
             logging.error(f"Error adding client {server_name}: {e}")
 
@@ -1442,11 +1569,6 @@ class RudeGui:
         except Exception as e:
             logging.error(f"Error starting auto_save task: {e}")
 
-        try:
-            irc_client.tasks["auto_trim"] = asyncio.create_task(irc_client.auto_trim(), name="auto_trim_task")
-        except Exception as e:
-            logging.error(f"Error starting auto_trim task: {e}")
-
         try:
             irc_client.tasks["handle_incoming_message"] = asyncio.create_task(irc_client.handle_incoming_message(config_file), name="handle_incoming_message_task")
         except Exception as e:
@@ -1468,7 +1590,7 @@ class RudeGui:
             logging.error(f"Error starting auto_clean task: {e}")
 
         if self.log_on:
-            logging.info("Finished Creating Client Tasks: auto_who, auto_away, handle_incoming_message, auto_trim, auto_save, & keep_alive")
+            logging.info("Finished Creating Client Tasks: auto_who, auto_away, handle_incoming_message, auto_save, & keep_alive")
 
         try:
             self.bind_return_key()
@@ -1476,10 +1598,13 @@ class RudeGui:
             logging.error(f"Error binding return key: {e}")
         if self.log_on:
             logging.info("Client initializing completed.")
+        return server_name
 
     def bind_return_key(self):
-        loop = asyncio.get_event_loop()
-        self.entry_widget.bind('<Return>', lambda event: loop.create_task(self.on_enter_key(event), name="on_enter_key"))
+        self.entry_widget.bind('<Return>', lambda event: self.run_coroutine(self.on_enter_key(event), name="on_enter_key"))
+
+    def run_coroutine(self, coro, name=None):
+        return asyncio.get_event_loop().create_task(coro, name=name)
 
     async def on_enter_key(self, event):
         try:
@@ -1714,12 +1839,12 @@ class RudeGui:
                     del server_highlighted_channels[clicked_channel]
 
     def trim_text_widget(self):
-        """Trim the text widget to only hold a maximum of 120 lines."""
-        lines = self.text_widget.get("1.0", tk.END).split("\n")
-        if len(lines) > 125:
+        """Trim the text widget to only hold a maximum of 125 lines."""
+        # Line count from the end index, same as splitting get("1.0", END) without copying the text
+        line_count = int(self.text_widget.index("end-1c").split(".")[0]) + 1
+        if line_count > 125:
             self.text_widget.config(state=tk.NORMAL)  # Enable text widget editing
-            self.text_widget.delete("1.0", f"{len(lines) - 125}.0")  # Delete excess lines
-            self.text_widget.config(state=tk.DISABLED)  # Disable text widget editing
+            self.text_widget.delete("1.0", f"{line_count - 125}.0")  # Delete excess lines
 
     def switch_channel(self, channel_name):
         try:
@@ -1728,18 +1853,13 @@ class RudeGui:
             logging.error(f"AttributeError in switch_channel: server assignment {e}")
             return
 
-        # Clear the text window
-        self.text_widget.config(state=tk.NORMAL)
-        self.text_widget.delete(1.0, tk.END)
-        self.text_widget.config(state=tk.DISABLED)
-
-        # Print the current channel topics dictionary
-
         is_channel = any(channel_name.startswith(prefix) for prefix in self.irc_client.chantypes)
 
         if is_channel:
             # It's a channel
-            if server in self.irc_client.channel_messages:
+            if self.irc_client.history.has_server(server):
+                # Bring up the channel's page, or clear the window when pages are off
+                missed = self.open_text_page(server, channel_name)
 
                 self.irc_client.current_channel = channel_name
                 self.update_nick_channel_label()
@@ -1749,16 +1869,18 @@ class RudeGui:
                 self.current_topic.set(f"{current_topic}")
 
                 # Display the last messages for the current channel
-                self.irc_client.display_last_messages(channel_name, server_name=server)
+                self.display_page_messages(channel_name, server, missed)
                 self.highlight_nickname()
 
                 self.irc_client.update_gui_user_list(channel_name)
                 self.insert_and_scroll()
 
             else:
+                self.clear_text_widget()
                 self.insert_text_widget(f"Not a member of channel {channel_name}\n")
 
         else:
+            missed = self.open_text_page(server, channel_name)
             self.clear_user_listbox()
             # Set current channel to the DM
             nickname = self.irc_client.nickname
@@ -1768,13 +1890,21 @@ class RudeGui:
             self.update_nick_channel_label()
 
             # Display the last messages for the current DM
-            self.irc_client.display_last_messages(channel_name, server_name=server)
+            self.display_page_messages(channel_name, server, missed)
             self.insert_and_scroll()
             self.highlight_nickname()
 
             # No topic for DMs
             self.current_topic.set(f"{channel_name}")
 
+    def display_page_messages(self, channel_name, server, missed):
+        if missed is None:
+            self.irc_client.display_last_messages(channel_name, server_name=server)
+        else:
+            # A kept page only needs what arrived while it was hidden
+            self.irc_client.display_records(missed)
+        self.text_page.sync()
+
     def insert_and_scroll(self):
         self.text_widget.see(tk.END)
 
@@ -1782,10 +1912,11 @@ class RudeGui:
         current_channel = self.irc_client.current_channel
 
         if current_channel:
+            self.discard_pending_render()
             self.text_widget.config(state=tk.NORMAL)
             self.text_widget.delete(1.0, tk.END)
             self.text_widget.config(state=tk.DISABLED)
-            self.irc_client.channel_messages[self.irc_client.server][current_channel] = []
+            self.irc_client.history.clear(self.irc_client.server, current_channel)
 
     def get_mode_symbol(self, mode):
         """Return the symbol corresponding to the IRC mode."""
@@ -1793,9 +1924,7 @@ class RudeGui:
 
     def get_user_mode(self, user, channel):
         """Retrieve the user's mode for the given channel."""
-        channel_modes = self.irc_client.user_modes.get(channel, {})
-        user_modes = channel_modes.get(user, set())
-        return next(iter(user_modes), None)  # Get the first mode if available, else None
+        return self.irc_client.members.top_mode(channel, user)
 
     def update_nick_channel_label(self):
         """Update the label with the current nickname and channel."""
@@ -1805,78 +1934,48 @@ class RudeGui:
         mode_symbol = self.get_mode_symbol(user_mode) if user_mode else ''
         self.current_nick_channel.set(f"{mode_symbol}{nickname} | {channel}" + " ▷")
 
-    def highlight_nickname(self):
+    def highlight_nickname(self, force=False):
         """Highlight the user's nickname in the text_widget."""
-        modes = self.irc_client.mode_values + ['']
-        user_nickname = self.irc_client.nickname
-        if not user_nickname:
+        if self.pending_render and not force:
+            # Queued text is tagged as it is flushed
             return
+        if not self.irc_client.nickname:
+            return
+        if force:
+            # Hidden pages would keep the old colours
+            self.drop_text_pages()
+        # Inserted text is already tagged, this only rescans when the nickname or colours change
+        self.tagger.retag_all(force=force)
 
-        # Configure the color for the user's nickname
-        self.text_widget.tag_configure("nickname", foreground=self.user_nickname_color)
-
-        # Start at the beginning of the text_widget
-        start_idx = "1.0"
-        while True:
-            # Find the position of the next instance of the user's nickname
-            start_idx = self.text_widget.search(user_nickname, start_idx, stopindex=tk.END, regexp=True, nocase=True)
-            if not start_idx:
-                break
-
-            # Calculate the end index based on the length of the nickname
-            end_idx = self.text_widget.index(f"{start_idx}+{len(user_nickname)}c")
+    def get_nickname_color(self, nickname_with_brackets):
+        modes = self.irc_client.mode_values + ['']
 
-            # Apply the tag to the found nickname
-            self.text_widget.tag_add("nickname", start_idx, end_idx)
+        # Extract the nickname without modes
+        modes_to_strip = ''.join(self.irc_client.mode_values)
+        nickname = nickname_with_brackets.strip('<>')
+        plain_nickname = nickname.lstrip(modes_to_strip)
+
+        # Check if the plain nickname color is already in the cache
+        if f"<{plain_nickname}>" in self.nickname_colors:
+            nickname_color = self.nickname_colors[f"<{plain_nickname}>"]
+            # Cache the color for the nickname with modes
+            self.nickname_colors[nickname_with_brackets] = nickname_color
+        else:
+            # If nickname doesn't have an assigned color, generate one
+            if self.generate_nickname_colors:
+                nickname_color = self.generate_random_color()
+            else:
+                nickname_color = self.main_fg_color
 
-            # Update the start index to search from the position after the current found nickname
-            start_idx = end_idx
+            # If it's the main user's nickname, set color to user_nickname_color
+            for mode in modes:
+                if nickname_with_brackets == f"<{mode}{self.irc_client.nickname}>":
+                    nickname_color = self.user_nickname_color
 
-        # Start again at the beginning of the text_widget for other nicknames enclosed in <>
-        start_idx = "1.0"
-        while True:
-            # Find the opening '<'
-            start_idx = self.text_widget.search('<', start_idx, stopindex=tk.END)
-            if not start_idx:
-                break
-            # Find the closing '>' ensuring no newlines between
-            end_idx = self.text_widget.search('>', start_idx, f"{start_idx} lineend")
-            if end_idx:
-                end_idx = f"{end_idx}+1c"  # Include the '>' character
-                # Extract the nickname with '<' and '>'
-                nickname_with_brackets = self.text_widget.get(start_idx, end_idx)
-
-                # Extract the nickname without modes
-                modes_to_strip = ''.join(self.irc_client.mode_values)
-                nickname = nickname_with_brackets.strip('<>')
-                plain_nickname = nickname.lstrip(modes_to_strip)
-
-                # Check if the plain nickname color is already in the cache
-                if f"<{plain_nickname}>" in self.nickname_colors:
-                    nickname_color = self.nickname_colors[f"<{plain_nickname}>"]
-                    # Cache the color for the nickname with modes
-                    self.nickname_colors[nickname_with_brackets] = nickname_color
-                else:
-                    # If nickname doesn't have an assigned color, generate one
-                    if self.generate_nickname_colors:
-                        nickname_color = self.generate_random_color()
-                    else:
-                        nickname_color = self.main_fg_color
-
-                    # If it's the main user's nickname, set color to user_nickname_color
-                    for mode in modes:
-                        if nickname_with_brackets == f"<{mode}{self.irc_client.nickname}>":
-                            nickname_color = self.user_nickname_color
-
-                    # Cache the color
-                    self.nickname_colors[nickname_with_brackets] = nickname_color
-                    self.nickname_colors[f"<{plain_nickname}>"] = nickname_color
-
-                self.text_widget.tag_configure(f"nickname_{nickname_with_brackets}", foreground=nickname_color)
-                self.text_widget.tag_add(f"nickname_{nickname_with_brackets}", start_idx, end_idx)
-                start_idx = end_idx
-            else:
-                start_idx = f"{start_idx}+1c"
+            # Cache the color
+            self.nickname_colors[nickname_with_brackets] = nickname_color
+            self.nickname_colors[f"<{plain_nickname}>"] = nickname_color
+        return nickname_color
 
     def generate_random_color(self):
         while True:
@@ -1889,48 +1988,6 @@ class RudeGui:
             if max(r, g, b) - min(r, g, b) > 50:  # 50 is the threshold, you can adjust this value as needed
                 return "#{:02x}{:02x}{:02x}".format(r, g, b)
 
-    async def trigger_desktop_notification(self, channel_name=None, title="RudeChat", message_content=None):
-        """
-        Show a system desktop notification.
-        """
-        # Check if the application window is the active window
-        if self.is_app_focused():  # If the app is focused, return early
-            return
-
-        if channel_name:
-            # Ensure channel_name is a string
-            channel_name = str(channel_name)
-
-            # Construct the notification title and message
-            title = f"{title}"
-            if message_content:
-                message = f"{channel_name}: {message_content}"
-            else:
-                message = f"You've been pinged in {channel_name}!"
-
-        icon_path = os.path.join(self.script_directory, "rude.ico")
-
-        try:
-            if platform.system() == "Linux":
-                # Use plyer for Linux notifications
-                plyer_notification.notify(
-                    title=title,
-                    message=message,
-                    app_icon=icon_path,
-                    timeout=5,
-                )
-
-            elif platform.system() == "Windows":
-                # Use win10toast_click & threading for Windows notifications
-                from win10toast import ToastNotifier
-                toaster = ToastNotifier()
-                toaster.show_toast(title, message, icon_path=icon_path, duration=5, threaded=True)
-                while toaster.notification_active():
-                    await asyncio.sleep(0.1)
-
-        except Exception as e:
-            logging.error(f"Desktop notification error: {e}")
-
     def is_app_focused(self):
         return bool(self.master.focus_displayof())
 
@@ -1964,7 +2021,7 @@ class RudeGui:
             away_text = f"You're Away"
             self.user_label.config(text=away_text, fg="red")
         else:
-            user_num = len(self.irc_client.channel_users.get(self.irc_client.current_channel, []))
+            user_num = self.irc_client.members.count(self.irc_client.current_channel)
             
             if user_num == 0:
                 user_num = self.user_listbox.size()
@@ -2003,8 +2060,8 @@ class RudeGui:
 
         # Get the user list for the current channel
         current_channel = self.irc_client.current_channel
-        if current_channel in self.irc_client.channel_users:
-            user_list = self.irc_client.channel_users[current_channel]
+        if self.irc_client.members.has_channel(current_channel):
+            user_list = self.irc_client.members.display_list(current_channel)
         else:
             user_list = self.user_listbox.get(0, tk.END)
 
@@ -0,0 +1,93 @@
+import re
+
+from rudechat3.rude_ignore import IgnoreMatcher
+
+# Colour, bold, italic, underline, reverse and reset codes, so "\x0304nick" still matches
+FORMATTING = re.compile(r'\x03(?:\d{1,2}(?:,\d{1,2})?)?|[\x02\x0F\x11\x16\x1D\x1E\x1F]')
+
+
+class HighlightEngine:
+    """
+    Decides whether a message highlights us. The nickname, nick aliases and
+    highlight words are compiled into one case-insensitive regex, and every
+    channel with words of its own gets one regex with those added. A word
+    only counts on its own, "rude" does not match "rudechat".
+
+    Senders matching an ignore mask (nick!user@host globs, for bots that
+    repeat everyone's nick) never highlight. The masks are matched like the
+    ignore list, folded with fold, the server's casemapping.
+
+    Patterns are compiled on first use and kept until the nickname or the
+    configuration changes. Most lines mention none of the terms, a
+    substring test on the lowered line rules those out before the regex
+    has to check word boundaries.
+    """
+    def __init__(self, fold=str.lower):
+        self.words = []
+        self.aliases = []
+        self.channel_words = {}
+        self.ignore_masks = []
+        self.nickname = None
+        self.patterns = {}
+        self.ignores = IgnoreMatcher(fold)
+
+    def configure(self, words=(), aliases=(), channel_words=None, ignore_masks=()):
+        self.words = [word for word in words if word]
+        self.aliases = [alias for alias in aliases if alias]
+        self.channel_words = {channel.lower(): [word for word in channel_words[channel] if word] for channel in (channel_words or {})}
+        self.ignore_masks = [mask for mask in ignore_masks if mask]
+        self.patterns.clear()
+        self.ignores.compile(self.ignore_masks)
+
+    def refold(self):
+        """Recompile the ignore masks after the casemapping changed."""
+        self.ignores.compile(self.ignore_masks)
+
+    @staticmethod
+    def split_words(value):
+        return [word.strip() for word in (value or "").split(",") if word.strip()]
+
+    @staticmethod
+    def parse_channel_words(value):
+        """Parse "#chan1: word, word; #chan2: word" into {channel: [words]}."""
+        channel_words = {}
+        for entry in (value or "").split(";"):
+            channel, _, words = entry.partition(":")
+            if channel.strip() and words.strip():
+                channel_words.setdefault(channel.strip(), []).extend(HighlightEngine.split_words(words))
+        return channel_words
+
+    def pattern_for(self, nickname, channel=None):
+        """(regex, lowered terms) for channel, or None if there is nothing to look for."""
+        if nickname != self.nickname:
+            self.patterns.clear()
+            self.nickname = nickname
+        key = channel.lower() if channel and channel.lower() in self.channel_words else None
+        if key in self.patterns:
+            return self.patterns[key]
+        terms = [nickname] + self.aliases + self.words + self.channel_words.get(key, [])
+        terms = sorted({term for term in terms if term}, key=len, reverse=True)
+        compiled = None
+        if terms:
+            alternatives = "|".join(re.escape(term) for term in terms)
+            # Lookarounds instead of \b, nicks may start or end with [ ] \ ` ^ { } |
+            pattern = re.compile(rf'(?<!\w)(?:{alternatives})(?!\w)', re.IGNORECASE)
+            compiled = (pattern, tuple({term.lower() for term in terms}))
+        self.patterns[key] = compiled
+        return compiled
+
+    def match(self, nickname, channel, message, sender_hostmask=None):
+        """The highlighted word in message, or None."""
+        if self.ignores.ignored(sender_hostmask):
+            return None
+        compiled = self.pattern_for(nickname, channel)
+        if compiled is None:
+            return None
+        pattern, terms = compiled
+        if not message.isprintable():
+            message = FORMATTING.sub("", message)
+        lowered = message.lower()
+        if not any(term in lowered for term in terms):
+            return None
+        found = pattern.search(message)
+        return found.group() if found else None
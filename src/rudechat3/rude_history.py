@@ -0,0 +1,146 @@
+import sys
+import time
+from collections import deque
+
+MESSAGE = "message"
+ACTION = "action"
+LINE = "line"
+
+
+class HistoryRecord:
+    """
+    One line of channel history. Messages and actions keep their parts and
+    are formatted when rendered, LINE records hold preformatted text.
+    """
+    __slots__ = ("timestamp", "sender", "mode", "kind", "text")
+
+    def __init__(self, kind, text, sender="", mode="", timestamp=None):
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.sender = sys.intern(sender) if sender else ""
+        self.mode = mode
+        self.kind = kind
+        self.text = text
+
+    def render(self, use_time_stamp=True):
+        if self.kind == LINE:
+            return self.text
+        stamp = time.strftime('[%H:%M:%S] ', time.localtime(self.timestamp)) if use_time_stamp else ""
+        if self.kind == ACTION:
+            return f"{stamp}* {self.sender} {self.text}\n"
+        return f"{stamp}<{self.mode}{self.sender}> {self.text}\n"
+
+    def to_list(self):
+        return [self.timestamp, self.sender, self.mode, self.kind, self.text]
+
+    @classmethod
+    def from_saved(cls, entry):
+        # Older history files hold preformatted strings
+        if isinstance(entry, str):
+            return cls(LINE, entry, timestamp=0)
+        timestamp, sender, mode, kind, text = entry
+        return cls(kind, text, sender, mode, timestamp)
+
+
+class HistoryStore:
+    """
+    Per server, per target history. Each target is a bounded ring buffer so
+    busy channels never grow past max_messages.
+    Changes since the last save are queued in pending so they can be
+    appended to disk instead of rewriting the whole history.
+
+    Each target also counts its appends, bumping an epoch when it is
+    cleared, so a view can ask for just the records added since mark().
+    """
+    def __init__(self, max_messages=125):
+        self.max_messages = max_messages
+        self.servers = {}
+        self.pending = []
+        self.counts = {}
+
+    def target(self, server, target):
+        """Return the ring buffer for target, creating it if needed."""
+        targets = self.servers.setdefault(server, {})
+        history = targets.get(target)
+        if history is None:
+            history = targets[target] = deque(maxlen=self.max_messages)
+        return history
+
+    def append(self, server, target, record):
+        self.target(server, target).append(record)
+        self.pending.append((server, target, record))
+        count = self.counts.get((server, target))
+        if count is None:
+            self.counts[(server, target)] = [0, 1]
+        else:
+            count[1] += 1
+
+    def add_message(self, server, target, sender, text, mode=""):
+        self.append(server, target, HistoryRecord(MESSAGE, text, sender, mode))
+
+    def add_action(self, server, target, sender, text):
+        self.append(server, target, HistoryRecord(ACTION, text, sender))
+
+    def add_line(self, server, target, text):
+        self.append(server, target, HistoryRecord(LINE, text))
+
+    def has_server(self, server):
+        return server in self.servers
+
+    def last(self, server, target, num):
+        history = self.servers.get(server, {}).get(target)
+        if not history:
+            return []
+        if num >= len(history):
+            return list(history)
+        return list(history)[-num:]
+
+    def clear(self, server, target):
+        self.target(server, target).clear()
+        self.pending.append((server, target, None))
+        self.bump_epoch(server, target)
+
+    def remove_targets(self, predicate):
+        for server, targets in self.servers.items():
+            for target in [target for target in targets if predicate(target)]:
+                del targets[target]
+                self.pending.append((server, target, None))
+                self.bump_epoch(server, target)
+
+    def bump_epoch(self, server, target):
+        epoch, _ = self.counts.get((server, target), (0, 0))
+        self.counts[(server, target)] = [epoch + 1, 0]
+
+    def mark(self, server, target):
+        """Position in target's history, to be passed to since() later."""
+        return tuple(self.counts.get((server, target), (0, 0)))
+
+    def since(self, server, target, mark):
+        """
+        Records appended to target after mark, or None if that can no longer
+        be told because the target was cleared or the ring buffer wrapped.
+        """
+        epoch, appended = self.counts.get((server, target), (0, 0))
+        if mark is None or epoch != mark[0]:
+            return None
+        missed = appended - mark[1]
+        if missed < 0 or missed > self.max_messages:
+            return None
+        if missed == 0:
+            return []
+        return self.last(server, target, missed)
+
+    def take_pending(self):
+        """
+        Hand over the changes made since the last call. A record of None
+        means the target was cleared.
+        """
+        pending, self.pending = self.pending, []
+        return pending
+
+    def load_records(self, rows):
+        """Fill the store from (server, target, record) rows, oldest first."""
+        self.servers = {}
+        for server, target in list(self.counts):
+            self.bump_epoch(server, target)
+        for server, target, record in rows:
+            self.target(server, target).append(record)
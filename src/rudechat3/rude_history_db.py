@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from rudechat3.rude_history import HistoryRecord
+
+
+class HistoryDatabase:
+    """
+    Append-only channel history on disk, one SQLite database per server in
+    WAL mode. New records are written in batches and only the last few
+    messages of each channel are read back at startup.
+
+    Every method blocks, callers on the event loop run them with
+    asyncio.to_thread so disk I/O never stalls the GUI or the network.
+    """
+    def __init__(self, db_path, legacy_json_path=None, keep_messages=125):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self.keep_messages = keep_messages
+        self.connection = None
+        self.lock = threading.RLock()
+
+    def open(self):
+        with self.lock:
+            if self.connection is not None:
+                return
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY, server TEXT NOT NULL, target TEXT NOT NULL, "
+                "timestamp REAL, sender TEXT, mode TEXT, kind TEXT, text TEXT)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS messages_target ON messages (server, target, id)"
+            )
+            self.connection.commit()
+            self.migrate_json()
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def migrate_json(self):
+        """
+        One-time import of the old channel_messages_<server>.json file.
+        The file is renamed afterwards so it is never imported twice.
+        """
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        try:
+            with open(self.legacy_json_path, 'r') as file:
+                content = file.read()
+            data = json.loads(content) if content else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Error reading {self.legacy_json_path} for migration: {e}")
+            return
+
+        rows = []
+        for server, targets in data.items():
+            for target, entries in targets.items():
+                for entry in entries:
+                    try:
+                        record = HistoryRecord.from_saved(entry)
+                    except (TypeError, ValueError) as e:
+                        logging.error(f"Skipping unreadable history entry in {target}: {e}")
+                        continue
+                    rows.append((server, target, *record.to_list()))
+
+        with self.lock:
+            with self.connection:
+                self.insert(rows)
+        try:
+            os.replace(self.legacy_json_path, f"{self.legacy_json_path}.migrated")
+        except OSError as e:
+            logging.error(f"Error renaming {self.legacy_json_path} after migration: {e}")
+
+    def load_recent(self):
+        """
+        Return (server, target, record) rows holding the last keep_messages
+        records of every target, oldest first. Older rows are pruned.
+        """
+        self.open()
+        rows = []
+        with self.lock:
+            targets = self.connection.execute(
+                "SELECT DISTINCT server, target FROM messages"
+            ).fetchall()
+            with self.connection:
+                for server, target in targets:
+                    recent = self.connection.execute(
+                        "SELECT id, timestamp, sender, mode, kind, text FROM messages "
+                        "WHERE server = ? AND target = ? ORDER BY id DESC LIMIT ?",
+                        (server, target, self.keep_messages)
+                    ).fetchall()
+                    if not recent:
+                        continue
+                    self.connection.execute(
+                        "DELETE FROM messages WHERE server = ? AND target = ? AND id < ?",
+                        (server, target, recent[-1][0])
+                    )
+                    for _, timestamp, sender, mode, kind, text in reversed(recent):
+                        rows.append((server, target, HistoryRecord(kind, text, sender, mode, timestamp)))
+        return rows
+
+    def write(self, pending):
+        """
+        Apply a batch from HistoryStore.take_pending in one transaction.
+        A record of None clears the target.
+        """
+        if not pending:
+            return
+        self.open()
+        with self.lock:
+            with self.connection:
+                batch = []
+                for server, target, record in pending:
+                    if record is not None:
+                        batch.append((server, target, *record.to_list()))
+                        continue
+                    self.insert(batch)
+                    batch = []
+                    self.connection.execute(
+                        "DELETE FROM messages WHERE server = ? AND target = ?", (server, target)
+                    )
+                self.insert(batch)
+
+    def insert(self, batch):
+        if batch:
+            self.connection.executemany(
+                "INSERT INTO messages (server, target, timestamp, sender, mode, kind, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", batch
+            )
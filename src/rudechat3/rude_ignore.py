@@ -0,0 +1,55 @@
+import re
+from collections import OrderedDict
+
+
+class IgnoreMatcher:
+    """
+    The ignore list as one compiled regex. Masks are nick!user@host globs,
+    a bare nick means nick!*@*. Both the masks and the hostmasks checked
+    against them are folded with the server's casemapping, so Nick[m]
+    ignores nick{m} on an rfc1459 network. As in ircd masks only * and ?
+    are wildcards, [ and ] are nick characters.
+
+    Verdicts for the most recent cache_size hostmasks are remembered, a
+    busy channel keeps asking about the same few senders. compile() is
+    only called when the list or the casemapping changes.
+    """
+    def __init__(self, fold=str.lower, cache_size=1024):
+        self.fold = fold
+        self.cache_size = cache_size
+        self.masks = []
+        self.pattern = None
+        self.verdicts = OrderedDict()
+
+    @staticmethod
+    def full_mask(mask):
+        if "!" not in mask and "@" not in mask:
+            return f"{mask}!*@*"
+        return mask
+
+    @staticmethod
+    def translate(mask):
+        return "".join(".*" if char == "*" else "." if char == "?" else re.escape(char) for char in mask)
+
+    def compile(self, masks):
+        self.masks = [mask for mask in masks if mask]
+        self.verdicts.clear()
+        if not self.masks:
+            self.pattern = None
+            return
+        globs = "|".join(self.translate(self.fold(self.full_mask(mask))) for mask in self.masks)
+        self.pattern = re.compile(rf"(?:{globs})\Z", re.DOTALL)
+
+    def ignored(self, hostmask):
+        """True if hostmask (nick!user@host) matches an ignore mask."""
+        if self.pattern is None or not hostmask:
+            return False
+        verdict = self.verdicts.get(hostmask)
+        if verdict is not None:
+            self.verdicts.move_to_end(hostmask)
+            return verdict
+        verdict = self.pattern.match(self.fold(hostmask)) is not None
+        self.verdicts[hostmask] = verdict
+        if len(self.verdicts) > self.cache_size:
+            self.verdicts.popitem(last=False)
+        return verdict
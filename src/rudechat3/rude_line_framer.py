@@ -0,0 +1,55 @@
+class LineFramer:
+    """
+    Turns the raw byte stream from the server into decoded IRC lines.
+    Bytes are kept until a full line arrives, so multi-byte UTF-8 split
+    across reads is decoded intact, and lines are peeled off by offset
+    so large bursts (ZNC playback, NAMES) are handled in linear time.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def feed(self, data):
+        self.buffer += data
+
+    def reset(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def next_line(self):
+        """
+        Return the next complete line without its line ending, or None if
+        only a partial line is buffered.
+        """
+        end = self.buffer.find(b'\n', self.position)
+        if end == -1:
+            # Drop everything already consumed in one go
+            if self.position:
+                del self.buffer[:self.position]
+                self.position = 0
+            return None
+
+        stop = end
+        if stop > self.position and self.buffer[stop - 1] == 0x0D:
+            stop -= 1
+        raw = self.buffer[self.position:stop]
+        self.position = end + 1
+        return self.decode(raw)
+
+    def lines(self):
+        """
+        Yield every complete line currently buffered.
+        Safe to abandon part way, the remaining lines stay buffered.
+        """
+        while True:
+            line = self.next_line()
+            if line is None:
+                return
+            yield line
+
+    @staticmethod
+    def decode(raw):
+        try:
+            return raw.decode('UTF-8')
+        except UnicodeDecodeError:
+            return raw.decode('latin-1')
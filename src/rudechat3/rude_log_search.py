@@ -0,0 +1,172 @@
+import glob
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from rudechat3.rude_log_writer import log_writer
+
+
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+LOG_LINE = re.compile(r'^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] (?:<([^>]*)> |\* (\S+) )?(.*)$')
+CONTINUATION = re.compile(r'^ {11}(?:<([^>]*)> )?(.*)$')
+DAY_SUFFIX = re.compile(r'_\d{4}-\d\d-\d\d$')
+
+
+class LogSearchIndex:
+    """
+    SQLite FTS5 index over the irc_log_*.txt files in Logs.
+    Files are ingested from the byte offset reached last time, so only new
+    lines are read. A worker thread does all of the indexing; the log writer
+    tells it which files it has just appended to.
+    """
+    def __init__(self, logs_directory, db_path, batch_size=5000):
+        self.logs_directory = logs_directory
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.connection = None
+        self.lock = threading.Lock()
+        self.tasks = queue.Queue()
+        self.thread = None
+
+    def open(self):
+        if self.connection is not None:
+            return
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, source TEXT, offset INTEGER)"
+        )
+        self.connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5("
+            "text, nick, source UNINDEXED, timestamp UNINDEXED, file_id UNINDEXED)"
+        )
+        self.connection.commit()
+
+    def start(self):
+        """Start the worker and queue a scan of the whole Logs directory."""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.open()
+            self.thread = threading.Thread(target=self.run, name="rude_log_index", daemon=True)
+            self.thread.start()
+        self.tasks.put(None)
+
+    def queue_files(self, paths):
+        if self.thread is not None:
+            for path in paths:
+                self.tasks.put(path)
+
+    def run(self):
+        while True:
+            path = self.tasks.get()
+            try:
+                if path is None:
+                    for log_file in glob.glob(os.path.join(self.logs_directory, 'irc_log_*.txt')):
+                        self.ingest(log_file)
+                else:
+                    self.ingest(path)
+            except Exception as e:
+                logging.error(f"Error indexing logs: {e}")
+
+    @staticmethod
+    def source_for(path):
+        # irc_log_<server>_<channel>[_<day>].txt -> <server>_<channel>
+        stem = os.path.splitext(os.path.basename(path))[0][len('irc_log_'):]
+        return DAY_SUFFIX.sub('', stem)
+
+    def ingest(self, path):
+        """Index whatever was appended to path since the last call."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+
+        with self.lock:
+            row = self.connection.execute("SELECT id, offset FROM files WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                with self.connection:
+                    cursor = self.connection.execute(
+                        "INSERT INTO files (path, source, offset) VALUES (?, ?, 0)", (path, self.source_for(path))
+                    )
+                file_id, offset = cursor.lastrowid, 0
+            else:
+                file_id, offset = row
+                if size < offset:
+                    # The file was truncated or replaced, start over
+                    with self.connection:
+                        self.connection.execute("DELETE FROM messages WHERE file_id = ?", (file_id,))
+                    offset = 0
+        if size == offset:
+            return
+
+        source = self.source_for(path)
+        timestamp = ""
+        rows = []
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            for raw in file:
+                if not raw.endswith(b'\n'):
+                    # Partial line, it is picked up next time
+                    break
+                offset += len(raw)
+                line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+                match = LOG_LINE.match(line)
+                if match:
+                    timestamp, nick, action_nick, text = match.groups()
+                    nick = nick or action_nick or ""
+                else:
+                    match = CONTINUATION.match(line)
+                    if not match:
+                        continue
+                    nick, text = match.group(1) or "", match.group(2)
+                if text:
+                    rows.append((text, nick, source, timestamp, file_id))
+                if len(rows) >= self.batch_size:
+                    self.commit(file_id, offset, rows)
+                    rows = []
+        self.commit(file_id, offset, rows)
+
+    def commit(self, file_id, offset, rows):
+        # Small transactions so searches are not held up by a large backlog
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO messages (text, nick, source, timestamp, file_id) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self.connection.execute("UPDATE files SET offset = ? WHERE id = ?", (offset, file_id))
+
+    @staticmethod
+    def quote(term):
+        return '"' + term.replace('"', '""') + '"'
+
+    def search(self, terms, nick=None, source=None, limit=25):
+        """
+        Return (hits, elapsed_ms) for the best matches, hits being
+        (timestamp, source, nick, text) tuples.
+        """
+        parts = [self.quote(term) for term in terms]
+        if nick:
+            parts.append(f"nick : {self.quote(nick)}")
+        sql = "SELECT timestamp, source, nick, text FROM messages WHERE messages MATCH ?"
+        params = [" ".join(parts)]
+        if source:
+            sql += " AND source = ?"
+            params.append(source)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        start = time.perf_counter()
+        with self.lock:
+            self.open()
+            hits = self.connection.execute(sql, params).fetchall()
+        return hits, (time.perf_counter() - start) * 1000
+
+
+log_index = LogSearchIndex(os.path.join(SCRIPT_DIRECTORY, 'Logs'), os.path.join(SCRIPT_DIRECTORY, 'log_index.db'))
+log_writer.on_flush.append(log_index.queue_files)
@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+class LogWriter:
+    """
+    Buffered writer for the chat logs. Lines are queued in memory and a
+    background thread appends them to their files once flush_lines are
+    waiting or flush_interval seconds have passed. Open handles are kept
+    in a small LRU pool so busy channels are not reopened on every line.
+    """
+    def __init__(self, max_handles=32, flush_lines=256, flush_interval=1.0):
+        self.max_handles = max_handles
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self.buffers = {}
+        self.buffered_lines = 0
+        self.handles = OrderedDict()
+        self.known_directories = set()
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.running = False
+        # Called with the paths written by each flush
+        self.on_flush = []
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self.run, name="rude_log_writer", daemon=True)
+            self.thread.start()
+
+    def write(self, path, text):
+        """Queue text to be appended to path. Never touches the disk itself."""
+        if not self.running:
+            self.start()
+        with self.lock:
+            buffer = self.buffers.get(path)
+            if buffer is None:
+                buffer = self.buffers[path] = []
+            buffer.append(text)
+            self.buffered_lines += 1
+            full = self.buffered_lines >= self.flush_lines
+        if full:
+            self.wake.set()
+
+    def run(self):
+        while self.running:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            buffers, self.buffers = self.buffers, {}
+            self.buffered_lines = 0
+        if not buffers:
+            return
+        with self.io_lock:
+            for path, lines in buffers.items():
+                try:
+                    handle = self.get_handle(path)
+                    handle.write("".join(lines))
+                    handle.flush()
+                except Exception as e:
+                    logging.error(f"Error writing log file {path}: {e}")
+                    self.close_handle(path)
+        for callback in self.on_flush:
+            try:
+                callback(list(buffers))
+            except Exception as e:
+                logging.error(f"Error in log flush callback: {e}")
+
+    def get_handle(self, path):
+        handle = self.handles.get(path)
+        if handle is not None:
+            self.handles.move_to_end(path)
+            return handle
+
+        directory = os.path.dirname(path)
+        if directory not in self.known_directories:
+            os.makedirs(directory, exist_ok=True)
+            self.known_directories.add(directory)
+
+        while len(self.handles) >= self.max_handles:
+            _, oldest = self.handles.popitem(last=False)
+            oldest.close()
+
+        handle = self.handles[path] = open(path, 'a', encoding='utf-8')
+        return handle
+
+    def close_handle(self, path):
+        handle = self.handles.pop(path, None)
+        if handle is not None:
+            try:
+                handle.close()
+            except Exception as e:
+                logging.error(f"Error closing log file {path}: {e}")
+
+    def close(self):
+        """Stop the flush thread, write anything still buffered and close every file."""
+        self.running = False
+        self.wake.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.thread = None
+        self.flush()
+        with self.io_lock:
+            for path in list(self.handles):
+                self.close_handle(path)
+
+
+log_writer = LogWriter()
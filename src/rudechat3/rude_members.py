@@ -0,0 +1,345 @@
+from bisect import bisect_left
+
+RFC1459_UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ[]\\~"
+RFC1459_LOWER = "abcdefghijklmnopqrstuvwxyz{}|^"
+
+CASEMAPPINGS = {
+    "ascii": str.maketrans(RFC1459_UPPER[:26], RFC1459_LOWER[:26]),
+    "rfc1459": str.maketrans(RFC1459_UPPER, RFC1459_LOWER),
+    "strict-rfc1459": str.maketrans(RFC1459_UPPER[:29], RFC1459_LOWER[:29]),
+}
+
+# Change events for list views: ("insert", index, name), ("delete", index), ("reset",)
+RESET = ("reset",)
+
+
+class Member:
+    __slots__ = ("nick", "modes", "sort_key", "name")
+
+    def __init__(self, nick, modes=None):
+        self.nick = nick
+        self.modes = modes if modes is not None else set()
+        self.sort_key = None
+        self.name = nick
+
+
+class MembershipIndex:
+    """
+    Who is in which channel. Each channel maps a casefolded nick to a Member
+    holding the nick as the server sent it and its prefix modes, and a reverse
+    index maps each casefolded nick to the channels it is in, so QUIT and NICK
+    only touch the channels that user shares with us.
+
+    Watched channels (the ones on screen) also keep their members sorted by
+    (prefix rank, casefolded nick). Joins, parts and mode changes move a
+    single entry with bisect and queue a positional change event for the
+    user list to apply. Background channels only update the dictionaries
+    and are sorted once when they are watched again.
+
+    Nicks are folded with the server's CASEMAPPING from ISUPPORT.
+    """
+    def __init__(self, max_changes=256):
+        self.channels = {}
+        self.orders = {}
+        self.names = {}
+        self.nick_channels = {}
+        self.names_seen = {}
+        self.changes = {}
+        self.watched = set()
+        self.max_changes = max_changes
+        self.mode_to_symbol = {}
+        self.symbol_to_mode = {}
+        self.mode_priority = {}
+        self.casemapping = "rfc1459"
+        self.fold_table = CASEMAPPINGS["rfc1459"]
+
+    def fold(self, nick):
+        if self.fold_table is None:
+            return nick.casefold()
+        return nick.translate(self.fold_table)
+
+    def set_casemapping(self, name):
+        name = name.lower()
+        if name == self.casemapping:
+            return
+        self.casemapping = name
+        # Unknown mappings such as rfc7613 fall back to Unicode casefolding
+        self.fold_table = CASEMAPPINGS.get(name)
+        self.rebuild()
+
+    def set_prefix(self, mode_to_symbol):
+        """Use the PREFIX modes from ISUPPORT, highest rank first."""
+        self.mode_to_symbol = dict(mode_to_symbol)
+        self.symbol_to_mode = {symbol: mode for mode, symbol in self.mode_to_symbol.items()}
+        self.mode_priority = {mode: rank for rank, mode in enumerate(self.mode_to_symbol)}
+        self.rebuild()
+
+    def rebuild(self):
+        # Rekey and resort everything, the ISUPPORT values normally arrive before any JOIN
+        channels = self.channels
+        self.channels = {}
+        self.orders = {}
+        self.names = {}
+        self.nick_channels = {}
+        self.names_seen = {}
+        for channel, members in channels.items():
+            self.create_channel(channel)
+            for member in members.values():
+                self.add(channel, member.nick, member.modes)
+
+    def emit(self, channel, event):
+        changes = self.changes.get(channel)
+        if changes is None:
+            self.changes[channel] = [event]
+        elif changes[0] is RESET:
+            # A full redraw is already due
+            return
+        elif len(changes) >= self.max_changes:
+            self.changes[channel] = [RESET]
+        else:
+            changes.append(event)
+
+    def take_changes(self, channel):
+        """Return and forget the change events queued for channel."""
+        return self.changes.pop(channel, [])
+
+    def watch(self, channel):
+        """Keep channel sorted from now on, sorting it first if it was in the background."""
+        if channel in self.watched:
+            return
+        self.watched.add(channel)
+        self.sort_channel(channel)
+
+    def unwatch(self, channel):
+        """Stop maintaining the sorted list for a channel that went off screen."""
+        self.watched.discard(channel)
+        self.orders.pop(channel, None)
+        self.names.pop(channel, None)
+        self.changes.pop(channel, None)
+
+    def sort_channel(self, channel):
+        entries = []
+        for member in self.channels.get(channel, {}).values():
+            self.update_sort_key(member)
+            entries.append((member.sort_key, member.name))
+        entries.sort()
+        self.orders[channel] = [sort_key for sort_key, _ in entries]
+        self.names[channel] = [name for _, name in entries]
+        self.changes[channel] = [RESET]
+
+    def update_sort_key(self, member):
+        mode = self.rank_mode(member)
+        rank = self.mode_priority[mode] if mode else len(self.mode_priority)
+        member.sort_key = (rank, self.fold(member.nick))
+        member.name = f"{self.mode_to_symbol[mode]}{member.nick}" if mode else member.nick
+
+    def create_channel(self, channel):
+        members = self.channels.get(channel)
+        if members is None:
+            members = self.channels[channel] = {}
+            if channel in self.watched:
+                self.sort_channel(channel)
+        return members
+
+    def place(self, channel, member):
+        if channel not in self.watched:
+            return
+        self.update_sort_key(member)
+        index = bisect_left(self.orders[channel], member.sort_key)
+        self.orders[channel].insert(index, member.sort_key)
+        self.names[channel].insert(index, member.name)
+        self.emit(channel, ("insert", index, member.name))
+
+    def unplace(self, channel, member):
+        if channel not in self.watched:
+            return
+        order = self.orders[channel]
+        index = bisect_left(order, member.sort_key)
+        if index < len(order) and order[index] == member.sort_key:
+            del order[index]
+            del self.names[channel][index]
+            self.emit(channel, ("delete", index))
+
+    def replace(self, channel, member):
+        """Move member if its rank or name changed."""
+        if channel not in self.watched:
+            return
+        mode = self.rank_mode(member)
+        rank = self.mode_priority[mode] if mode else len(self.mode_priority)
+        name = f"{self.mode_to_symbol[mode]}{member.nick}" if mode else member.nick
+        if member.sort_key == (rank, self.fold(member.nick)) and member.name == name:
+            return
+        self.unplace(channel, member)
+        self.place(channel, member)
+
+    def has_channel(self, channel):
+        return channel in self.channels
+
+    def count(self, channel):
+        return len(self.channels.get(channel, ()))
+
+    def member(self, channel, nick):
+        return self.channels.get(channel, {}).get(self.fold(nick))
+
+    def channels_of(self, nick):
+        return self.nick_channels.get(self.fold(nick), set())
+
+    def index_of(self, channel, nick):
+        """Row of nick in the sorted list, or None."""
+        member = self.member(channel, nick)
+        if member is None or channel not in self.watched:
+            return None
+        return bisect_left(self.orders[channel], member.sort_key)
+
+    def add(self, channel, nick, modes=None):
+        """Add nick to channel, or refresh its case and modes if already there."""
+        key = self.fold(nick)
+        members = self.create_channel(channel)
+        member = members.get(key)
+        if member is None:
+            member = members[key] = Member(nick, set(modes) if modes else None)
+            self.nick_channels.setdefault(key, set()).add(channel)
+            self.place(channel, member)
+        else:
+            member.nick = nick
+            if modes is not None:
+                member.modes = set(modes)
+            self.replace(channel, member)
+        return member
+
+    def parse_names_entry(self, entry):
+        """Split a NAMES entry like @+nick or @nick!user@host into nick and modes."""
+        modes = set()
+        position = 0
+        while position < len(entry) and entry[position] in self.symbol_to_mode:
+            modes.add(self.symbol_to_mode[entry[position]])
+            position += 1
+        nick = entry[position:].split("!", 1)[0]
+        return nick, modes
+
+    def add_names(self, channel, entries):
+        """Apply one 353 reply. Members missing from the whole reply are dropped by end_names."""
+        seen = self.names_seen.setdefault(channel, set())
+        for entry in entries:
+            if not entry:
+                continue
+            nick, modes = self.parse_names_entry(entry)
+            if nick:
+                self.add(channel, nick, modes)
+                seen.add(self.fold(nick))
+
+    def end_names(self, channel):
+        """Handle 366, the NAMES reply for channel is complete."""
+        seen = self.names_seen.pop(channel, None)
+        if seen is None:
+            return
+        for key in [key for key in self.channels.get(channel, {}) if key not in seen]:
+            self.discard(channel, key)
+
+    def discard(self, channel, key):
+        member = self.channels.get(channel, {}).pop(key, None)
+        if member is None:
+            return None
+        self.unplace(channel, member)
+        channels = self.nick_channels.get(key)
+        if channels is not None:
+            channels.discard(channel)
+            if not channels:
+                del self.nick_channels[key]
+        return member
+
+    def remove(self, channel, nick):
+        """Remove nick from channel (PART or KICK). Returns the removed Member or None."""
+        return self.discard(channel, self.fold(nick))
+
+    def remove_channel(self, channel):
+        for key in self.channels.get(channel, {}):
+            channels = self.nick_channels.get(key)
+            if channels is not None:
+                channels.discard(channel)
+                if not channels:
+                    del self.nick_channels[key]
+        self.channels.pop(channel, None)
+        self.names_seen.pop(channel, None)
+        if channel in self.watched:
+            # Still on screen, show it empty
+            self.sort_channel(channel)
+
+    def quit(self, nick):
+        """Remove nick everywhere. Returns the channels it was in."""
+        key = self.fold(nick)
+        channels = list(self.nick_channels.get(key, ()))
+        for channel in channels:
+            self.discard(channel, key)
+        return channels
+
+    def rename(self, old_nick, new_nick):
+        """Apply a NICK change. Returns the channels the user is in."""
+        old_key = self.fold(old_nick)
+        new_key = self.fold(new_nick)
+        channels = list(self.nick_channels.pop(old_key, ()))
+        for channel in channels:
+            members = self.channels[channel]
+            member = members.pop(old_key, None)
+            if member is None:
+                continue
+            self.unplace(channel, member)
+            if new_key != old_key and new_key in members:
+                # Stale entry for the new nick, the server says it is free
+                self.discard(channel, new_key)
+            member.nick = new_nick
+            members[new_key] = member
+            self.place(channel, member)
+        if channels:
+            self.nick_channels.setdefault(new_key, set()).update(channels)
+        return channels
+
+    def set_mode(self, channel, nick, mode, adding):
+        if not nick:
+            return False
+        member = self.member(channel, nick)
+        if member is None:
+            return False
+        if adding:
+            member.modes.add(mode)
+        else:
+            member.modes.discard(mode)
+        self.replace(channel, member)
+        return True
+
+    def top_mode(self, channel, nick):
+        """Highest ranked prefix mode the member has, or None."""
+        member = self.member(channel, nick)
+        if member is None:
+            return None
+        return self.rank_mode(member)
+
+    def rank_mode(self, member):
+        ranked = [mode for mode in member.modes if mode in self.mode_priority]
+        if not ranked:
+            return None
+        return min(ranked, key=self.mode_priority.get)
+
+    def display_list(self, channel):
+        """
+        Members as listbox entries (@nick, +nick, nick) ordered by rank then
+        casefolded nick. For watched channels this is the live list, callers
+        must not modify it.
+        """
+        if channel in self.watched:
+            return self.names.get(channel, [])
+        entries = []
+        for member in self.channels.get(channel, {}).values():
+            self.update_sort_key(member)
+            entries.append((member.sort_key, member.name))
+        entries.sort()
+        return [name for _, name in entries]
+
+    def clear(self):
+        self.channels.clear()
+        self.orders.clear()
+        self.names.clear()
+        self.nick_channels.clear()
+        self.names_seen.clear()
+        self.changes.clear()
+        self.watched.clear()
@@ -0,0 +1,46 @@
+MULTILINE = "draft/multiline"
+CONCAT = "draft/multiline-concat"
+
+
+class MultilineBatches:
+    """
+    Incoming draft/multiline batches. The PRIVMSG or NOTICE lines tagged
+    with an open batch are held back until BATCH -ref, then handed over as
+    one line whose text is the batch joined with newlines. Lines tagged
+    draft/multiline-concat join the previous one without a newline, they
+    are pieces of a line too long to send whole.
+    """
+    def __init__(self):
+        self.open = {}
+
+    def start(self, ref):
+        self.open[ref] = []
+
+    def collect(self, tokens):
+        """Hold tokens back if they belong to an open batch. Returns True if they were."""
+        if not tokens.tags or tokens.command not in ("PRIVMSG", "NOTICE"):
+            return False
+        lines = self.open.get(tokens.tags.get("batch"))
+        if lines is None:
+            return False
+        lines.append(tokens)
+        return True
+
+    def finish(self, ref):
+        """The batch as one line, or None if ref was not open or held nothing."""
+        lines = self.open.pop(ref, None)
+        if not lines:
+            return None
+        parts = []
+        for index, tokens in enumerate(lines):
+            if index and CONCAT not in tokens.tags:
+                parts.append("\n")
+            parts.append(tokens.params[-1] if len(tokens.params) > 1 else "")
+        first = lines[0]
+        first.params[-1] = "".join(parts)
+        del first.tags["batch"]
+        first.tags.pop(CONCAT, None)
+        return first
+
+    def reset(self):
+        self.open.clear()
@@ -0,0 +1,170 @@
+import logging
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from plyer import notification as plyer_notification
+
+try:
+    import simpleaudio
+except ImportError:
+    simpleaudio = None
+
+BEEP = "beep"
+CUSTOM = "custom"
+
+
+class Notifier:
+    """
+    Mention sounds and desktop notifications, played on a background
+    thread so neither the network loop nor Tk waits for audio or D-Bus.
+
+    Requests are collected for window seconds after the first one of a
+    burst, then handled together: one sound, and one notification that
+    shows the message if there was only one, or sums up how many arrived
+    and where. A key (server and channel) that notified less than cooldown
+    seconds ago is skipped.
+
+    Custom sounds are Linux only as before. The WAV is loaded once and
+    played from memory when simpleaudio is installed, otherwise paplay is
+    started for it. A sound still playing is not started again.
+    """
+    def __init__(self, sound_path, icon_path, window=1.0, cooldown=10.0):
+        self.sound_path = sound_path
+        self.icon_path = icon_path
+        self.window = window
+        self.cooldown = cooldown
+        self.pending = []
+        self.last_notified = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.running = False
+        self.wave = None
+        self.playing = None
+        self.toaster = None
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, name="rude_notifier", daemon=True)
+            self.thread.start()
+
+    def notify(self, key, channel_name=None, message_content=None, sound=BEEP, toast=True, title="RudeChat"):
+        """Queue a notification. Returns False if key is still cooling down."""
+        now = time.monotonic()
+        with self.lock:
+            last = self.last_notified.get(key)
+            if last is not None and now - last < self.cooldown:
+                return False
+            self.last_notified[key] = now
+            self.pending.append((channel_name, message_content, sound, toast, title))
+        if not self.running:
+            self.start()
+        self.wake.set()
+        return True
+
+    def run(self):
+        while self.running:
+            self.wake.wait()
+            self.wake.clear()
+            # Let the rest of a burst arrive first
+            if self.stopped.wait(self.window):
+                break
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if batch:
+                self.deliver(batch)
+
+    def deliver(self, batch):
+        sounds = [sound for _, _, sound, _, _ in batch if sound]
+        if sounds:
+            self.play(CUSTOM if CUSTOM in sounds else sounds[0])
+        toasts = [entry for entry in batch if entry[3]]
+        if toasts:
+            self.show_toast(*self.summarize(toasts))
+
+    @staticmethod
+    def summarize(entries):
+        """Title and text for one notification covering entries."""
+        if len(entries) == 1:
+            channel_name, message_content, _, _, title = entries[0]
+            if not channel_name:
+                return title, message_content or ""
+            if message_content:
+                return title, f"{channel_name}: {message_content}"
+            return title, f"You've been pinged in {channel_name}!"
+        places = list(dict.fromkeys(str(entry[0]) for entry in entries if entry[0]))
+        where = ", ".join(places[:5])
+        if len(places) > 5:
+            where += f" and {len(places) - 5} more"
+        return entries[0][4], f"{len(entries)} notifications from {where}"
+
+    def play(self, sound):
+        try:
+            if sys.platform.startswith("linux"):
+                if sound == CUSTOM:
+                    self.play_custom()
+                else:
+                    # System bell
+                    if sys.stdout is not None:
+                        sys.stdout.write("\a")
+                        sys.stdout.flush()
+            elif sys.platform == "darwin":
+                if not self.still_playing():
+                    self.playing = subprocess.Popen(["afplay", "/System/Library/Sounds/Ping.aiff"])
+            elif sys.platform == "win32":
+                import winsound
+                winsound.Beep(1200, 75)
+        except Exception as e:
+            logging.error(f"Error playing notification sound: {e}")
+
+    def play_custom(self):
+        if self.still_playing():
+            return
+        if simpleaudio is not None:
+            if self.wave is None:
+                self.wave = simpleaudio.WaveObject.from_wave_file(self.sound_path)
+            self.playing = self.wave.play()
+        elif shutil.which("paplay"):
+            self.playing = subprocess.Popen(["paplay", self.sound_path])
+
+    def still_playing(self):
+        if self.playing is None:
+            return False
+        if isinstance(self.playing, subprocess.Popen):
+            return self.playing.poll() is None
+        return self.playing.is_playing()
+
+    def show_toast(self, title, message):
+        try:
+            if platform.system() == "Linux":
+                plyer_notification.notify(
+                    title=title,
+                    message=message,
+                    app_icon=self.icon_path,
+                    timeout=5,
+                )
+
+            elif platform.system() == "Windows":
+                from win10toast import ToastNotifier
+                if self.toaster is None:
+                    self.toaster = ToastNotifier()
+                # Skipped while the previous one is still showing
+                self.toaster.show_toast(title, message, icon_path=self.icon_path, duration=5, threaded=True)
+
+        except Exception as e:
+            logging.error(f"Desktop notification error: {e}")
+
+    def close(self):
+        self.running = False
+        self.stopped.set()
+        self.wake.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
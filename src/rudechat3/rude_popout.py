@@ -8,12 +8,13 @@ import json
 import re
 import random
 import webbrowser
-import platform
-from plyer import notification as plyer_notification
 from threading import Thread
 from tkinter import scrolledtext, Listbox, Scrollbar, Tk, Frame, Label, Entry, Listbox, Menu, Scrollbar, StringVar, PhotoImage 
 from rudechat3.format_decoder import Attribute, decoder
 from rudechat3.rude_pronouns import replace_pronouns
+from rudechat3.rude_tagger import RudeTagger
+from rudechat3.rude_log_writer import log_writer
+from rudechat3.rude_user_list import UserListView
 
 class RudePopOut:
     def __init__(self, root, selected_channel, irc_client, nick_name, main_app):
@@ -57,6 +58,7 @@ class RudePopOut:
         self.text_widget = scrolledtext.ScrolledText(self.frame, wrap=tk.WORD, cursor="arrow")
         self.text_widget.grid(row=0, column=0, sticky="nsew")
         self.text_widget.configure(bg=self.widgets_bg_color, fg=self.widgets_fg_color, font=(self.font_family, self.font_size))
+        self.tagger = RudeTagger(self.text_widget, self)
 
         # User list frame
         self.user_frame = tk.Frame(self.frame, bg="black")
@@ -76,7 +78,7 @@ class RudePopOut:
 
         # User list scrollbar
         self.user_scrollbar = Scrollbar(self.user_frame, orient="vertical", command=self.user_listbox.yview)
-        self.user_listbox.config(yscrollcommand=self.user_scrollbar.set)
+        self.user_list_view = UserListView(self.user_listbox, self.user_scrollbar, self.user_row_colour)
         self.user_scrollbar.grid(row=1, column=1, sticky='ns')
         self.user_listbox.bind("<Button-3>", self.show_user_list_menu)
 
@@ -219,9 +221,7 @@ class RudePopOut:
     def get_user_mode(self, user, channel):
         """Retrieve the user's mode for the given channel."""
         if self.irc_client.display_user_modes:
-            channel_modes = self.irc_client.user_modes.get(channel, {})
-            user_modes = channel_modes.get(user, set())
-            return next(iter(user_modes), None)  # Get the first mode if available, else None
+            return self.irc_client.members.top_mode(channel, user)
         else:
             return None
 
@@ -245,10 +245,11 @@ class RudePopOut:
                 self.entry.delete(0, tk.END)
                 self.pop_command_parser(user_text)
             else:
-                shortened_text = escaped_text[:420]
-                self.entry_history.append(shortened_text)
+                # Long messages are split to fit the server's limit by the client
+                message_text = escaped_text
+                self.entry_history.append(message_text)
                 if self.irc_client.replace_pronouns:
-                    shortened_text = replace_pronouns(shortened_text, self.selected_channel)
+                    message_text = replace_pronouns(message_text, self.selected_channel)
 
                 # Limit the entry_history to the last 10 messages
                 if len(self.entry_history) > 10:
@@ -257,17 +258,17 @@ class RudePopOut:
                 # Reset history_index to the end of entry_history
                 self.history_index = len(self.entry_history)
                 # Insert text in the main text widget
-                self.insert_text(f"{timestamp} <{mode_symbol}{self.nick_name}> {shortened_text}\n")
+                self.insert_text(f"{timestamp} <{mode_symbol}{self.nick_name}> {message_text}\n")
                 self.entry.delete(0, tk.END)
 
-                # Update channel_messages dictionary
-                self.update_channel_messages(server, current_channel, timestamp, mode_symbol, shortened_text)
+                # Update the channel history
+                self.update_channel_messages(server, current_channel, timestamp, mode_symbol, message_text)
 
-                self.log_message(self.irc_client.server_name, current_channel, self.nick_name, shortened_text, is_sent=True)
+                self.log_message(self.irc_client.server_name, current_channel, self.nick_name, message_text, is_sent=True)
 
                 # Send the message through the IRC client
                 asyncio.run_coroutine_threadsafe(
-                    self.irc_client.send_message(f"PRIVMSG {current_channel} :{shortened_text}"), 
+                    self.irc_client.send_privmsg_lines(current_channel, [message_text]),
                     self.irc_client.loop
                 )
 
@@ -288,12 +289,7 @@ class RudePopOut:
             print(f"Exception in send_text: {e}")
 
     def update_channel_messages(self, server, current_channel, timestamp, mode_symbol, shortened_text):
-        if server not in self.irc_client.channel_messages:
-            self.irc_client.channel_messages[server] = {}
-        if current_channel not in self.irc_client.channel_messages[server]:
-            self.irc_client.channel_messages[server][current_channel] = []
-
-        self.irc_client.channel_messages[server][current_channel].append(f"{timestamp} <{mode_symbol}{self.nick_name}> {shortened_text}\n")
+        self.irc_client.history.add_message(server, current_channel, self.nick_name, shortened_text, mode_symbol)
 
     def handle_arrow_keys(self, event):
         if event.keysym == 'Up':
@@ -437,23 +433,26 @@ class RudePopOut:
         self.root = None
 
     def update_gui_user_list(self, channel):
-        # Clear existing items in user listbox
-        self.user_listbox.delete(0, tk.END)
-        
-        # Get the list of users for the given channel
-        users = self.irc_client.channel_users.get(channel, [])
-
-        if users:
-            # Populate with users for the given channel
-            for user in users:
-                self.user_listbox.insert(tk.END, user)
-            self.highlight_away_users()
+        if self.irc_client.members.count(channel):
+            # Apply the membership changes for the given channel
+            self.user_list_view.show(self.irc_client.members, channel)
         else:
             # Handle the case when there are no users in the channel
+            self.user_list_view.clear()
             self.user_listbox.insert(tk.END, self.nick_name)
             self.user_listbox.insert(tk.END, self.selected_channel)
 
+    def user_row_colour(self, username):
+        stripped_username = username.lstrip(''.join(self.irc_client.mode_values))
+        if stripped_username in self.irc_client.away_users_dict:
+            return self.main_app.away_user_fg
+        return self.main_app.user_listbox_fg
+
     def highlight_away_users(self):
+        if self.user_list_view.rows:
+            # Member lists only colour the rows on screen
+            self.user_list_view.paint_visible()
+            return
         # Loop through the items in the user_listbox
         for index in range(self.user_listbox.size()):
             # Get the username from the listbox
@@ -472,65 +471,29 @@ class RudePopOut:
 
     def highlight_nickname(self):
         """Highlight the user's nickname in the text_widget."""
-        user_nickname = self.irc_client.nickname
-        if not user_nickname:
+        if not self.irc_client.nickname:
             return
 
-        # Configure the color for the user's nickname
-        self.text_widget.tag_configure("nickname", foreground=self.user_nickname_color)
-
-        # Start at the beginning of the text_widget
-        start_idx = "1.0"
-        while True:
-            # Find the position of the next instance of the user's nickname
-            start_idx = self.text_widget.search(user_nickname, start_idx, stopindex=tk.END, regexp=True, nocase=True)
-            if not start_idx:
-                break
-
-            # Calculate the end index based on the length of the nickname
-            end_idx = self.text_widget.index(f"{start_idx}+{len(user_nickname)}c")
-
-            # Apply the tag to the found nickname
-            self.text_widget.tag_add("nickname", start_idx, end_idx)
-
-            # Update the start index to search from the position after the current found nickname
-            start_idx = end_idx
-
-        # Start again at the beginning of the text_widget for other nicknames enclosed in <>
-        start_idx = "1.0"
-        while True:
-            # Find the opening '<'
-            start_idx = self.text_widget.search('<', start_idx, stopindex=tk.END)
-            if not start_idx:
-                break
-            # Find the closing '>' ensuring no newlines between
-            end_idx = self.text_widget.search('>', start_idx, f"{start_idx} lineend")
-            if end_idx:
-                end_idx = f"{end_idx}+1c"  # Include the '>' character
-                # Extract the nickname with '<' and '>'
-                nickname_with_brackets = self.text_widget.get(start_idx, end_idx)
-
-                # If nickname doesn't have an assigned color, generate one
-                if self.generate_nickname_colors == True:
-                    if nickname_with_brackets not in self.nickname_colors:
-                        self.nickname_colors[nickname_with_brackets] = self.generate_random_color()
-                    nickname_color = self.nickname_colors[nickname_with_brackets]
-                elif self.generate_nickname_colors == False:
-                    if nickname_with_brackets not in self.nickname_colors:
-                        self.nickname_colors[nickname_with_brackets] = self.main_fg_color
-                    nickname_color = self.nickname_colors[nickname_with_brackets]
-
-                # If it's the main user's nickname, set color to green
-                if nickname_with_brackets == f"<{self.irc_client.nickname}>":
-                    nickname_color = self.user_nickname_color
-
-                self.text_widget.tag_configure(f"nickname_{nickname_with_brackets}", foreground=nickname_color)
-                self.text_widget.tag_add(f"nickname_{nickname_with_brackets}", start_idx, end_idx)
-                start_idx = end_idx
-            else:
-                start_idx = f"{start_idx}+1c"
+        # New text is tagged on insert, this only rescans after a nickname change
+        self.tagger.retag_all()
         self.insert_and_scroll()
 
+    def get_nickname_color(self, nickname_with_brackets):
+        # If nickname doesn't have an assigned color, generate one
+        if self.generate_nickname_colors == True:
+            if nickname_with_brackets not in self.nickname_colors:
+                self.nickname_colors[nickname_with_brackets] = self.generate_random_color()
+            nickname_color = self.nickname_colors[nickname_with_brackets]
+        elif self.generate_nickname_colors == False:
+            if nickname_with_brackets not in self.nickname_colors:
+                self.nickname_colors[nickname_with_brackets] = self.main_fg_color
+            nickname_color = self.nickname_colors[nickname_with_brackets]
+
+        # If it's the main user's nickname, set color to green
+        if nickname_with_brackets == f"<{self.irc_client.nickname}>":
+            nickname_color = self.user_nickname_color
+        return nickname_color
+
     def generate_random_color(self):
         while True:
             # Generate random values for each channel
@@ -564,8 +527,8 @@ class RudePopOut:
 
         # Get the user list for the current channel
         current_channel = self.selected_channel
-        if current_channel in self.irc_client.channel_users:
-            user_list = self.irc_client.channel_users[current_channel]
+        if self.irc_client.members.has_channel(current_channel):
+            user_list = self.irc_client.members.display_list(current_channel)
         else:
             # Fallback to the user list from the GUI's user listbox
             user_list = self.user_listbox.get(0, tk.END)
@@ -606,10 +569,6 @@ class RudePopOut:
         self.entry.delete(0, tk.END)
         self.entry.insert(0, current_text + self.tab_complete_terminator + " ")
 
-    def sanitize_channel_name(self, channel):
-        #gotta remove any characters that are not alphanumeric or allowed special characters
-        return re.sub(r'[^\w\-\[\]{}^`|]', '_', channel)
-
     def log_message(self, server, channel, sender, message, is_sent=False):
         """
         Logs your chats for later use.
@@ -641,22 +600,11 @@ class RudePopOut:
             else:
                 log_line += f'           <{sender if is_sent else self.nick_name}> {line}\n'
 
-        # Determine script directory
-        script_directory = os.path.dirname(os.path.abspath(__file__))
-
-        logs_directory = os.path.join(script_directory, 'Logs')
-
         try:
             if channel == self.nick_name:
                 channel = sender
-            # Create the Logs directory if it doesn't exist
-            os.makedirs(logs_directory, exist_ok=True)
-
-            # Construct the full path for the log file inside the Logs directory
-            filename = os.path.join(logs_directory, f'irc_log_{server}_{self.sanitize_channel_name(channel)}.txt')
-
-            with open(filename, 'a', encoding='utf-8') as file:
-                file.write(log_line)
+            # Queued for the background log writer
+            log_writer.write(self.irc_client.log_file_path(server, channel), log_line)
         except Exception as e:
             print(f"Error logging message: {e}")
 
@@ -674,18 +622,21 @@ class RudePopOut:
     def insert_text(self, message):
         try:
             self.trim_text_widget()
-            urls = self.find_urls(message)
 
             # Set the Text widget state to NORMAL before inserting and configuring tags
             self.text_widget.config(state=tk.NORMAL)
+            start_index = self.text_widget.index("end-1c")
 
             formatted_text = decoder(message)
             self.tag_text(formatted_text)
 
-            # Start tagging URLs using the non-blocking approach
-            self.tag_urls(urls)
+            # Tag nicknames and URLs in the text just inserted
+            self.tagger.tag_region("".join(text for text, attributes in formatted_text), start_index)
         except Exception as e:
             print(f"Exception in insert_text {e}")
+        finally:
+            self.text_widget.config(state=tk.DISABLED)
+            self.insert_and_scroll()
 
     def tag_text(self, formatted_text):
         # Initialize a cache for tag configurations to avoid redundant setups
@@ -738,34 +689,6 @@ class RudePopOut:
             tag_config['background'] = hex_background
         return tag_config
 
-    def tag_urls(self, urls, index=0):
-        if index < len(urls):
-            url = urls[index]
-            tag_name = f"url_{url}"
-            self.text_widget.tag_configure(tag_name, foreground="blue", underline=1)
-
-            start_idx = "1.0"
-            while True:
-                start_idx = self.text_widget.search(url, start_idx, tk.END)
-                if not start_idx:
-                    break
-                end_idx = f"{start_idx}+{len(url)}c"
-                self.text_widget.tag_add(tag_name, start_idx, end_idx)
-                self.text_widget.tag_bind(tag_name, "<Button-1>", lambda event, url=url: self.open_url(event, url))
-                start_idx = end_idx
-
-            # Schedule the next URL tagging
-            self.text_widget.after(1, self.tag_urls, urls, index + 1)
-        else:
-            # Set the Text widget state back to DISABLED after configuring tags
-            self.text_widget.config(state=tk.DISABLED)
-            self.insert_and_scroll()
-
-    def find_urls(self, text):
-        # A "simple" regex to detect URLs
-        url_pattern = re.compile(r'(\w+://[^\s()<>]*\([^\s()<>]*\)[^\s()<>]*(?<![.,;!?])|www\.[^\s()<>]*\([^\s()<>]*\)[^\s()<>]*(?<![.,;!?])|\w+://[^\s()<>]+(?<![.,;!?])|www\.[^\s()<>]+(?<![.,;!?]))')
-        return url_pattern.findall(text)
-
     def open_url(self, event, url):
         webbrowser.open(url)
 
@@ -915,11 +838,9 @@ class RudePopOut:
 
     def display_last_messages(self, channel, num=120):
         server_name = self.irc_client.server
-        if server_name:
-            messages = self.irc_client.channel_messages.get(server_name, {}).get(channel, [])
-        for message in messages[-num:]:
-            self.insert_text(message)
-            self.highlight_nickname()
+        for record in self.irc_client.history.last(server_name, channel, num):
+            self.insert_text(record.render(self.irc_client.use_time_stamp))
+        self.highlight_nickname()
 
     def show_topic_tooltip(self, event):
         try:
@@ -963,8 +884,9 @@ class RudePopOut:
     def is_app_focused(self):
         return bool(self.root.focus_displayof())
 
-    async def check_focus_and_notify(self, message):
-        if not self.is_app_focused():
+    async def check_focus_and_notify(self, message, mention=False):
+        # Mentions were already notified by the client
+        if not mention and not self.is_app_focused():
             try:
                 await self.trigger_desktop_notification(self.selected_channel, message)
             except Exception as e:
@@ -974,45 +896,12 @@ class RudePopOut:
         """
         Show a system desktop notification.
         """
-        script_directory = os.path.dirname(os.path.abspath(__file__))
-
         # Check if the application window is the active window
         if self.is_app_focused():  # If the app is focused, return early
             return
 
-        if channel_name:
-            # Ensure channel_name is a string
-            channel_name = str(channel_name)
-
-            # Construct the notification title and message
-            title = f"{title}"
-            if message_content:
-                message = f"{channel_name}: {message_content}"
-            else:
-                message = f"You've been pinged in {channel_name}!"
-
-        icon_path = os.path.join(script_directory, "rude.ico")
-
-        try:
-            if platform.system() == "Linux":
-                # Use plyer for Linux notifications
-                plyer_notification.notify(
-                    title=title,
-                    message=message,
-                    app_icon=icon_path,
-                    timeout=5,
-                )
-
-            elif platform.system() == "Windows":
-                # Use win10toast_click & threading for Windows notifications
-                from win10toast import ToastNotifier
-                toaster = ToastNotifier()
-                toaster.show_toast(title, message, icon_path=icon_path, duration=5, threaded=True)
-                while toaster.notification_active():
-                    await asyncio.sleep(0.1)
-
-        except Exception as e:
-            print(f"Desktop notification error: {e}")
+        # Shown by the main window's notifier thread
+        self.main_app.notifier.notify((self.irc_client.server, channel_name), channel_name, message_content, sound=None, title=title)
 
     def update_users_label(self):
         if self.irc_client.server_name in self.irc_client.away_servers:
@@ -1020,7 +909,7 @@ class RudePopOut:
             self.user_label.config(text=away_text, fg="red")
         else:
             # Try to get the user count from the selected channel
-            user_num = len(self.irc_client.channel_users.get(self.selected_channel, []))
+            user_num = self.irc_client.members.count(self.selected_channel)
 
             # If there are no users, get the count from the listbox itself
             if user_num == 0:
@@ -0,0 +1,27 @@
+import random
+
+
+class Backoff:
+    """
+    Delays between reconnect attempts. They double from base up to cap and
+    are shortened by a random jitter, so a netsplit does not bring every
+    client back in the same second. The first retry can be immediate for
+    a socket that simply dropped, a ping timeout waits like any other try.
+    """
+    def __init__(self, base=2.0, cap=300.0, jitter=0.5):
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+        self.attempt = 0
+
+    def reset(self):
+        self.attempt = 0
+
+    def next_delay(self, immediate=False):
+        """Seconds to wait before the next attempt, counting it as made."""
+        self.attempt += 1
+        if immediate and self.attempt == 1:
+            return 0.0
+        # The exponent is capped too, retries go on for as long as it takes
+        delay = min(self.cap, self.base * 2 ** min(self.attempt - 1, 32))
+        return delay * (1 - self.jitter * random.random())
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+URGENT = 0
+NORMAL = 1
+BULK = 2
+
+# Keep-alives, quits and registration go out ahead of everything else
+URGENT_COMMANDS = {"PONG", "QUIT", "PASS", "NICK", "USER", "CAP", "AUTHENTICATE"}
+
+
+class SendQueue:
+    """
+    Outbound lines for one connection, paced with a token bucket the way
+    ircd flood control counts them: burst lines may go out back to back,
+    after that rate lines per second. A rate of 0 or less turns pacing off.
+
+    Lines wait in three lanes. URGENT lines skip the bucket, NORMAL lines
+    (anything typed) go before BULK lines (macros, fortunes, long pastes)
+    so a running macro never holds up a reply, and the BULK lane can be
+    dropped with cancel_bulk. Everything ready at the same moment is sent
+    with a single write() and drain().
+
+    put() returns a future that resolves to True once the line has been
+    written, or False if it was dropped or the write failed.
+    """
+    def __init__(self, rate=2.5, burst=5, drain_timeout=10, on_error=None):
+        self.rate = rate
+        self.burst = burst
+        self.drain_timeout = drain_timeout
+        self.on_error = on_error
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lanes = (deque(), deque(), deque())
+        self.writer = None
+        self.task = None
+        self.wake = None
+
+    def start(self, writer):
+        """Send through writer, starting the sender task if it is not running."""
+        self.writer = writer
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        if self.task is None or self.task.done():
+            self.wake = asyncio.Event()
+            self.task = asyncio.ensure_future(self.run())
+        self.wake.set()
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.writer = None
+        for lane in self.lanes:
+            self.drop(lane)
+
+    @staticmethod
+    def lane_for(message):
+        command = message.split(" ", 1)[0].upper()
+        return URGENT if command in URGENT_COMMANDS else NORMAL
+
+    def put(self, message, lane=None):
+        if lane is None:
+            lane = self.lane_for(message)
+        future = asyncio.get_running_loop().create_future()
+        self.lanes[lane].append((message, future))
+        if self.wake is not None:
+            self.wake.set()
+        return future
+
+    def cancel_bulk(self):
+        """Drop the queued BULK lines. Returns how many were dropped."""
+        return self.drop(self.lanes[BULK])
+
+    @staticmethod
+    def drop(lane):
+        count = len(lane)
+        for _, future in lane:
+            if not future.done():
+                future.set_result(False)
+        lane.clear()
+        return count
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def paced(self):
+        return self.rate > 0
+
+    def time_until(self, tokens):
+        """Seconds until tokens lines could be sent after everything already queued."""
+        if not self.paced:
+            return 0.0
+        self.refill()
+        missing = tokens + len(self.lanes[NORMAL]) + len(self.lanes[BULK]) - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate
+
+    def take_ready(self):
+        """Pop every line that may be sent now, highest priority first."""
+        ready = []
+        if not self.paced:
+            for lane in self.lanes:
+                ready.extend(lane)
+                lane.clear()
+            return ready
+        self.refill()
+        urgent = self.lanes[URGENT]
+        while urgent:
+            ready.append(urgent.popleft())
+            # Still counted by the server, but never held back
+            self.tokens = max(0.0, self.tokens - 1)
+        for lane in self.lanes[NORMAL], self.lanes[BULK]:
+            while lane and self.tokens >= 1:
+                ready.append(lane.popleft())
+                self.tokens -= 1
+        return ready
+
+    async def run(self):
+        while True:
+            self.wake.clear()
+            ready = self.take_ready()
+            if ready:
+                await self.write(ready)
+                continue
+            if self.lanes[NORMAL] or self.lanes[BULK]:
+                # Sleep until the next token, or until something urgent arrives
+                delay = max(0.0, (1 - self.tokens) / self.rate)
+                try:
+                    await asyncio.wait_for(self.wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self.wake.wait()
+
+    async def write(self, ready):
+        data = "".join(f"{message}\r\n" for message, _ in ready).encode('UTF-8')
+        sent = False
+        try:
+            if self.writer is None:
+                raise ConnectionError("Writer is not initialized.")
+            self.writer.write(data)
+            await asyncio.wait_for(self.writer.drain(), timeout=self.drain_timeout)
+            sent = True
+        except (asyncio.TimeoutError, ConnectionError, OSError) as e:
+            logging.error(f"Error sending {len(ready)} line(s): {e}")
+            if self.on_error:
+                self.on_error(e)
+        for _, future in ready:
+            if not future.done():
+                future.set_result(sent)
@@ -0,0 +1,140 @@
+import re
+
+IRC_LINE_BYTES = 512
+# Used until the server has shown us our own user@host: ~ plus USERLEN 10 and a 63 byte host
+UNKNOWN_USERHOST = "~" + "u" * 10 + "@" + "h" * 63
+
+FORMAT_CODE = re.compile(r'\x03(?:\d{1,2}(?:,\d{1,2})?)?|\x04(?:[0-9a-fA-F]{6}(?:,[0-9a-fA-F]{6})?)?|[\x02\x0F\x11\x16\x1D\x1E\x1F]')
+ATOM = re.compile(FORMAT_CODE.pattern + r'|.', re.DOTALL)
+TOGGLES = "\x02\x11\x16\x1D\x1E\x1F"
+
+
+def line_budget(nickname, userhost, target, command="PRIVMSG"):
+    """
+    Bytes left for the text of one message. Servers relay it to everyone
+    as ":nick!user@host PRIVMSG target :text\\r\\n" and cut it at 512 bytes.
+    """
+    prefix = f":{nickname}!{userhost or UNKNOWN_USERHOST} {command} {target} :"
+    return IRC_LINE_BYTES - len(prefix.encode('utf-8')) - 2
+
+
+class FormatState:
+    """Bold, italics, colours and friends in effect at some point of a line."""
+    __slots__ = ("toggles", "colour", "hex_colour")
+
+    def __init__(self):
+        self.toggles = set()
+        self.colour = None
+        self.hex_colour = None
+
+    def apply(self, code):
+        if code == "\x0F":
+            self.toggles.clear()
+            self.colour = None
+            self.hex_colour = None
+        elif code in TOGGLES:
+            self.toggles ^= {code}
+        elif code[0] == "\x03":
+            self.colour = self.merge_colour(self.colour, code[1:], lambda value: f"{int(value):02d}")
+        elif code[0] == "\x04":
+            self.hex_colour = self.merge_colour(self.hex_colour, code[1:], str)
+
+    @staticmethod
+    def merge_colour(current, value, normalise):
+        """New (fg, bg) after a colour code, a bare code resets and a lone fg keeps the bg."""
+        if not value:
+            return None
+        fg, _, bg = value.partition(",")
+        if not bg and current:
+            bg = current[1]
+        return normalise(fg), normalise(bg) if bg else None
+
+    def codes(self):
+        """Codes that put a fresh line into this state."""
+        codes = "".join(sorted(self.toggles))
+        for marker, colour in (("\x03", self.colour), ("\x04", self.hex_colour)):
+            if colour:
+                fg, bg = colour
+                codes += f"{marker}{fg},{bg}" if bg else f"{marker}{fg}"
+        return codes
+
+
+def split_message(text, budget, carry_formatting=True):
+    """
+    Cut text into pieces of at most budget UTF-8 bytes. Cuts fall on
+    spaces where possible, never inside a character or a formatting code.
+    Words longer than a whole piece are cut between characters.
+
+    With carry_formatting each piece starts with the codes in effect where
+    the previous one ended, so colours and bold continue, and the spaces
+    at a cut are dropped, along with pieces left with no text. Without it (draft/multiline-concat, where the
+    receiver joins the pieces back together) the text is only cut, spaces
+    included, and pieces join back to exactly the original.
+    """
+    if len(text.encode('utf-8')) <= budget:
+        return [text]
+
+    pieces = []
+    state = FormatState()
+    line = []
+    used = 0
+    has_text = False
+
+    def flush():
+        nonlocal line, used, has_text
+        piece = "".join(line)
+        if not carry_formatting:
+            # Every piece is needed to join back to the original
+            if piece:
+                pieces.append(piece)
+        else:
+            # Nothing but spaces or formatting codes would go out as an empty message
+            piece = piece.rstrip(" ")
+            if FORMAT_CODE.sub("", piece).strip(" "):
+                pieces.append(piece)
+        prefix = state.codes() if carry_formatting else ""
+        line = [prefix] if prefix else []
+        used = len(prefix.encode('utf-8'))
+        has_text = False
+
+    def append(part, part_size):
+        nonlocal used, has_text
+        line.append(part)
+        used += part_size
+        has_text = True
+        # Formatting codes are control characters, plain words skip the scan
+        if not part.isprintable():
+            for code in FORMAT_CODE.findall(part):
+                state.apply(code)
+
+    for token in re.findall(r' +|[^ ]+', text):
+        size = len(token.encode('utf-8'))
+        if token[0] == " ":
+            if used + size <= budget:
+                append(token, size)
+            elif carry_formatting:
+                # The cut lands on these spaces
+                flush()
+            else:
+                room = budget - used
+                append(token[:room], room)
+                flush()
+                append(token[room:], size - room)
+            continue
+
+        if used + size > budget and has_text:
+            flush()
+        if used + size <= budget:
+            append(token, size)
+            continue
+
+        # A word longer than a whole piece
+        for atom in ATOM.findall(token):
+            atom_size = len(atom.encode('utf-8'))
+            if used + atom_size > budget and has_text:
+                flush()
+            append(atom, atom_size)
+
+    if has_text:
+        flush()
+    return pieces
@@ -0,0 +1,99 @@
+import re
+from bisect import bisect_right
+
+
+URL_PATTERN = re.compile(r'(\w+://[^\s()<>]*\([^\s()<>]*\)[^\s()<>]*(?<![.,;!?])|www\.[^\s()<>]*\([^\s()<>]*\)[^\s()<>]*(?<![.,;!?])|\w+://[^\s()<>]+(?<![.,;!?])|www\.[^\s()<>]+(?<![.,;!?]))')
+NICK_PATTERN = re.compile(r'<[^>\n]*>')
+
+
+def utf16_length(text):
+    """Length of text as Tk counts it, characters outside the BMP take two columns."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+class RudeTagger:
+    """
+    Applies nickname, self-highlight and URL tags to a text widget.
+    Spans are found with regexes over the plain text that was just inserted
+    and turned into tag ranges relative to where the insert started, so each
+    message is tagged once instead of rescanning the whole widget. Tk counts
+    columns in UTF-16 units, so an emoji moves everything after it by two.
+
+    The owner window provides irc_client, user_nickname_color,
+    get_nickname_color(nickname_with_brackets) and open_url(event, url).
+    """
+    def __init__(self, text_widget, owner):
+        self.text_widget = text_widget
+        self.owner = owner
+        self.configured_tags = set()
+        self.tagged_nickname = None
+        self.pattern_nickname = None
+        self.nickname_pattern = None
+
+    def get_nickname_pattern(self, nickname):
+        if nickname != self.pattern_nickname:
+            self.nickname_pattern = re.compile(re.escape(nickname), re.IGNORECASE)
+            self.pattern_nickname = nickname
+        return self.nickname_pattern
+
+    def current_nickname(self):
+        irc_client = getattr(self.owner, "irc_client", None)
+        return irc_client.nickname if irc_client else None
+
+    def tag_region(self, text, start_index):
+        """Tag everything in text, which was inserted at start_index."""
+        if not text:
+            return
+        start_line, start_col = (int(part) for part in self.text_widget.index(start_index).split("."))
+        newlines = [match.start() for match in re.finditer("\n", text)]
+        # Offsets are columns unless there is a character outside the BMP
+        wide = not text.isascii() and max(text) > "\uffff"
+
+        def to_index(offset):
+            line = bisect_right(newlines, offset - 1)
+            line_start = newlines[line - 1] + 1 if line else 0
+            col = utf16_length(text[line_start:offset]) if wide else offset - line_start
+            if line == 0:
+                return f"{start_line}.{start_col + col}"
+            return f"{start_line + line}.{col}"
+
+        user_nickname = self.current_nickname()
+        if user_nickname:
+            if "nickname" not in self.configured_tags:
+                self.text_widget.tag_configure("nickname", foreground=self.owner.user_nickname_color)
+                self.configured_tags.add("nickname")
+            for match in self.get_nickname_pattern(user_nickname).finditer(text):
+                self.text_widget.tag_add("nickname", to_index(match.start()), to_index(match.end()))
+
+            for match in NICK_PATTERN.finditer(text):
+                nickname_with_brackets = match.group()
+                tag_name = f"nickname_{nickname_with_brackets}"
+                if tag_name not in self.configured_tags:
+                    nickname_color = self.owner.get_nickname_color(nickname_with_brackets)
+                    self.text_widget.tag_configure(tag_name, foreground=nickname_color)
+                    self.configured_tags.add(tag_name)
+                self.text_widget.tag_add(tag_name, to_index(match.start()), to_index(match.end()))
+
+        for match in URL_PATTERN.finditer(text):
+            url = match.group()
+            tag_name = f"url_{url}"
+            if tag_name not in self.configured_tags:
+                self.text_widget.tag_configure(tag_name, foreground="blue", underline=1)
+                self.text_widget.tag_bind(tag_name, "<Button-1>", lambda event, url=url: self.owner.open_url(event, url))
+                self.configured_tags.add(tag_name)
+            self.text_widget.tag_add(tag_name, to_index(match.start()), to_index(match.end()))
+
+    def retag_all(self, force=False):
+        """
+        Retag the whole widget. Only needed when the nickname or colours change,
+        new text is tagged as it is inserted.
+        """
+        nickname = self.current_nickname()
+        if not force and nickname == self.tagged_nickname:
+            return
+        if force:
+            self.configured_tags.clear()
+        self.configured_tags.discard("nickname")
+        self.text_widget.tag_remove("nickname", "1.0", "end")
+        self.tag_region(self.text_widget.get("1.0", "end-1c"), "1.0")
+        self.tagged_nickname = nickname
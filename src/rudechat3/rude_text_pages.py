@@ -0,0 +1,120 @@
+from collections import OrderedDict
+
+
+class TextPage:
+    """
+    One chat Text widget with its own tagger and attribute tag cache.
+    A page showing a channel remembers the history mark it was left at,
+    so only the lines added while it was hidden need rendering later.
+    It also counts the lines written to it, so a page holding output the
+    history does not have, a whois reply or an error, can be told apart.
+    """
+    __slots__ = ("widget", "tagger", "tag_cache", "history", "server", "target", "mark", "written", "synced")
+
+    def __init__(self, widget, tagger):
+        self.widget = widget
+        self.tagger = tagger
+        self.tag_cache = {}
+        self.history = None
+        self.server = None
+        self.target = None
+        self.mark = None
+        self.written = 0
+        self.synced = 0
+
+    def follow(self, history, server, target):
+        self.history = history
+        self.server = server
+        self.target = target
+        self.mark = None
+
+    def sync(self):
+        """Called once the page shows everything its target's history holds."""
+        if self.history is not None:
+            self.mark = self.history.mark(self.server, self.target)
+            self.synced = self.written
+
+    def leave(self):
+        if self.history is None or self.mark is None:
+            return
+        mark = self.history.mark(self.server, self.target)
+        # Every line written since the last sync has to be one the history got,
+        # otherwise the page is rebuilt from the history when shown again
+        if mark[0] != self.mark[0] or mark[1] - self.mark[1] != self.written - self.synced:
+            self.mark = None
+        else:
+            self.mark = mark
+            self.synced = self.written
+
+    def missed(self, history):
+        """History records added since the page was left, or None if it has to be rebuilt."""
+        if history is not self.history or self.mark is None:
+            return None
+        return history.since(self.server, self.target, self.mark)
+
+    def show(self):
+        self.widget.frame.tkraise()
+
+    def clear(self):
+        self.widget.config(state="normal")
+        self.widget.delete("1.0", "end")
+        self.widget.config(state="disabled")
+        self.history = None
+        self.mark = None
+
+    def destroy(self):
+        # ScrolledText lives in its own frame together with the scrollbar
+        self.widget.frame.destroy()
+
+
+class TextPagePool:
+    """
+    LRU pool of pre-rendered chat pages keyed by (server, channel).
+    Switching to a pooled channel raises its widget instead of clearing the
+    window and replaying the history. At most size pages are kept, the least
+    recently shown one is destroyed to make room.
+
+    create_page() returns a new TextPage stacked in the chat window.
+    """
+    def __init__(self, create_page, size):
+        self.create_page = create_page
+        self.size = size
+        self.pages = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def get(self, key):
+        page = self.pages.get(key)
+        if page is not None:
+            self.pages.move_to_end(key)
+        return page
+
+    def add(self, key):
+        """Return an empty page for key, evicting the oldest page if the pool is full."""
+        page = self.pages.pop(key, None)
+        if page is not None:
+            page.clear()
+        else:
+            while len(self.pages) >= self.size:
+                _, oldest = self.pages.popitem(last=False)
+                oldest.destroy()
+            page = self.create_page()
+        self.pages[key] = page
+        return page
+
+    def discard(self, key):
+        page = self.pages.pop(key, None)
+        if page is not None:
+            page.destroy()
+
+    def clear(self, keep=None):
+        """Destroy every page except keep."""
+        for key, page in list(self.pages.items()):
+            if page is not keep:
+                del self.pages[key]
+                page.destroy()
+
+    def __iter__(self):
+        return iter(list(self.pages.values()))
@@ -0,0 +1,92 @@
+import tkinter as tk
+from math import ceil
+
+
+class UserListView:
+    """
+    Keeps a user Listbox in step with a MembershipIndex channel.
+
+    Changes are applied as the insert and delete events queued by the
+    membership model, so a join or mode change touches one or two rows
+    instead of refilling the list. Row colours (away users) are only
+    worked out for the rows on screen and are fixed up as the list scrolls,
+    so a large channel never needs an itemconfig per member.
+
+    row_colour(name) returns the foreground colour a row should have.
+    """
+    def __init__(self, listbox, scrollbar, row_colour, margin=10):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.row_colour = row_colour
+        self.margin = margin
+        self.members = None
+        self.channel = None
+        self.rows = []
+        self.colours = []
+        self.listbox.config(yscrollcommand=self.on_scroll)
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.paint_visible()
+
+    def clear(self):
+        """Forget the current channel, the caller is about to reuse the Listbox."""
+        self.listbox.delete(0, tk.END)
+        self.members = None
+        self.channel = None
+        self.rows = []
+        self.colours = []
+
+    def show(self, members, channel):
+        """Bring the Listbox up to date with channel in members."""
+        members.watch(channel)
+        changes = members.take_changes(channel)
+        if members is not self.members or channel != self.channel:
+            self.render(members, channel)
+        elif changes and changes[0][0] == "reset":
+            self.render(members, channel)
+        else:
+            for change in changes:
+                if change[0] == "insert":
+                    _, index, name = change
+                    self.listbox.insert(index, name)
+                    self.rows.insert(index, name)
+                    self.colours.insert(index, None)
+                else:
+                    index = change[1]
+                    self.listbox.delete(index)
+                    del self.rows[index]
+                    del self.colours[index]
+        self.paint_visible()
+
+    def render(self, members, channel):
+        names = list(members.display_list(channel))
+        self.listbox.delete(0, tk.END)
+        if names:
+            # One Tcl call for the whole list
+            self.listbox.insert(tk.END, *names)
+        self.members = members
+        self.channel = channel
+        self.rows = names
+        self.colours = [None] * len(names)
+
+    def visible_range(self):
+        size = len(self.rows)
+        if not size:
+            return 0, 0
+        first, last = self.listbox.yview()
+        start = max(0, int(first * size) - self.margin)
+        end = min(size, ceil(last * size) + self.margin)
+        return start, end
+
+    def paint_visible(self):
+        """Recolour on-screen rows whose colour is out of date."""
+        start, end = self.visible_range()
+        if start == end:
+            return
+        default = self.listbox.cget("fg")
+        for index in range(start, end):
+            colour = self.row_colour(self.rows[index])
+            if (self.colours[index] or default) != colour:
+                self.listbox.itemconfig(index, {'fg': colour})
+                self.colours[index] = colour
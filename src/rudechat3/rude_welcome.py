@@ -0,0 +1,22 @@
+class WelcomeState:
+    """
+    What the welcome phase has seen so far while registering, and the ZNC
+    playback held back until the sync is over. A fresh one is made for
+    every connection, done is set once registration has finished.
+    """
+    def __init__(self):
+        self.sync = True
+        self.received_001 = False
+        self.motd_received = False
+        self.sasl_authenticated = False
+        self.logged_in = False
+        self.nickserv_sent = False
+        self.got_396 = False
+        self.znc_connected = False
+        self.count_366 = 0
+        self.got_topic = 0
+        self.last_366_time = None
+        self.privmsg_tokens = []
+        self.names_tokens = []
+        self.topic_tokens = []
+        self.done = False
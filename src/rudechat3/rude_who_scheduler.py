@@ -0,0 +1,77 @@
+import asyncio
+
+# Query token for scheduled WHOX polls, so their 354 replies are not taken for a typed /who
+WHO_TOKEN = "152"
+# Token, channel, user, host, server, nick, flags, hopcount, account, realname
+WHOX_FIELDS = "tcuhsnfdar"
+
+
+class WhoScheduler:
+    """
+    Decides which joined channel gets the next background WHO and when.
+
+    A round polls every joined channel once. The channel on screen and the
+    popped out ones go first, the rest smallest first, so the lists people
+    are looking at, and most of the channels, are filled in early. The
+    order is worked out again before every query, switching channels
+    mid-round moves the new one to the front.
+
+    Only one query is out at a time. The next one waits for the 315 of the
+    last one and for the send queue to have reserve lines of flood budget
+    left over, so a poll never delays what the user types.
+    """
+    def __init__(self, interval=300, reserve=2, timeout=30):
+        self.interval = interval
+        self.reserve = reserve
+        self.timeout = timeout
+        self.done = set()
+        self.pending = {}
+        self.wake = asyncio.Event()
+
+    def restart(self):
+        """Start a new round, after a reconnect for instance."""
+        self.done.clear()
+        self.wake.set()
+
+    def next_channel(self, channels, on_screen, size):
+        """The joined channel to poll next in this round, or None when the round is over."""
+        waiting = [channel for channel in channels if channel not in self.done]
+        if not waiting:
+            return None
+        return min(waiting, key=lambda channel: (not on_screen(channel), size(channel)))
+
+    def expect(self, key):
+        """Future set once the WHO reply for key has ended."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        return future
+
+    def finished(self, key):
+        future = self.pending.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    async def wait_for_budget(self, send_queue):
+        """Sleep until a WHO would leave reserve lines of the burst unused."""
+        if not send_queue.paced:
+            return
+        # A burst smaller than the reserve could never be topped up that far
+        tokens = min(self.reserve + 1, send_queue.burst)
+        while True:
+            delay = send_queue.time_until(tokens)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def wait_for_round(self, repeat):
+        """
+        Wait for the next round. Without away-notify away states only
+        change when polled, so repeat every interval seconds. Otherwise
+        wait for restart().
+        """
+        self.wake.clear()
+        try:
+            await asyncio.wait_for(self.wake.wait(), self.interval if repeat else None)
+        except asyncio.TimeoutError:
+            pass
+        self.done.clear()
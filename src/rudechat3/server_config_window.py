@@ -34,6 +34,15 @@ class ServerConfigWindow:
             'mention_note_color': 'Mention Channel Highlight',
             'activity_note_color': 'Activity Channel Highlight',
             'use_logging': 'Turn Logging On/Off',
+            'log_per_day': 'Split Logs Per Day?',
+            'send_burst': 'Lines Sent Before Pacing',
+            'send_rate': 'Paced Lines Per Second',
+            'who_interval': 'Away Refresh Seconds (No away-notify)',
+            'highlight_words': 'Extra Highlight Words',
+            'nick_aliases': 'Nick Aliases To Highlight',
+            'channel_highlights': 'Per-Channel Highlight Words',
+            'highlight_ignore': 'Never Highlight From (Masks)',
+            'use_multiline': 'Send Pastes As One Message (draft/multiline)',
             'znc_connection': 'Use ZNC Connection',
             'znc_password': 'ZNC Password',
             'ignore_cert': 'Ignore SSL Certs?',
@@ -0,0 +1,35 @@
+import dataclasses
+import json
+import pathlib
+
+from rudechat3.format_decoder import decoder
+
+GOLDEN = pathlib.Path(__file__).with_name("format_decoder_golden.jsonl")
+
+
+def load_cases():
+    with GOLDEN.open(encoding="utf-8") as golden:
+        return [json.loads(line) for line in golden]
+
+
+def as_runs(output):
+    return [[text, [list(dataclasses.astuple(attribute)) for attribute in attributes]] for text, attributes in output]
+
+
+def test_decoder_matches_golden_corpus():
+    # Expected runs are the pre-rewrite decoder's output with equal neighbours merged
+    for case in load_cases():
+        assert as_runs(decoder(case["input"])) == case["runs"], repr(case["input"])
+
+
+def test_decoder_merges_runs():
+    for case in load_cases():
+        output = decoder(case["input"])
+        for (_, first), (_, second) in zip(output, output[1:]):
+            assert first != second, repr(case["input"])
+
+
+def test_cached_results_are_not_shared():
+    first = decoder("\x0304red text")
+    first[0][1].clear()
+    assert decoder("\x0304red text")[0][1]
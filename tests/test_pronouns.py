@@ -0,0 +1,51 @@
+import random
+import re
+
+import pytest
+
+from rudechat3 import rude_pronouns
+from rudechat3.rude_pronouns import PHRASES, PRONOUNS, replace_pronouns
+
+
+@pytest.fixture(autouse=True)
+def filtered_channels(tmp_path, monkeypatch):
+    path = tmp_path / "filtered_channels.txt"
+    path.write_text("#filtered\n")
+    monkeypatch.setattr(rude_pronouns, "FILTERED_CHANNELS_PATH", str(path))
+
+
+def sequential_replace(text):
+    # The pre-rewrite behaviour: one re.sub per entry, phrases first
+    for table in (PHRASES, PRONOUNS):
+        for pattern, replacement in table.items():
+            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+
+def random_lines(count, seed=1):
+    random.seed(seed)
+    words = set("the a and then said that went home with".split())
+    for pattern in list(PHRASES) + list(PRONOUNS):
+        words.update(pattern.replace(r'\b', '').replace("\\'", "'").split(" "))
+    words = sorted(words)
+    lines = []
+    for _ in range(count):
+        line = [random.choice(words) for _ in range(random.randint(3, 14))]
+        line = [word.capitalize() if random.random() < 0.2 else word for word in line]
+        lines.append(" ".join(line))
+    return lines
+
+
+def test_matches_sequential_substitution():
+    for line in random_lines(2000):
+        assert replace_pronouns(line, "#filtered") == sequential_replace(line), repr(line)
+
+
+def test_earlier_phrase_wins_overlap():
+    assert replace_pronouns("I trusted her teacher", "#filtered") == sequential_replace("I trusted her teacher")
+    assert replace_pronouns("He's sure his job is fine", "#filtered") == "they're sure their job is fine"
+
+
+def test_other_channels_untouched():
+    assert replace_pronouns("he was here", "#elsewhere") == "he was here"
+    assert replace_pronouns("he was here") == "he was here"
@@ -0,0 +1,42 @@
+import asyncio
+
+from rudechat3.rude_send_queue import SendQueue, BULK
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+async def send(queue, messages, lane=None):
+    writer = FakeWriter()
+    queue.start(writer)
+    try:
+        results = await asyncio.wait_for(asyncio.gather(*(queue.put(message, lane) for message in messages)), 2)
+    finally:
+        queue.stop()
+    return results, writer.data.decode().split("\r\n")[:-1]
+
+
+def test_rate_zero_is_unpaced():
+    for rate in (0, -1):
+        queue = SendQueue(rate=rate, burst=1)
+        messages = [f"PRIVMSG #c :{number}" for number in range(5)]
+        results, sent = asyncio.run(send(queue, messages, BULK))
+        assert results == [True] * 5
+        assert sent == messages
+        assert queue.time_until(10) == 0.0
+
+
+def test_paced_after_burst():
+    queue = SendQueue(rate=50, burst=2)
+    messages = [f"PRIVMSG #c :{number}" for number in range(4)]
+    results, sent = asyncio.run(send(queue, messages))
+    assert results == [True] * 4
+    assert sent == messages
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from rudechat3.rude_tagger import RudeTagger
+
+
+class FakeText:
+    """Records tag ranges, index() returns what it is given like Tk does for "line.col"."""
+    def __init__(self):
+        self.ranges = {}
+
+    def index(self, index):
+        return index
+
+    def tag_configure(self, tag_name, **options):
+        pass
+
+    def tag_bind(self, tag_name, sequence, callback):
+        pass
+
+    def tag_add(self, tag_name, start, end):
+        self.ranges.setdefault(tag_name, []).append((start, end))
+
+
+def tag(text, start_index="1.0", nickname="Rude"):
+    widget = FakeText()
+    owner = SimpleNamespace(
+        irc_client=SimpleNamespace(nickname=nickname),
+        user_nickname_color="#39ff14",
+        get_nickname_color=lambda nickname_with_brackets: "#ffffff",
+        open_url=lambda event, url: None,
+    )
+    RudeTagger(widget, owner).tag_region(text, start_index)
+    return widget.ranges
+
+
+def test_ascii_offsets():
+    ranges = tag("<bob> hi Rude http://a.example\n")
+    assert ranges["nickname_<bob>"] == [("1.0", "1.5")]
+    assert ranges["nickname"] == [("1.9", "1.13")]
+    assert ranges["url_http://a.example"] == [("1.14", "1.30")]
+
+
+def test_emoji_takes_two_columns():
+    # Tk counts in UTF-16 units, the emoji is two of them
+    ranges = tag("\U0001F600 <bob> Rude http://a.example\n<amy> \U0001F600\U0001F600 Rude\n", "3.4")
+    assert ranges["nickname_<bob>"] == [("3.7", "3.12")]
+    assert ranges["nickname"] == [("3.13", "3.17"), ("4.11", "4.15")]
+    assert ranges["url_http://a.example"] == [("3.18", "3.34")]
+    assert ranges["nickname_<amy>"] == [("4.0", "4.5")]
+
+
+def test_bmp_characters_take_one_column():
+    ranges = tag("é <bob> Rude\n")
+    assert ranges["nickname_<bob>"] == [("1.2", "1.7")]
+    assert ranges["nickname"] == [("1.8", "1.12")]